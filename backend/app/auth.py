@@ -1,19 +1,66 @@
+import asyncio
+import hashlib
+import hmac
 import logging
+import time
+from collections import OrderedDict
 
-import firebase_admin
-from firebase_admin import auth as firebase_auth, credentials
 from fastapi import Header, HTTPException
 
+from app.clients import firebase_auth
 from app.config import settings
+from app.metrics import span
 
 logger = logging.getLogger(__name__)
 
-# Initialize Firebase Admin SDK.
-# On Cloud Run this uses Application Default Credentials automatically.
-# Locally, run: gcloud auth application-default login --project <project-id>
-if not firebase_admin._apps:
-    cred = credentials.ApplicationDefault()
-    firebase_admin.initialize_app(cred, {"projectId": settings.google_cloud_project})
+
+class TokenCache:
+    """Bounded LRU of verified ID tokens, keyed by token hash.
+
+    Entries live until the token's `exp` claim, capped at `max_ttl` so a
+    token signed with a since-rotated key is re-verified within that window.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, decoded = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return decoded
+
+    def put(self, token: str, decoded: dict) -> None:
+        now = time.time()
+        expires_at = min(float(decoded.get("exp", now)), now + self.max_ttl)
+        if expires_at <= now or self.max_size <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (expires_at, decoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(max_size=settings.auth_cache_size, max_ttl=settings.auth_cache_max_ttl_s)
 
 
 async def verify_firebase_token(authorization: str = Header(...)) -> dict:
@@ -21,9 +68,30 @@ async def verify_firebase_token(authorization: str = Header(...)) -> dict:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization header")
     token = authorization[7:]
-    try:
-        decoded = firebase_auth.verify_id_token(token)
+
+    with span("auth"):
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        try:
+            # verify_id_token is blocking (and may fetch Google's public certs),
+            # so keep it off the event loop.
+            decoded = await asyncio.to_thread(firebase_auth.verify_id_token, token)
+        except Exception as e:
+            logger.warning(f"Token verification failed: {e}")
+            raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.put(token, decoded)
         return decoded
-    except Exception as e:
-        logger.warning(f"Token verification failed: {e}")
-        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def verify_ops_token(authorization: str = Header("")) -> None:
+    """FastAPI dependency for the operational endpoints (/warmup, /metrics).
+
+    They require `Authorization: Bearer <ops_token>`; with no `ops_token`
+    configured they are not served at all.
+    """
+    if not settings.ops_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {settings.ops_token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
@@ -0,0 +1,252 @@
+"""Compact, relevance-pruned rendering of the board state for the LLM prompt.
+
+Board objects are rewritten with short keys, rounded coordinates and per-type
+defaults dropped; connectors become an edge list. When the compacted board is
+larger than the token budget, only the objects relevant to the command are
+kept (ones it mentions by id, color, type or text, the frames that contain
+them, then whatever is closest to the viewport) and the rest are summarized.
+Output is ordered by id so the same board always renders the same bytes,
+which keeps the provider's prompt prefix cache warm.
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+from pydantic_core import to_json
+
+from app.schemas import BoardObject
+from app.spatial import bounds, center
+
+# BoardObject field -> short key used in the prompt. Fields not listed
+# (createdBy, zIndex, connector endpoints) are never sent.
+SHORT_KEYS = {
+    "id": "id",
+    "type": "t",
+    "x": "x",
+    "y": "y",
+    "width": "w",
+    "height": "h",
+    "radius": "r",
+    "text": "text",
+    "title": "title",
+    "color": "c",
+    "fontSize": "fs",
+    "strokeWidth": "sw",
+    "strokeColor": "sc",
+    "rotation": "rot",
+}
+
+# Values matching these are implied and omitted from the compact form.
+TYPE_DEFAULTS = {
+    "stickyNote": {"width": 200, "height": 150},
+    "rectangle": {"width": 120, "height": 120},
+    "circle": {"radius": 60},
+    "line": {"width": 150, "strokeWidth": 3},
+    "text": {"fontSize": 20, "width": 200},
+    "frame": {"width": 400, "height": 300},
+    "connector": {"strokeWidth": 2},
+}
+
+COLOR_NAMES = {
+    "#FDE68A": "yellow",
+    "#FBCFE8": "pink",
+    "#BFDBFE": "blue",
+    "#BBF7D0": "green",
+    "#DDD6FE": "purple",
+    "#FED7AA": "orange",
+    "#FECACA": "red",
+    "#E5E7EB": "gray",
+    "#1F2937": "black",
+}
+# Color name -> palette hex, accepting both spellings of gray.
+COLOR_HEX = {name: hex_ for hex_, name in COLOR_NAMES.items()} | {"grey": "#E5E7EB"}
+# Regex group matching a palette color name or a hex color in a command.
+COLOR_PATTERN = r"(yellow|pink|blue|green|purple|orange|red|gr[ae]y|black|#[0-9a-f]{6})"
+
+TYPE_KEYWORDS = {
+    "stickyNote": ("sticky", "stickies", "note", "notes"),
+    "rectangle": ("rectangle", "rectangles", "rect", "box", "boxes", "square", "squares"),
+    "circle": ("circle", "circles"),
+    "line": ("line", "lines"),
+    "text": ("text", "texts", "label", "labels", "heading", "headings"),
+    "frame": ("frame", "frames", "section", "sections", "column", "columns", "quadrant"),
+    "connector": ("connector", "connectors", "arrow", "arrows"),
+}
+
+# Rough chars-per-token ratio for JSON-heavy prompts.
+CHARS_PER_TOKEN = 4
+
+# Tokens held back from the budget for the omitted-objects summary.
+SUMMARY_RESERVE = 150
+
+_WORD_RE = re.compile(r"[a-z0-9#]+")
+_STOPWORDS = {
+    "the", "and", "all", "any", "for", "with", "that", "this", "these", "those",
+    "into", "onto", "from", "make", "move", "change", "create", "add", "delete",
+    "remove", "put", "them", "its", "their", "to", "of", "in", "on", "a", "an",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def compact_object(obj: BoardObject) -> dict:
+    """Short-key form of a non-connector object with defaults dropped."""
+    defaults = TYPE_DEFAULTS.get(obj.type, {})
+    out = {}
+    for field, key in SHORT_KEYS.items():
+        value = getattr(obj, field)
+        if value is None or defaults.get(field) == value:
+            continue
+        if field == "rotation" and value == 0:
+            continue
+        if isinstance(value, float):
+            value = round(value)
+        out[key] = value
+    return out
+
+
+def compact_board(board_state: list[BoardObject]) -> tuple[list[dict], list[list[str]]]:
+    """Split the board into compact objects and connector edges `[id, fromId, toId]`."""
+    objects, edges = [], []
+    for obj in board_state:
+        if obj.type == "connector":
+            if obj.fromId and obj.toId:
+                edges.append([obj.id, obj.fromId, obj.toId])
+        else:
+            objects.append(compact_object(obj))
+    return objects, edges
+
+
+def _command_terms(command: str) -> tuple[set[str], set[str], set[str]]:
+    """Colors (hex), object types and free-text words mentioned in a command."""
+    words = set(_WORD_RE.findall(command.lower()))
+    colors = {hex_ for hex_, name in COLOR_NAMES.items() if name in words or hex_.lower() in words}
+    if "grey" in words:
+        colors.add("#E5E7EB")
+    types = {t for t, keywords in TYPE_KEYWORDS.items() if words & set(keywords)}
+    free = {w for w in words if len(w) >= 3 and w not in _STOPWORDS}
+    return colors, types, free
+
+
+def _relevance(obj: BoardObject, command: str, colors: set[str], types: set[str], words: set[str]) -> int:
+    score = 0
+    if obj.id in command:
+        score += 8
+    if obj.color and obj.color.upper() in colors:
+        score += 2
+    if obj.type in types:
+        score += 2
+    label = f"{obj.text or ''} {obj.title or ''}".lower()
+    if label.strip() and words & set(_WORD_RE.findall(label)):
+        score += 4
+    return score
+
+
+def _distance(obj: BoardObject, viewport: dict | None) -> float:
+    if not viewport:
+        return 0.0
+    cx, cy = center(obj)
+    return (cx - viewport.get("x", 0)) ** 2 + (cy - viewport.get("y", 0)) ** 2
+
+
+class _FrameIndex:
+    """Bounds of the board's frames, to find the ones containing an object's center."""
+
+    def __init__(self, frames: list[BoardObject]):
+        self.frames = [frame for frame in frames if frame.x is not None and frame.y is not None]
+        self.bounds = np.array([bounds(frame) for frame in self.frames]).reshape(-1, 4)
+
+    def containing(self, obj: BoardObject) -> list[BoardObject]:
+        if not self.frames:
+            return []
+        cx, cy = center(obj)
+        b = self.bounds
+        hits = (cx >= b[:, 0]) & (cx <= b[:, 2]) & (cy >= b[:, 1]) & (cy <= b[:, 3])
+        return [self.frames[i] for i in np.flatnonzero(hits)]
+
+
+def summarize_omitted(omitted: list[BoardObject]) -> str:
+    """E.g. '1,840 other objects omitted: stickyNote 1,200 (yellow 800, pink 400), ...'."""
+    by_type: dict[str, Counter] = {}
+    for obj in omitted:
+        color = COLOR_NAMES.get((obj.color or "").upper(), obj.color or "none")
+        by_type.setdefault(obj.type, Counter())[color] += 1
+
+    groups = []
+    for obj_type, colors in sorted(by_type.items(), key=lambda kv: -sum(kv[1].values())):
+        top = ", ".join(f"{name} {n:,}" for name, n in colors.most_common(4))
+        groups.append(f"{obj_type} {sum(colors.values()):,} ({top})")
+    return f"{len(omitted):,} other objects omitted: " + "; ".join(groups)
+
+
+def _render(encoded: list[bytes], edges: list[list[str]], summary: str | None) -> str:
+    parts = [(b"[" + b",".join(encoded) + b"]").decode()]
+    if edges:
+        parts.append("Connectors [id, fromId, toId]: " + to_json(edges).decode())
+    if summary:
+        parts.append(summary)
+    return "\n".join(parts)
+
+
+def build_board_context(
+    board_state: list[BoardObject],
+    command: str,
+    viewport: dict | None,
+    token_budget: int,
+) -> str:
+    """Render the board for the prompt, pruned to `token_budget` estimated tokens.
+
+    Objects and edges are listed in id order so an unchanged board renders
+    byte-identically regardless of the order the client sent it in.
+    """
+    board_state = sorted(board_state, key=lambda obj: obj.id)
+    shapes = [obj for obj in board_state if obj.type != "connector"]
+    _, edges = compact_board([obj for obj in board_state if obj.type == "connector"])
+    # Serialize each object once (pydantic-core); lengths double as token costs.
+    encoded = {obj.id: to_json(compact_object(obj)) for obj in shapes}
+    cost = {oid: len(raw) // CHARS_PER_TOKEN + 1 for oid, raw in encoded.items()}
+
+    edge_costs = [estimate_tokens(str(edge)) for edge in edges]
+    if sum(cost.values()) + sum(edge_costs) <= token_budget:
+        return _render(list(encoded.values()), edges, None)
+
+    colors, types, words = _command_terms(command)
+    ranked = sorted(
+        shapes,
+        key=lambda o: (-_relevance(o, command, colors, types, words), _distance(o, viewport)),
+    )
+
+    budget = token_budget - SUMMARY_RESERVE
+    used = 0
+    kept: set[str] = set()
+    # A kept object is only meaningful alongside the frame it sits in, so
+    # it is charged for those frames too (the first time they are pulled in).
+    frames = _FrameIndex([obj for obj in shapes if obj.type == "frame"])
+    for obj in ranked:
+        if obj.id in kept:
+            continue
+        added = [obj.id] + [f.id for f in frames.containing(obj) if f.id not in kept and f.id != obj.id]
+        added_cost = sum(cost[oid] for oid in added)
+        if used + added_cost > budget:
+            break
+        kept.update(added)
+        used += added_cost
+
+    kept_edges = []
+    for edge, edge_cost in zip(edges, edge_costs):
+        if edge[1] in kept and edge[2] in kept:
+            if used + edge_cost > budget:
+                break
+            kept_edges.append(edge)
+            used += edge_cost
+    kept.update(edge[0] for edge in kept_edges)
+
+    omitted = [obj for obj in board_state if obj.id not in kept]
+    return _render(
+        [encoded[obj.id] for obj in shapes if obj.id in kept],
+        kept_edges,
+        summarize_omitted(omitted) if omitted else None,
+    )
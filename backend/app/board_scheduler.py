@@ -0,0 +1,251 @@
+"""Per-board ordering of concurrent AI commands.
+
+Every command declares a footprint before it runs: the area around the
+requester's viewport, or the whole board for commands that clear, lay out
+or bulk-edit it (and for requests without a viewport). On one board,
+commands start in arrival order, except that a command may start ahead of
+earlier waiting ones it does not conflict with; conflicting commands queue
+behind each other.
+
+Each finished command leaves its effects (deleted ids, boxes of created
+objects) in the board's journal. Actions computed from a snapshot that
+predates a journal entry are reconciled before they are returned: edits to
+objects deleted in the meantime are dropped, and new objects that would land
+on top of ones another command just created are shifted clear of them.
+"""
+
+import asyncio
+import contextlib
+import re
+
+from app.concurrency import QueueTimeoutError
+from app.metrics import Counter, span
+from app.schemas import Action, AiCommandRequest
+
+# Half the side of the square a viewport-scoped command may touch.
+REGION_RADIUS = 1000
+
+# Space left between rebased objects and the ones they were moved clear of.
+REBASE_GAP = 40
+
+BOARD_WIDE_RE = re.compile(
+    r"\b(all|every|everything|board|canvas|clear|wipe|arrange|grid|organi[sz]e|lay ?out|align|tidy|sort"
+    r"|cluster|group)\b"
+    r"|\b(create|add|generate|make) \d+\b"
+)
+
+stale_actions = Counter("ai_stale_actions_total", "Actions reconciled against newer board changes, by outcome")
+
+
+class Footprint:
+    """Part of the board a command may touch: all of it, or a box."""
+
+    def __init__(self, region: tuple[float, float, float, float] | None = None):
+        self.region = region   # (x0, y0, x1, y1); None means the whole board
+
+    def conflicts(self, other: "Footprint") -> bool:
+        if self.region is None or other.region is None:
+            return True
+        return _overlaps(self.region, other.region)
+
+
+def predict_footprint(request: AiCommandRequest) -> Footprint:
+    """Footprint of a command, from its wording and the requester's viewport."""
+    viewport = request.viewportCenter
+    if not viewport or BOARD_WIDE_RE.search(request.command.lower()):
+        return Footprint()
+    x, y = viewport.get("x", 0), viewport.get("y", 0)
+    return Footprint((x - REGION_RADIUS, y - REGION_RADIUS, x + REGION_RADIUS, y + REGION_RADIUS))
+
+
+def _overlaps(a: tuple, b: tuple) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _box(props: dict) -> tuple[float, float, float, float] | None:
+    if props.get("x") is None or props.get("y") is None:
+        return None
+    if props.get("radius") is not None:
+        width = height = 2 * props["radius"]
+    else:
+        width, height = props.get("width") or 0, props.get("height") or 0
+    return props["x"], props["y"], props["x"] + width, props["y"] + height
+
+
+def _created_boxes(action: Action) -> list[tuple[float, float, float, float]]:
+    if action.type == "create" and action.objectType != "connector":
+        box = _box(action.properties or {})
+        return [box] if box else []
+    if action.type == "createMany":
+        shared, columns = action.properties or {}, action.columns or {}
+        count = len(next(iter(columns.values()), []))
+        boxes = []
+        for i in range(count):
+            props = {**shared, **{k: v[i] for k, v in columns.items() if v[i] is not None}}
+            if box := _box(props):
+                boxes.append(box)
+        return boxes
+    return []
+
+
+class Effects:
+    """What a finished command did to the board, for later reconciliation."""
+
+    def __init__(self, version: int, deleted: set[str], created: list[tuple]):
+        self.version = version
+        self.deleted = deleted
+        self.created = created
+
+
+class Ticket:
+    """A command's place on its board.
+
+    `version` is the board's journal version when the command arrived, i.e.
+    the newest change its snapshot can be assumed to include; `journal` is
+    the board's, shared with the other commands on it.
+    """
+
+    def __init__(self, footprint: Footprint, version: int, journal: list[Effects]):
+        self.footprint = footprint
+        self.version = version
+        self.running = False
+        self.ready = asyncio.Event()
+        self.produced: list[Action] = []
+        self._journal = journal
+        self._shift: float | None = None
+
+    def reconcile(self, actions: list[Action]) -> list[Action]:
+        """Drop or rebase `actions` made stale by commands that finished
+        after this one arrived, and note them as this command's output."""
+        newer = [e for e in self._journal if e.version > self.version]
+        deleted = set().union(*(e.deleted for e in newer)) if newer else set()
+        occupied = [box for e in newer for box in e.created]
+
+        kept = []
+        for action in actions:
+            if deleted:
+                action = _without_deleted(action, deleted)
+                if action is None:
+                    stale_actions.inc(outcome="dropped")
+                    continue
+            kept.append(action)
+
+        if occupied:
+            kept = self._rebase(kept, occupied)
+        self.produced.extend(kept)
+        return kept
+
+    def _rebase(self, actions: list[Action], occupied: list[tuple]) -> list[Action]:
+        """Shift this command's new objects right of any they would overlap.
+
+        The shift is chosen once per command so its objects keep their
+        relative layout across rounds.
+        """
+        boxes = [box for action in actions for box in _created_boxes(action)]
+        if not boxes:
+            return actions
+        if self._shift is None:
+            batch = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                     max(b[2] for b in boxes), max(b[3] for b in boxes))
+            hit = [box for box in occupied if _overlaps(box, batch)]
+            if not hit:
+                return actions
+            self._shift = max(box[2] for box in hit) - batch[0] + REBASE_GAP
+        if not self._shift:
+            return actions
+
+        shifted = []
+        for action in actions:
+            props = action.properties or {}
+            if action.type == "create" and action.objectType != "connector" and props.get("x") is not None:
+                action = action.model_copy(update={"properties": {**props, "x": props["x"] + self._shift}})
+                stale_actions.inc(outcome="rebased")
+            elif action.type == "createMany" and "x" in (action.columns or {}):
+                xs = [x + self._shift if x is not None else None for x in action.columns["x"]]
+                action = action.model_copy(update={"columns": {**action.columns, "x": xs}})
+                stale_actions.inc(len(xs), outcome="rebased")
+            shifted.append(action)
+        return shifted
+
+
+def _without_deleted(action: Action, deleted: set[str]) -> Action | None:
+    """`action` minus references to deleted objects; None if nothing is left."""
+    if action.type in ("update", "delete"):
+        return None if action.objectId in deleted else action
+    if action.type == "deleteMany":
+        ids = [oid for oid in action.objectIds or [] if oid not in deleted]
+        return action.model_copy(update={"objectIds": ids}) if ids else None
+    if action.type == "create" and action.objectType == "connector":
+        props = action.properties or {}
+        return None if props.get("fromId") in deleted or props.get("toId") in deleted else action
+    return action
+
+
+class _Board:
+    def __init__(self):
+        self.tickets: list[Ticket] = []   # Arrival order, running and waiting
+        self.journal: list[Effects] = []
+        self.version = 0
+
+
+class BoardScheduler:
+    """Admits commands per board by footprint, in fair (arrival) order.
+
+    A board's state is dropped once it has no commands, so the journal only
+    ever holds changes some in-flight command might not have seen.
+    """
+
+    def __init__(self, queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self._boards: dict[str, _Board] = {}
+
+    def _admit(self, board: _Board):
+        for i, ticket in enumerate(board.tickets):
+            if ticket.running:
+                continue
+            if any(ticket.footprint.conflicts(earlier.footprint) for earlier in board.tickets[:i]):
+                continue
+            ticket.running = True
+            ticket.ready.set()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, board_id: str, footprint: Footprint):
+        """Wait until the command may run; yields its Ticket.
+
+        Raises QueueTimeoutError after `queue_timeout` seconds of waiting.
+        """
+        board = self._boards.setdefault(board_id, _Board())
+        ticket = Ticket(footprint, board.version, board.journal)
+        board.tickets.append(ticket)
+        try:
+            self._admit(board)
+            if not ticket.running:
+                with span("board_queue"):
+                    try:
+                        await asyncio.wait_for(ticket.ready.wait(), timeout=self.queue_timeout)
+                    except asyncio.TimeoutError:
+                        raise QueueTimeoutError(f"Board {board_id} busy for {self.queue_timeout}s")
+            yield ticket
+        finally:
+            board.tickets.remove(ticket)
+            if ticket.produced:
+                board.version += 1
+                board.journal.append(Effects(
+                    board.version,
+                    deleted={oid for a in ticket.produced for oid in _deleted_ids(a)},
+                    created=[box for a in ticket.produced for box in _created_boxes(a)],
+                ))
+            if board.tickets:
+                oldest = min(t.version for t in board.tickets)
+                board.journal[:] = [e for e in board.journal if e.version > oldest]
+                self._admit(board)
+            else:
+                del self._boards[board_id]
+
+
+def _deleted_ids(action: Action) -> list[str]:
+    if action.type == "delete" and action.objectId:
+        return [action.objectId]
+    if action.type == "deleteMany":
+        return action.objectIds or []
+    return []
@@ -0,0 +1,290 @@
+"""Server-side board snapshots so clients can send deltas instead of the board.
+
+Each board's last snapshot is kept under its `boardId` together with a
+content-addressed version: the XOR of a per-object digest. A delta names the
+version it was computed against; it is only applied when that still matches
+the stored snapshot, otherwise the client must resend the full board. Because
+versions are derived from content, a restart, an eviction or another client
+replacing the snapshot can never make a stale delta apply to the wrong base.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from pydantic_core import to_json
+
+from app.schemas import BoardObject
+
+
+class StaleSnapshotError(Exception):
+    """The delta's base version is not the stored snapshot (or none is stored)."""
+
+
+def object_digest(obj: BoardObject) -> int:
+    return int.from_bytes(hashlib.blake2b(to_json(obj, exclude_none=True), digest_size=16).digest(), "big")
+
+
+def format_version(digest: int) -> str:
+    return f"{digest:032x}"
+
+
+def snapshot_version(objects: list[BoardObject]) -> str:
+    digest = 0
+    for obj in objects:
+        digest ^= object_digest(obj)
+    return format_version(digest)
+
+
+class BoardStore(ABC):
+    """Interface for per-board snapshots.
+
+    `replace` stores a full snapshot; `apply_delta` upserts and removes
+    objects on top of `base_version`. Both return `(version, objects)`.
+    """
+
+    @abstractmethod
+    def get(self, board_id: str) -> tuple[str, list[BoardObject]] | None:
+        ...
+
+    @abstractmethod
+    def replace(self, board_id: str, objects: list[BoardObject]) -> tuple[str, list[BoardObject]]:
+        ...
+
+    @abstractmethod
+    def apply_delta(
+        self,
+        board_id: str,
+        base_version: str,
+        upserted: list[BoardObject],
+        removed: list[str],
+    ) -> tuple[str, list[BoardObject]]:
+        ...
+
+
+class _Snapshot:
+    def __init__(self):
+        self.objects: dict[str, BoardObject] = {}
+        self.digests: dict[str, int] = {}
+        self.digest = 0
+        self.used_at = time.time()
+
+    def upsert(self, obj: BoardObject):
+        digest = object_digest(obj)
+        self.digest ^= self.digests.get(obj.id, 0) ^ digest
+        self.digests[obj.id] = digest
+        self.objects[obj.id] = obj
+
+    def remove(self, object_id: str):
+        self.digest ^= self.digests.pop(object_id, 0)
+        self.objects.pop(object_id, None)
+
+
+class InMemoryBoardStore(BoardStore):
+    """Snapshots in an LRU bounded by board count and by total objects."""
+
+    def __init__(self, max_boards: int, max_objects: int, ttl: float):
+        self.max_boards = max_boards
+        self.max_objects = max_objects
+        self.ttl = ttl
+        self._boards: OrderedDict[str, _Snapshot] = OrderedDict()
+        self._object_count = 0
+
+    def _drop(self, board_id: str):
+        self._object_count -= len(self._boards.pop(board_id).objects)
+
+    def _evict(self):
+        while self._boards and (len(self._boards) > self.max_boards or self._object_count > self.max_objects):
+            self._drop(next(iter(self._boards)))
+
+    def _live(self, board_id: str) -> _Snapshot | None:
+        snapshot = self._boards.get(board_id)
+        if snapshot is None:
+            return None
+        if snapshot.used_at + self.ttl <= time.time():
+            self._drop(board_id)
+            return None
+        snapshot.used_at = time.time()
+        self._boards.move_to_end(board_id)
+        return snapshot
+
+    def get(self, board_id: str) -> tuple[str, list[BoardObject]] | None:
+        snapshot = self._live(board_id)
+        if snapshot is None:
+            return None
+        return format_version(snapshot.digest), list(snapshot.objects.values())
+
+    def replace(self, board_id: str, objects: list[BoardObject]) -> tuple[str, list[BoardObject]]:
+        snapshot = _Snapshot()
+        for obj in objects:
+            snapshot.upsert(obj)
+        if board_id in self._boards:
+            self._drop(board_id)
+        self._boards[board_id] = snapshot
+        self._object_count += len(snapshot.objects)
+        self._evict()
+        return format_version(snapshot.digest), list(snapshot.objects.values())
+
+    def apply_delta(
+        self,
+        board_id: str,
+        base_version: str,
+        upserted: list[BoardObject],
+        removed: list[str],
+    ) -> tuple[str, list[BoardObject]]:
+        snapshot = self._live(board_id)
+        if snapshot is None or format_version(snapshot.digest) != base_version:
+            raise StaleSnapshotError(board_id)
+        self._object_count -= len(snapshot.objects)
+        for object_id in removed:
+            snapshot.remove(object_id)
+        for obj in upserted:
+            snapshot.upsert(obj)
+        self._object_count += len(snapshot.objects)
+        self._evict()
+        return format_version(snapshot.digest), list(snapshot.objects.values())
+
+
+class SqliteBoardStore(BoardStore):
+    """File-backed store, one row per object so deltas touch only what changed."""
+
+    def __init__(self, path: str, max_boards: int, max_objects: int, ttl: float):
+        self.max_boards = max_boards
+        self.max_objects = max_objects
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS boards ("
+            "board_id TEXT PRIMARY KEY, version TEXT NOT NULL, used_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS board_objects ("
+            "board_id TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, digest TEXT NOT NULL, "
+            "PRIMARY KEY (board_id, id));"
+        )
+        self._conn.commit()
+
+    def _version(self, board_id: str, now: float) -> str | None:
+        row = self._conn.execute(
+            "SELECT version, used_at FROM boards WHERE board_id = ?", (board_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] + self.ttl <= now:
+            self._delete(board_id)
+            return None
+        self._conn.execute("UPDATE boards SET used_at = ? WHERE board_id = ?", (now, board_id))
+        return row[0]
+
+    def _objects(self, board_id: str) -> list[BoardObject]:
+        rows = self._conn.execute(
+            "SELECT data FROM board_objects WHERE board_id = ? ORDER BY rowid", (board_id,)
+        ).fetchall()
+        return [BoardObject.model_validate_json(row[0]) for row in rows]
+
+    def _delete(self, board_id: str):
+        self._conn.execute("DELETE FROM board_objects WHERE board_id = ?", (board_id,))
+        self._conn.execute("DELETE FROM boards WHERE board_id = ?", (board_id,))
+
+    def _upsert(self, board_id: str, objects: list[BoardObject]):
+        self._conn.executemany(
+            "INSERT INTO board_objects (board_id, id, data, digest) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (board_id, id) DO UPDATE SET data = excluded.data, digest = excluded.digest",
+            [
+                (board_id, obj.id, to_json(obj, exclude_none=True).decode(), format_version(object_digest(obj)))
+                for obj in objects
+            ],
+        )
+
+    def _evict(self, now: float):
+        """Drop expired boards, and the least recently used ones beyond
+        `max_boards` boards or `max_objects` objects in total."""
+        rows = self._conn.execute(
+            "SELECT b.board_id, b.used_at, COUNT(o.id) FROM boards b "
+            "LEFT JOIN board_objects o ON o.board_id = b.board_id "
+            "GROUP BY b.board_id ORDER BY b.used_at DESC"
+        ).fetchall()
+        boards = objects = 0
+        full = False
+        for board_id, used_at, count in rows:
+            full = full or boards >= self.max_boards or objects + count > self.max_objects
+            if full or used_at + self.ttl <= now:
+                self._delete(board_id)
+            else:
+                boards += 1
+                objects += count
+
+    def get(self, board_id: str) -> tuple[str, list[BoardObject]] | None:
+        with self._lock:
+            version = self._version(board_id, time.time())
+            self._conn.commit()
+            if version is None:
+                return None
+            return version, self._objects(board_id)
+
+    def replace(self, board_id: str, objects: list[BoardObject]) -> tuple[str, list[BoardObject]]:
+        version = snapshot_version(objects)
+        now = time.time()
+        with self._lock:
+            self._delete(board_id)
+            self._upsert(board_id, objects)
+            self._conn.execute(
+                "INSERT INTO boards (board_id, version, used_at) VALUES (?, ?, ?)", (board_id, version, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+        return version, list(objects)
+
+    def apply_delta(
+        self,
+        board_id: str,
+        base_version: str,
+        upserted: list[BoardObject],
+        removed: list[str],
+    ) -> tuple[str, list[BoardObject]]:
+        now = time.time()
+        with self._lock:
+            if self._version(board_id, now) != base_version:
+                self._conn.commit()
+                raise StaleSnapshotError(board_id)
+
+            touched = list({*removed, *(obj.id for obj in upserted)})
+            digest = int(base_version, 16)
+            for start in range(0, len(touched), 500):
+                chunk = touched[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT digest FROM board_objects WHERE board_id = ? AND id IN ({','.join('?' * len(chunk))})",
+                    (board_id, *chunk),
+                ).fetchall()
+                for (old,) in rows:
+                    digest ^= int(old, 16)
+            upserted_ids = {obj.id for obj in upserted}
+            for obj in {obj.id: obj for obj in upserted}.values():
+                digest ^= object_digest(obj)
+
+            self._conn.executemany(
+                "DELETE FROM board_objects WHERE board_id = ? AND id = ?",
+                [(board_id, object_id) for object_id in removed if object_id not in upserted_ids],
+            )
+            self._upsert(board_id, upserted)
+            version = format_version(digest)
+            self._conn.execute("UPDATE boards SET version = ? WHERE board_id = ?", (version, board_id))
+            objects = self._objects(board_id)
+            self._evict(now)
+            self._conn.commit()
+            return version, objects
+
+
+def make_board_store(
+    backend: str, path: str, max_boards: int, max_objects: int, ttl: float,
+) -> BoardStore | None:
+    """Build the configured store, or None when deltas are disabled."""
+    if backend == "memory":
+        return InMemoryBoardStore(max_boards, max_objects, ttl)
+    if backend == "sqlite":
+        return SqliteBoardStore(path, max_boards, max_objects, ttl)
+    if backend in ("", "none"):
+        return None
+    raise ValueError(f"Unknown board store backend: {backend}")
@@ -0,0 +1,191 @@
+"""Vectorized generator for the bulkCreate tool.
+
+Types, colors, positions and sizes for a whole batch are sampled with NumPy
+in one pass, then turned into Actions (or, for large batches, into columnar
+createMany actions chunk by chunk). Placement is either
+uniform random within `area` or, with `nonOverlapping`, one object per
+randomly chosen cell of a jittered grid sized to the largest object.
+"""
+
+import logging
+from typing import Iterator
+
+import numpy as np
+
+from app.schemas import Action
+
+logger = logging.getLogger(__name__)
+
+COLORS = ["#FDE68A", "#FBCFE8", "#BFDBFE", "#BBF7D0", "#DDD6FE", "#FED7AA", "#FECACA", "#E5E7EB"]
+ALL_TYPES = ["stickyNote", "rectangle", "circle", "text", "line"]
+DEFAULT_AREA = {"x": 0, "y": 0, "width": 5000, "height": 3000}
+TEXT_COLOR = "#374151"
+
+# Inclusive random ranges for each sized property, per type.
+SIZE_RANGES = {
+    "stickyNote": {"width": (150, 250), "height": (120, 180)},
+    "rectangle": {"width": (80, 200), "height": (80, 200)},
+    "circle": {"radius": (30, 80)},
+    "text": {"fontSize": (14, 32), "width": (100, 300)},
+    "line": {"width": (80, 250), "strokeWidth": (2, 5)},
+}
+
+# Largest footprint (width, height) per type, used to size grid cells.
+MAX_EXTENT = {
+    "stickyNote": (250, 180),
+    "rectangle": (200, 200),
+    "circle": (160, 160),
+    "text": (300, 40),
+    "line": (250, 5),
+}
+
+CELL_GAP = 20
+CHUNK_SIZE = 1000
+
+
+def _grid_positions(rng: np.random.Generator, count: int, types: list[str], area: tuple) -> tuple:
+    """Top-left corners of `count` distinct jittered grid cells within (or below) the area."""
+    ax, ay, aw, ah = area
+    max_w = max(MAX_EXTENT[t][0] for t in types)
+    max_h = max(MAX_EXTENT[t][1] for t in types)
+    cell_w, cell_h = max_w + CELL_GAP, max_h + CELL_GAP
+    columns = max(1, int(aw // cell_w))
+    rows = max(1, int(ah // cell_h))
+    if columns * rows < count:
+        # The area can't hold them all without overlap; extend it downward.
+        rows = -(-count // columns)
+        logger.info(f"bulkCreate area too small for {count} non-overlapping objects; using {rows} rows")
+
+    cells = rng.choice(columns * rows, size=count, replace=False)
+    row, col = np.divmod(cells, columns)
+    jitter_x = rng.integers(0, CELL_GAP + 1, count)
+    jitter_y = rng.integers(0, CELL_GAP + 1, count)
+    return ax + col * cell_w + jitter_x, ay + row * cell_h + jitter_y
+
+
+def _sample(args: dict, count: int) -> dict[str, np.ndarray]:
+    types = [t for t in args.get("types") or ALL_TYPES if t in SIZE_RANGES] or ALL_TYPES
+    area = args.get("area") or DEFAULT_AREA
+    ax, ay = int(area.get("x", 0)), int(area.get("y", 0))
+    aw, ah = int(area.get("width", 5000)), int(area.get("height", 3000))
+    rng = np.random.default_rng(args.get("seed"))
+
+    type_idx = rng.integers(0, len(types), count)
+    columns = {
+        "type": np.array(types)[type_idx],
+        "color": np.array(COLORS)[rng.integers(0, len(COLORS), count)],
+    }
+    if args.get("nonOverlapping"):
+        columns["x"], columns["y"] = _grid_positions(rng, count, types, (ax, ay, aw, ah))
+    else:
+        columns["x"] = rng.integers(ax, ax + aw + 1, count)
+        columns["y"] = rng.integers(ay, ay + ah + 1, count)
+
+    for prop in ("width", "height", "radius", "fontSize", "strokeWidth"):
+        low = np.zeros(count, dtype=np.int64)
+        high = np.zeros(count, dtype=np.int64)
+        for i, t in enumerate(types):
+            if prop in SIZE_RANGES[t]:
+                mask = type_idx == i
+                low[mask], high[mask] = SIZE_RANGES[t][prop]
+        columns[prop] = rng.integers(low, high + 1)
+
+    if args.get("nonOverlapping"):
+        # Circles are positioned by their center.
+        is_circle = columns["type"] == "circle"
+        columns["x"] = np.where(is_circle, columns["x"] + columns["radius"], columns["x"])
+        columns["y"] = np.where(is_circle, columns["y"] + columns["radius"], columns["y"])
+    return columns
+
+
+def _props(obj_type: str, i: int, x, y, color, width, height, radius, font_size, stroke_width) -> dict:
+    if obj_type == "stickyNote":
+        return {"x": x, "y": y, "text": f"Note {i + 1}", "color": color,
+                "width": width, "height": height, "rotation": 0}
+    if obj_type == "rectangle":
+        return {"x": x, "y": y, "color": color, "width": width, "height": height, "rotation": 0}
+    if obj_type == "circle":
+        return {"x": x, "y": y, "color": color, "radius": radius, "rotation": 0}
+    if obj_type == "text":
+        return {"x": x, "y": y, "text": f"Text {i + 1}", "color": TEXT_COLOR,
+                "fontSize": font_size, "width": width, "rotation": 0}
+    return {"x": x, "y": y, "color": color, "width": width, "strokeWidth": stroke_width, "rotation": 0}
+
+
+def bulk_count(args: dict, max_count: int | None = None) -> int:
+    count = args.get("count")
+    count = max(0, int(50 if count is None else count))
+    if max_count is not None and count > max_count:
+        logger.warning(f"bulkCreate count {count} capped at {max_count}")
+        return max_count
+    return count
+
+
+def iter_bulk_create_many(
+    args: dict,
+    max_count: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Action]:
+    """Like generate_bulk_actions, but one columnar `createMany` action per chunk.
+
+    Builds the per-property arrays straight from the sampled columns, skipping
+    the per-object Action models entirely.
+    """
+    count = bulk_count(args, max_count)
+    if count == 0:
+        return
+    cols = _sample(args, count)
+    t = cols["type"]
+    uses = {
+        "width": t != "circle",
+        "height": (t == "stickyNote") | (t == "rectangle"),
+        "radius": t == "circle",
+        "fontSize": t == "text",
+        "strokeWidth": t == "line",
+    }
+    color = np.where(t == "text", TEXT_COLOR, cols["color"])
+    labels = np.where(t == "stickyNote", "Note ", np.where(t == "text", "Text ", ""))
+
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        columns = {
+            "type": t[start:stop].tolist(),
+            "x": cols["x"][start:stop].tolist(),
+            "y": cols["y"][start:stop].tolist(),
+            "color": color[start:stop].tolist(),
+            "text": [f"{label}{i + 1}" if label else None
+                     for i, label in zip(range(start, stop), labels[start:stop].tolist())],
+        }
+        for prop, mask in uses.items():
+            columns[prop] = [
+                value if used else None
+                for value, used in zip(cols[prop][start:stop].tolist(), mask[start:stop].tolist())
+            ]
+        object_type = None
+        if len(set(columns["type"])) == 1:
+            object_type = columns.pop("type")[0]
+        yield Action(type="createMany", objectType=object_type, properties={"rotation": 0}, columns=columns)
+
+
+def generate_bulk_actions(args: dict, max_count: int | None = None) -> list[Action]:
+    """Generate N random create actions programmatically.
+
+    `args` follows the bulkCreate tool schema, plus optional `seed` for
+    reproducible output and `nonOverlapping` for grid placement.
+    """
+    count = bulk_count(args, max_count)
+    if count == 0:
+        return []
+    cols = {name: arr.tolist() for name, arr in _sample(args, count).items()}
+    return [
+        Action(
+            type="create",
+            objectType=cols["type"][i],
+            properties=_props(
+                cols["type"][i], i, cols["x"][i], cols["y"][i], cols["color"][i],
+                cols["width"][i], cols["height"][i], cols["radius"][i],
+                cols["fontSize"][i], cols["strokeWidth"][i],
+            ),
+        )
+        for i in range(count)
+    ]
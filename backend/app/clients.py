@@ -0,0 +1,212 @@
+"""Process-wide clients for the OpenAI API and Firebase, created on first use.
+
+Importing `langfuse.openai` (which pulls in the OpenAI SDK) and
+`firebase_admin` takes most of the backend's import time, and on Cloud Run
+that time is paid on every cold start before the first request is served.
+Both are therefore imported lazily: `openai_client` and `firebase_auth` are
+proxies that import, configure and cache the real object the first time an
+attribute is read.
+
+Outbound OpenAI calls share one pooled `http_client` (httpx) whose
+connection limits, keep-alive, timeouts and HTTP/2 come from Settings, so
+bursts of commands reuse warm TLS connections instead of opening one per
+call. The app lifespan opens it at startup and closes it at shutdown; code
+running outside the app (tests, scripts) gets it created on first use.
+Firebase token verification keeps the SDK's own cached `requests` session,
+which only talks to the network when its certificates expire; it gets the
+configured timeout.
+
+`warmup` initializes everything on purpose, and also opens the OpenAI
+connection and fetches Firebase's token-signing certificates, so the first
+command does not pay for TLS handshakes or certificate downloads. It runs
+from the /warmup endpoint (e.g. as a Cloud Run startup probe) and, with
+`warmup_on_startup`, from the app lifespan.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+class Lazy:
+    """Proxy for an object built by `factory` on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def reset(self):
+        """Forget the target; the next access builds a new one."""
+        with self._lock:
+            self._target = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
+
+
+def http_timeout():
+    import httpx
+
+    return httpx.Timeout(
+        settings.openai_timeout_s, connect=settings.http_connect_timeout_s, pool=settings.http_pool_timeout_s,
+    )
+
+
+def _make_http_client():
+    import httpx
+
+    http2 = settings.http2_enabled
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("http2_enabled is set but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=http_timeout(),
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_s,
+        ),
+    )
+
+
+def _make_openai_client():
+    from langfuse.openai import AsyncOpenAI  # type: ignore
+
+    return AsyncOpenAI(api_key=settings.openai_api_key, timeout=http_timeout(), http_client=http_client.load())
+
+
+def _load_firebase_auth():
+    import firebase_admin
+    from firebase_admin import auth, credentials
+
+    # On Cloud Run this uses Application Default Credentials automatically.
+    # Locally, run: gcloud auth application-default login --project <project-id>
+    if not firebase_admin._apps:
+        cred = credentials.ApplicationDefault()
+        firebase_admin.initialize_app(
+            cred, {"projectId": settings.google_cloud_project, "httpTimeout": settings.firebase_timeout_s},
+        )
+    return auth
+
+
+http_client = Lazy(_make_http_client)
+openai_client = Lazy(_make_openai_client)
+firebase_auth = Lazy(_load_firebase_auth)
+
+
+def pool_stats() -> dict[str, int]:
+    """Connections of the shared HTTP client in use and idle, and requests
+    waiting for one; all 0 before it is created, or if the pool cannot be
+    inspected."""
+    empty = {"in_use": 0, "idle": 0, "waiters": 0}
+    if not http_client.loaded:
+        return empty
+    # httpx and httpcore do not expose pool state, so this reads their
+    # internals (httpcore is pinned in requirements.txt for that reason); a
+    # version that moves them reports zeros rather than failing /metrics.
+    try:
+        pool = http_client._transport._pool
+        idle = sum(1 for connection in pool.connections if connection.is_idle())
+        return {
+            "in_use": len(pool.connections) - idle,
+            "idle": idle,
+            "waiters": sum(1 for request in pool._requests if request.is_queued()),
+        }
+    except AttributeError:
+        return empty
+
+
+Gauge(
+    "ai_http_pool_connections", "Shared outbound HTTP client connections by state (in_use, idle)",
+    lambda: [({"state": state}, pool_stats()[state]) for state in ("in_use", "idle")],
+)
+Gauge(
+    "ai_http_pool_waiters", "Requests waiting for a connection from the shared HTTP client",
+    lambda: [({}, pool_stats()["waiters"])],
+)
+
+
+def open_clients():
+    """Create the shared HTTP client; called from the app lifespan."""
+    http_client.load()
+
+
+async def close_clients():
+    """Close the shared HTTP client (and the OpenAI client using it)."""
+    if http_client.loaded:
+        await http_client.aclose()
+    openai_client.reset()
+    http_client.reset()
+
+
+async def _open_openai_connection():
+    # A metadata lookup: free, checks the key, and leaves a warm connection.
+    await openai_client.with_options(max_retries=0).models.retrieve(settings.openai_model)
+
+
+# Public URL of the certificates Firebase ID tokens are signed with.
+FIREBASE_CERT_URI = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+# firebase_admin versions whose token verifier layout is known (see below).
+FIREBASE_VERIFIER_VERSIONS = ("6.",)
+
+
+def _prefetch_firebase_certs():
+    import firebase_admin
+
+    if firebase_admin.__version__.startswith(FIREBASE_VERIFIER_VERSIONS):
+        # verify_id_token downloads the certificates through this private
+        # cache-control session; filling it now spares the first request.
+        request = firebase_auth._get_client(None)._token_verifier.request
+    else:
+        # Unknown layout: a plain fetch still warms DNS and TLS to the host.
+        from google.auth.transport.requests import Request
+
+        request = Request()
+    response = request(FIREBASE_CERT_URI, timeout=settings.firebase_timeout_s)
+    if response.status != 200:
+        raise OSError(f"Fetching Firebase certificates returned HTTP {response.status}")
+
+
+async def warmup() -> dict[str, dict]:
+    """Initialize the clients and open their connections; never raises.
+
+    Returns per step whether it succeeded and how long it took.
+    """
+    steps = {
+        "openai_client": lambda: asyncio.to_thread(openai_client.load),
+        "openai_connection": _open_openai_connection,
+        "firebase_app": lambda: asyncio.to_thread(firebase_auth.load),
+        "firebase_certs": lambda: asyncio.to_thread(_prefetch_firebase_certs),
+    }
+    report = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            await step()
+            report[name] = {"ok": True}
+        except Exception as e:
+            logger.warning(f"Warmup step {name} failed: {e}")
+            report[name] = {"ok": False, "error": str(e)}
+        report[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
@@ -0,0 +1,133 @@
+"""Single-flight coalescing of identical concurrent commands.
+
+A command is keyed by its board, normalized text and board fingerprint, and
+additionally by the client's idempotency key when one is sent. The first
+request for a key runs the command; requests that arrive with the same key
+while it is in flight await its result instead of calling the model again.
+Results for idempotency keys are remembered for a while after completion, so
+a client retrying after a timeout gets the original response back rather
+than a second execution.
+"""
+
+import asyncio
+import hashlib
+import json
+
+from app.metrics import Counter
+from app.response_cache import InMemoryResponseCache, normalize_command
+
+coalesced_requests = Counter(
+    "ai_coalesced_requests_total", "Requests answered with another request's result, by kind (inflight/replay)",
+)
+
+
+def command_key(board_id: str, command: str, fingerprint: str) -> str:
+    raw = json.dumps(["command", board_id, normalize_command(command), fingerprint])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def idempotency_key(uid: str, board_id: str, key: str) -> str:
+    """Client keys are scoped to the user and board that sent them."""
+    raw = json.dumps(["idempotency", uid, board_id, key])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class Flight:
+    """One in-flight call: the keys it is registered under, the key its
+    result is remembered under (if any), and the future followers await."""
+
+    def __init__(self, keys: list[str], remember: str | None):
+        self.keys = keys
+        self.remember = remember
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class SingleFlight:
+    """In-flight calls by key, plus remembered results for replayable keys.
+
+    Results are opaque to this class; None is reserved to mean "nothing to
+    share" (no call for the key, or its leader went away before finishing).
+    Exceptions of the `personal` types belong to the leader's caller (e.g.
+    its own rate limit) and are not shared: followers run the call
+    themselves instead.
+    """
+
+    def __init__(self, max_replays: int, replay_ttl: float, personal: tuple[type[BaseException], ...] = ()):
+        self._inflight: dict[str, Flight] = {}
+        self._replays = InMemoryResponseCache(max_replays, replay_ttl)
+        self.personal = personal
+
+    async def join(self, keys: list[str]) -> tuple[object, str] | None:
+        """The result of a remembered or in-flight call under any of `keys`,
+        with the key it matched; None if there is nothing to share.
+
+        Re-raises the leader's exception when its call failed, unless it is
+        one of the `personal` types.
+        """
+        for key in keys:
+            replay = self._replays.get(key)
+            if replay is not None:
+                coalesced_requests.inc(kind="replay")
+                return replay, key
+        for key in keys:
+            flight = self._inflight.get(key)
+            if flight is None:
+                continue
+            result = await asyncio.shield(flight.future)
+            if result is not None:
+                coalesced_requests.inc(kind="inflight")
+                return result, key
+        return None
+
+    def lead(self, keys: list[str], remember: str | None = None) -> Flight:
+        """Register a call under `keys`; settle it with `settle` when done."""
+        flight = Flight(keys, remember)
+        for key in keys:
+            self._inflight[key] = flight
+        return flight
+
+    def settle(self, flight: Flight, result=None, error: BaseException | None = None):
+        """Hand `result` (or `error`) to everyone waiting on `flight`.
+
+        Settling without either marks the flight abandoned: waiters get None
+        and run the command themselves.
+        """
+        for key in flight.keys:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        if flight.future.done():
+            return
+        if isinstance(error, self.personal):
+            error = None  # Not the followers' failure: let them run it.
+        if error is not None:
+            flight.future.set_exception(error)
+            flight.future.exception()  # Retrieved here, so a flight nobody joined does not log it.
+            return
+        flight.future.set_result(result)
+        if result is not None and flight.remember:
+            self._replays.set(flight.remember, result)
+
+    async def run(self, keys: list[str], fn, remember: str | None = None) -> tuple[object, str | None]:
+        """Await `fn()` once per key: returns its result and the key it was
+        shared under, or None as the key when this call ran it.
+
+        The call runs as its own task, so followers still get the result if
+        the request that started it is cancelled.
+        """
+        shared = await self.join(keys)
+        if shared is not None:
+            return shared
+
+        flight = self.lead(keys, remember)
+
+        def done(task: asyncio.Task):
+            if task.cancelled():
+                self.settle(flight)
+            elif task.exception() is not None:
+                self.settle(flight, error=task.exception())
+            else:
+                self.settle(flight, task.result())
+
+        task = asyncio.ensure_future(fn())
+        task.add_done_callback(done)
+        return await asyncio.shield(task), None
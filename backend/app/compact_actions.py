@@ -0,0 +1,99 @@
+"""Compact encodings for large batches of actions.
+
+`deleteMany` carries an ID array instead of one delete per object.
+`createMany` is columnar: `properties` holds values shared by every object,
+`columns` holds one array per varying property (with a `type` column when
+types are mixed), and a None entry means the property is unset for that
+object. Both are expanded back to plain actions by the frontend.
+"""
+
+from app.schemas import Action
+
+
+def delete_many(object_ids: list[str]) -> Action:
+    return Action(type="deleteMany", objectIds=list(object_ids))
+
+
+def create_many(creates: list[Action]) -> Action:
+    """Columnar encoding of plain create actions."""
+    count = len(creates)
+    types = [a.objectType for a in creates]
+    keys: dict[str, None] = {}
+    for action in creates:
+        keys.update(dict.fromkeys(action.properties or {}))
+
+    shared, columns = {}, {}
+    for key in keys:
+        values = [(a.properties or {}).get(key) for a in creates]
+        if key not in ("x", "y") and None not in values and values.count(values[0]) == count:
+            shared[key] = values[0]
+        else:
+            columns[key] = values
+
+    object_type = types[0] if types.count(types[0]) == count else None
+    if object_type is None or not columns:
+        columns = {"type": types, **columns}
+    return Action(type="createMany", objectType=object_type, properties=shared, columns=columns)
+
+
+def _compactable_create(action: Action) -> bool:
+    return action.type == "create" and action.objectType != "connector" and action.tempId is None
+
+
+def compact_actions(actions: list[Action], threshold: int) -> list[Action]:
+    """Fold creates and deletes into createMany/deleteMany when a batch has at least `threshold` of them.
+
+    Connector creates, and creates other actions refer to by tempId, stay
+    individual. Each compacted action takes the position of the first action
+    it replaces.
+    """
+    creates = [a for a in actions if _compactable_create(a)]
+    deletes = [a for a in actions if a.type == "delete"]
+    compact_creates = len(creates) >= threshold
+    compact_deletes = len(deletes) >= threshold
+    if not (compact_creates or compact_deletes):
+        return actions
+
+    out = []
+    for action in actions:
+        if compact_creates and _compactable_create(action):
+            if action is creates[0]:
+                out.append(create_many(creates))
+        elif compact_deletes and action.type == "delete":
+            if action is deletes[0]:
+                out.append(delete_many([a.objectId for a in deletes]))
+        else:
+            out.append(action)
+    return out
+
+
+def object_count(actions: list[Action]) -> int:
+    """Objects the actions touch, counting each createMany/deleteMany entry."""
+    count = 0
+    for action in actions:
+        if action.type == "deleteMany":
+            count += len(action.objectIds or [])
+        elif action.type == "createMany":
+            count += len(next(iter((action.columns or {}).values()), []))
+        else:
+            count += 1
+    return count
+
+
+def expand_actions(actions: list[Action]) -> list[Action]:
+    """Inverse of compact_actions: plain create/update/delete actions only."""
+    out = []
+    for action in actions:
+        if action.type == "deleteMany":
+            out.extend(Action(type="delete", objectId=oid) for oid in action.objectIds or [])
+        elif action.type == "createMany":
+            columns = action.columns or {}
+            count = len(next(iter(columns.values()), []))
+            for i in range(count):
+                props = dict(action.properties or {})
+                props.update({k: v[i] for k, v in columns.items() if k != "type" and v[i] is not None})
+                obj_type = columns["type"][i] if "type" in columns else action.objectType
+                out.append(Action(type="create", objectType=obj_type, properties=props))
+        else:
+            out.append(action)
+    return out
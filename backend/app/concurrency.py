@@ -0,0 +1,47 @@
+import asyncio
+import contextlib
+
+
+class QueueFullError(Exception):
+    """Raised when the limiter's wait queue is already at capacity."""
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a caller waited longer than the queue timeout for a slot."""
+
+
+class ConcurrencyLimiter:
+    """Bound the number of in-flight LLM calls in this process.
+
+    Callers beyond `max_concurrency` wait in a queue of at most `max_queue`
+    entries for up to `queue_timeout` seconds; anything past that is rejected
+    immediately so the event loop never piles up unbounded work.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise QueueFullError(f"{self.waiting} requests already queued")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise QueueTimeoutError(f"No slot free after {self.queue_timeout}s")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
@@ -4,9 +4,109 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     openai_api_key: str
     openai_model: str = "gpt-4-turbo"
+    # Model for commands routed as simple; empty disables routing
+    openai_fast_model: str = "gpt-4o-mini"
+    # Boards with more objects than this always use openai_model
+    routing_max_board_objects: int = 500
     google_cloud_project: str = "collabboard-487701"
     allowed_origins: list[str] = ["http://localhost:5173"]
 
+    # Shared outbound HTTP client for OpenAI calls (see app.clients). Size the
+    # pool above ai_max_concurrency: a streaming command holds a connection
+    # for its whole reply. HTTP/2 needs the h2 package (httpx[http2])
+    http_max_connections: int = 64
+    http_max_keepalive_connections: int = 32
+    http_keepalive_expiry_s: float = 120.0
+    http_connect_timeout_s: float = 5.0
+    http_pool_timeout_s: float = 10.0
+    http2_enabled: bool = False
+    # Firebase certificate fetches during token verification
+    firebase_timeout_s: float = 10.0
+
+    # Create clients and open connections in the app lifespan instead of on
+    # the first request (see app.clients); /warmup does the same on demand
+    warmup_on_startup: bool = False
+    # Bearer token for /warmup and /metrics (set it in the startup probe's and
+    # the scraper's httpHeaders); empty disables both endpoints, since the
+    # service is publicly invokable and /warmup makes outbound calls
+    ops_token: str = ""
+
+    # LLM call concurrency (per process); openai_timeout_s is the read timeout
+    openai_timeout_s: float = 60.0
+    ai_max_concurrency: int = 32
+    ai_max_queue: int = 64
+    ai_queue_timeout_s: float = 10.0
+
+    # Answer commands in the fast-path grammar without calling the LLM
+    fast_path_enabled: bool = True
+
+    # Agent loop: follow-up LLM rounds for read-only lookups
+    ai_max_rounds: int = 4
+    ai_loop_budget_s: float = 45.0
+
+    # max_tokens is sized per command within these bounds; a reply cut off
+    # at the limit is continued up to ai_max_continuations times. Prompts
+    # over the model's context window (ai_context_tokens for models not
+    # in app.token_budget) get a smaller board, else are rejected
+    ai_min_output_tokens: int = 512
+    ai_max_output_tokens: int = 4096
+    ai_max_continuations: int = 2
+    ai_context_tokens: int = 128000
+
+    # Tool calls still invalid after local fixes get one follow-up request
+    # listing just those calls; off drops them
+    tool_repair_enabled: bool = True
+    tool_repair_max_tokens: int = 1024
+
+    # Verified Firebase ID token cache
+    auth_cache_size: int = 4096
+    auth_cache_max_ttl_s: float = 600.0
+
+    # Estimated tokens the board state may take up in the prompt
+    board_context_token_budget: int = 8000
+
+    # Upper bound on objects a single bulkCreate call may generate
+    bulk_create_max_count: int = 10000
+
+    # Batches with at least this many creates/deletes use createMany/deleteMany
+    compact_actions_threshold: int = 200
+
+    # Opt-in LLM response cache: "none", "memory" or "sqlite"
+    response_cache_backend: str = "none"
+    response_cache_path: str = "response_cache.sqlite3"
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_s: float = 3600.0
+
+    # Admission control: "none" or "memory". Per-minute allowances per user
+    # and per board; requests are counted on arrival, estimated prompt tokens
+    # before each model call. 0 turns a limit off.
+    rate_limit_backend: str = "memory"
+    rate_limit_max_keys: int = 10000
+    rate_limit_user_requests_per_min: int = 30
+    rate_limit_user_tokens_per_min: int = 300000
+    rate_limit_board_requests_per_min: int = 60
+    rate_limit_board_tokens_per_min: int = 600000
+
+    # Commands on one board run in parallel unless their footprints conflict;
+    # conflicting ones wait up to board_queue_timeout_s
+    board_scheduler_enabled: bool = True
+    board_queue_timeout_s: float = 60.0
+
+    # Identical concurrent commands share one LLM call; responses to requests
+    # carrying an idempotency key are replayed to retries for idempotency_ttl_s
+    coalesce_commands: bool = True
+    idempotency_max_entries: int = 1000
+    idempotency_ttl_s: float = 600.0
+
+    # Per-board snapshots for delta uploads: "none", "memory" or "sqlite".
+    # Bounded by boards and by objects in total; a stored object takes
+    # roughly 1.7 KB in memory, so the default caps the store near 85 MB
+    board_store_backend: str = "memory"
+    board_store_path: str = "board_snapshots.sqlite3"
+    board_store_max_boards: int = 256
+    board_store_max_objects: int = 50_000
+    board_store_ttl_s: float = 3600.0
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,106 @@
+"""Deterministic parser for commands that need no model.
+
+A small grammar of unambiguous commands ("clear the board", "create 200
+random objects", "make all notes yellow") is turned into the same tool calls
+the model would make, so they resolve through the normal tool pipeline and
+produce identical actions in milliseconds with no tokens. Anything outside
+the grammar returns None and goes to the LLM.
+"""
+
+import json
+import re
+from types import SimpleNamespace
+
+from app.board_context import COLOR_HEX
+from app.bulk import ALL_TYPES
+from app.metrics import Counter
+from app.response_cache import normalize_command
+
+# Plural nouns -> object types they select or generate.
+TYPE_WORDS = {
+    "sticky notes": ["stickyNote"],
+    "stickies": ["stickyNote"],
+    "notes": ["stickyNote"],
+    "rectangles": ["rectangle"],
+    "boxes": ["rectangle"],
+    "circles": ["circle"],
+    "lines": ["line"],
+    "texts": ["text"],
+    "text labels": ["text"],
+    "labels": ["text"],
+    "frames": ["frame"],
+    "connectors": ["connector"],
+    "arrows": ["connector"],
+}
+ANY_WORDS = ("objects", "shapes", "items", "things", "everything")
+
+_TYPES = "|".join(sorted(map(re.escape, TYPE_WORDS), key=len, reverse=True))
+_ANY = "|".join(ANY_WORDS)
+_COLOR = "|".join(COLOR_HEX)
+
+CLEAR_RE = re.compile(
+    r"(clear|wipe|reset|empty)( the| this| my)? (board|canvas)"
+    r"|(delete|remove|erase) (everything|all( the)? (objects|items|things)|all)( on the (board|canvas))?"
+)
+BULK_RE = re.compile(rf"(create|add|generate|make) (?P<count>\d{{1,6}})( random)? (?P<what>{_TYPES}|{_ANY})")
+RECOLOR_RE = re.compile(
+    rf"(make|turn|color|colour|paint|change) (all( of)?( the)? |every |the )?(?P<what>{_TYPES}|{_ANY})"
+    rf"( to| into)? (?P<color>{_COLOR})"
+)
+
+_POLITE_RE = re.compile(r"^(please |can you |could you )+|( please)$")
+
+fast_path_hits = Counter("ai_fast_path_total", "Commands answered without the LLM, by rule")
+
+
+class FastPathCommand:
+    """A parsed command: grammar `rule`, synthetic `tool_calls`, and a
+    summary `message` with a `{count}` slot for the affected objects."""
+
+    def __init__(self, rule: str, tool_calls: list[SimpleNamespace], message: str):
+        self.rule = rule
+        self.tool_calls = tool_calls
+        self.message = message
+
+
+def _tool_call(name: str, args: dict) -> SimpleNamespace:
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+def _types(what: str) -> list[str] | None:
+    return TYPE_WORDS.get(what)
+
+
+def parse_command(command: str) -> FastPathCommand | None:
+    """Tool calls for a command in the fast-path grammar, or None."""
+    text = _POLITE_RE.sub("", normalize_command(command))
+
+    if CLEAR_RE.fullmatch(text):
+        parsed = FastPathCommand(
+            rule="clear",
+            tool_calls=[_tool_call("deleteAll", {})],
+            message="Cleared the board ({count} objects deleted).",
+        )
+    elif (match := BULK_RE.fullmatch(text)) and set(_types(match["what"]) or ()) <= set(ALL_TYPES):
+        args: dict = {"count": int(match["count"])}
+        if _types(match["what"]):
+            args["types"] = _types(match["what"])
+        parsed = FastPathCommand(
+            rule="bulkCreate", tool_calls=[_tool_call("bulkCreate", args)],
+            message=f"Created {{count}} {match['what']}.",
+        )
+    elif match := RECOLOR_RE.fullmatch(text):
+        selection = {"filter": {"types": _types(match["what"])}} if _types(match["what"]) else {}
+        parsed = FastPathCommand(
+            rule="recolor",
+            tool_calls=[
+                _tool_call("selectObjects", selection),
+                _tool_call("updateSelection", {"color": COLOR_HEX[match["color"]]}),
+            ],
+            message=f"Made {{count}} {match['what']} {match['color']}.",
+        )
+    else:
+        return None
+
+    fast_path_hits.inc(rule=parsed.rule)
+    return parsed
@@ -0,0 +1,239 @@
+"""Deterministic layout for grid, frame and template commands.
+
+The model names the objects (or a template) and the backend computes every
+coordinate, so "arrange these in a grid" or "create a SWOT analysis" is one
+tool call instead of one per object, and placements never overlap.
+"""
+
+import math
+
+from app.schemas import Action, BoardObject
+from app.spatial import BoardIndex, bounds
+
+GAP = 30
+FRAME_PADDING = 20
+FRAME_TITLE_SPACE = 40
+NOTE_WIDTH = 160
+NOTE_HEIGHT = 110
+DEFAULT_VIEWPORT = {"x": 600, "y": 400}
+
+# Template name -> (frame grid columns, frame width, frame height, sections).
+# Each section is (title, note color); frame borders use the default gray.
+TEMPLATES = {
+    "swot": (2, 420, 320, [
+        ("Strengths", "#BBF7D0"),
+        ("Weaknesses", "#FECACA"),
+        ("Opportunities", "#BFDBFE"),
+        ("Threats", "#FED7AA"),
+    ]),
+    "kanban": (3, 380, 560, [
+        ("To Do", "#FDE68A"),
+        ("In Progress", "#BFDBFE"),
+        ("Done", "#BBF7D0"),
+    ]),
+    "retro": (3, 380, 560, [
+        ("What Went Well", "#BBF7D0"),
+        ("What Didn't Go Well", "#FECACA"),
+        ("Action Items", "#BFDBFE"),
+    ]),
+}
+
+TEMPLATE_TITLES = {"swot": "SWOT Analysis", "kanban": "Kanban Board", "retro": "Retrospective"}
+
+
+def find_free_origin(
+    index: BoardIndex,
+    width: float,
+    height: float,
+    x: float,
+    y: float,
+    ignore: set[str] | None = None,
+    step: int = 200,
+    max_rings: int = 25,
+) -> tuple[float, float]:
+    """Top-left nearest to (x, y) where a width x height box overlaps nothing.
+
+    Searches square rings of `step` spacing around the preferred point and
+    falls back to the preferred point when the neighbourhood is full.
+    """
+    ignore = ignore or set()
+
+    def is_free(px: float, py: float) -> bool:
+        hits = index.query_region(px - GAP, py - GAP, width + 2 * GAP, height + 2 * GAP)
+        return not (hits - ignore)
+
+    for ring in range(max_rings + 1):
+        for i in range(-ring, ring + 1):
+            for j in range(-ring, ring + 1):
+                if max(abs(i), abs(j)) != ring:
+                    continue
+                px, py = x + i * step, y + j * step
+                if is_free(px, py):
+                    return px, py
+    return x, y
+
+
+def _grid_positions(count: int, columns: int, cell_w: float, cell_h: float, x: float, y: float):
+    for i in range(count):
+        row, col = divmod(i, columns)
+        yield x + col * cell_w, y + row * cell_h
+
+
+def _move_to(obj: BoardObject, left: float, top: float) -> Action:
+    """Move an object so its bounding box's top-left lands on (left, top)."""
+    x0, y0, _, _ = bounds(obj)
+    return Action(
+        type="update",
+        objectId=obj.id,
+        properties={"x": round(left + (obj.x or 0) - x0), "y": round(top + (obj.y or 0) - y0)},
+    )
+
+
+def arrange_grid(
+    objects: list[BoardObject],
+    index: BoardIndex,
+    columns: int | None = None,
+    gap: float = GAP,
+) -> list[Action]:
+    """Lay existing objects out in a uniform grid anchored at their current top-left."""
+    objects = [obj for obj in objects if obj.type != "connector"]
+    if not objects:
+        return []
+    boxes = [bounds(obj) for obj in objects]
+    cell_w = max(b[2] - b[0] for b in boxes) + gap
+    cell_h = max(b[3] - b[1] for b in boxes) + gap
+    columns = columns or math.ceil(math.sqrt(len(objects)))
+    rows = math.ceil(len(objects) / columns)
+
+    left, top = find_free_origin(
+        index,
+        columns * cell_w - gap,
+        rows * cell_h - gap,
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        ignore={obj.id for obj in objects},
+    )
+    return [
+        _move_to(obj, px, py)
+        for obj, (px, py) in zip(objects, _grid_positions(len(objects), columns, cell_w, cell_h, left, top))
+    ]
+
+
+def arrange_in_frame(
+    frame: BoardObject,
+    objects: list[BoardObject],
+    columns: int | None = None,
+    gap: float = GAP,
+) -> list[Action]:
+    """Grid objects inside a frame, growing the frame downward if they don't fit."""
+    objects = [obj for obj in objects if obj.type not in ("connector", "frame")]
+    if not objects:
+        return []
+    fx0, fy0, fx1, fy1 = bounds(frame)
+    boxes = [bounds(obj) for obj in objects]
+    cell_w = max(b[2] - b[0] for b in boxes) + gap
+    cell_h = max(b[3] - b[1] for b in boxes) + gap
+    inner_w = fx1 - fx0 - 2 * FRAME_PADDING
+    columns = columns or max(1, int((inner_w + gap) // cell_w))
+    rows = math.ceil(len(objects) / columns)
+
+    left, top = fx0 + FRAME_PADDING, fy0 + FRAME_TITLE_SPACE
+    actions = [
+        _move_to(obj, px, py)
+        for obj, (px, py) in zip(objects, _grid_positions(len(objects), columns, cell_w, cell_h, left, top))
+    ]
+
+    needed_w = FRAME_PADDING * 2 + columns * cell_w - gap
+    needed_h = FRAME_TITLE_SPACE + rows * cell_h - gap + FRAME_PADDING
+    resize = {}
+    if needed_w > fx1 - fx0:
+        resize["width"] = round(needed_w)
+    if needed_h > fy1 - fy0:
+        resize["height"] = round(needed_h)
+    if resize:
+        actions.append(Action(type="update", objectId=frame.id, properties=resize))
+    return actions
+
+
+def _frame_action(x: float, y: float, width: float, height: float, title: str) -> Action:
+    return Action(
+        type="create",
+        objectType="frame",
+        properties={
+            "x": round(x), "y": round(y), "width": round(width), "height": round(height),
+            "title": title, "color": "#6B7280", "rotation": 0, "zIndex": 0,
+        },
+    )
+
+
+def _note_action(x: float, y: float, text: str, color: str) -> Action:
+    return Action(
+        type="create",
+        objectType="stickyNote",
+        properties={
+            "x": round(x), "y": round(y), "text": text, "color": color,
+            "width": NOTE_WIDTH, "height": NOTE_HEIGHT, "rotation": 0,
+        },
+    )
+
+
+def create_template(
+    template: str,
+    index: BoardIndex,
+    viewport: dict | None = None,
+    title: str | None = None,
+    sections: list[str] | None = None,
+    items: dict[str, list[str]] | None = None,
+) -> list[Action]:
+    """Frames, headings and notes for a named template, centered on the viewport.
+
+    `sections` renames/replaces the template's sections (colors cycle);
+    `items` maps a section title to the sticky-note texts placed inside it.
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown template: {template}")
+    columns, frame_w, frame_h, defaults = TEMPLATES[template]
+    if sections:
+        palette = [color for _, color in defaults]
+        defaults = [(name, palette[i % len(palette)]) for i, name in enumerate(sections)]
+        if template != "swot":
+            columns = len(defaults)
+    items = {k.strip().lower(): v for k, v in (items or {}).items()}
+
+    note_cols = max(1, int((frame_w - 2 * FRAME_PADDING + GAP) // (NOTE_WIDTH + GAP)))
+    most_notes = max((len(items.get(name.lower(), [])) for name, _ in defaults), default=0)
+    note_rows = math.ceil(most_notes / note_cols)
+    frame_h = max(frame_h, FRAME_TITLE_SPACE + note_rows * (NOTE_HEIGHT + GAP) - GAP + FRAME_PADDING)
+
+    rows = math.ceil(len(defaults) / columns)
+    heading_h = 50
+    total_w = columns * (frame_w + GAP) - GAP
+    total_h = heading_h + rows * (frame_h + GAP) - GAP
+
+    viewport = viewport or DEFAULT_VIEWPORT
+    left, top = find_free_origin(
+        index, total_w, total_h,
+        viewport.get("x", 600) - total_w / 2,
+        viewport.get("y", 400) - total_h / 2,
+    )
+
+    actions = [Action(
+        type="create",
+        objectType="text",
+        properties={
+            "x": round(left), "y": round(top), "text": title or TEMPLATE_TITLES[template],
+            "fontSize": 28, "color": "#374151", "width": round(total_w), "rotation": 0,
+        },
+    )]
+    for i, (name, color) in enumerate(defaults):
+        row, col = divmod(i, columns)
+        fx = left + col * (frame_w + GAP)
+        fy = top + heading_h + row * (frame_h + GAP)
+        actions.append(_frame_action(fx, fy, frame_w, frame_h, name))
+        for (nx, ny), text in zip(
+            _grid_positions(len(items.get(name.lower(), [])), note_cols, NOTE_WIDTH + GAP, NOTE_HEIGHT + GAP,
+                            fx + FRAME_PADDING, fy + FRAME_TITLE_SPACE),
+            items.get(name.lower(), []),
+        ):
+            actions.append(_note_action(nx, ny, text, color))
+    return actions
@@ -0,0 +1,184 @@
+"""In-process counters and histograms for the AI endpoints.
+
+Kept dependency-free and cheap to update from the request path (a lock and
+a list index per observation); values are per process (each Cloud Run
+instance reports its own). `render()` produces the Prometheus text format
+served at `/metrics`.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+REGISTRY: list = []
+
+# Seconds; spans range from sub-millisecond lookups to multi-second LLM calls.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 10000)
+
+
+def _labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels, e.g. `c.inc(5, kind="cached")`."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines.extend(f"{self.name}{_labels(key)} {value:g}" for key, value in self._values.items())
+        return lines
+
+
+class Histogram:
+    """Bucketed distribution with optional labels, e.g. `h.observe(0.2, stage="llm")`."""
+
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # labels -> per-bucket counts (last one is +Inf), then the sum
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return sum(series[:-1]) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[-1] if series else 0.0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, n in zip((*(f"{b:g}" for b in self.buckets), "+Inf"), series[:-1]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(key, (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time values read when rendered: `collect()` returns
+    `[(labels, value), ...]`, e.g. `[({"state": "idle"}, 3)]`."""
+
+    def __init__(self, name: str, help: str, collect):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        REGISTRY.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines.extend(
+            f"{self.name}{_labels(tuple(sorted(labels.items())))} {value:g}" for labels, value in self.collect()
+        )
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+requests_total = Counter("ai_requests_total", "AI command requests by endpoint and status")
+request_errors = Counter("ai_request_errors_total", "AI command requests that failed, by endpoint and status")
+request_seconds = Histogram("ai_request_seconds", "AI command handling time by endpoint")
+stage_seconds = Histogram(
+    "ai_stage_seconds",
+    "Time per request stage: auth, validation, board_queue, prompt_build, preflight, ttft, llm, tool_conversion, serialization",
+)
+tool_calls_per_request = Histogram("ai_tool_calls_per_request", "Tool calls the model made per command", COUNT_BUCKETS)
+actions_per_response = Histogram("ai_actions_per_response", "Objects touched by the returned actions", COUNT_BUCKETS)
+
+llm_requests = Counter("ai_llm_requests_total", "Chat completion calls that reported usage")
+prompt_tokens = Counter("ai_prompt_tokens_total", "Prompt tokens by provider prefix-cache status (cached/uncached)")
+completion_tokens = Counter("ai_completion_tokens_total", "Completion tokens generated")
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block into `ai_stage_seconds{stage=...}`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
+
+
+@contextmanager
+def track_request(endpoint: str):
+    """Count and time one request.
+
+    The status is taken from a raised HTTPException (500 for other errors),
+    or set on the yielded object by handlers that report errors in-band.
+    """
+    start = time.perf_counter()
+    outcome = SimpleNamespace(status="200")
+    try:
+        yield outcome
+    except Exception as e:
+        outcome.status = str(getattr(e, "status_code", 500))
+        raise
+    finally:
+        status = outcome.status
+        requests_total.inc(endpoint=endpoint, status=status)
+        if status != "200":
+            request_errors.inc(endpoint=endpoint, status=status)
+        request_seconds.observe(time.perf_counter() - start, endpoint=endpoint)
+
+
+def record_usage(usage) -> None:
+    """Count prompt tokens served from the provider's prefix cache vs. not.
+
+    `usage` is the OpenAI usage object (None when the provider omitted it);
+    `prompt_tokens_details.cached_tokens` is missing on older models.
+    """
+    if usage is None:
+        return
+    total = int(getattr(usage, "prompt_tokens", 0) or 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = int(getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    llm_requests.inc()
+    prompt_tokens.inc(cached, kind="cached")
+    prompt_tokens.inc(total - cached, kind="uncached")
+    completion_tokens.inc(int(getattr(usage, "completion_tokens", 0) or 0))
@@ -0,0 +1,97 @@
+"""Pick the fast or the strong model for a command with cheap local rules.
+
+Commands are matched against keyword patterns keyed by the tool they would
+most likely need. Anything that looks like a template, layout, diagram or
+multi-step request, is long, targets a large board, or matches nothing goes
+to the strong model; single edits and creates go to the fast one. Fast-model
+output that is unusable (no tool calls, unknown tools, malformed arguments)
+is retried on the strong model by the caller.
+"""
+
+import logging
+import re
+
+from pydantic import BaseModel
+
+from app.board_context import COLOR_PATTERN
+from app.metrics import Counter
+from app.tool_validation import check_tool_call
+
+logger = logging.getLogger(__name__)
+
+_SHAPES = r"(note|sticky|rectangle|square|circle|text|label|heading|line|frame)"
+
+# Tool name -> pattern for commands that need the strong model.
+COMPLEX_PATTERNS = {
+    "createTemplate": r"\b(swot|kanban|retro|retrospective|template)\b",
+    "arrangeGrid": r"\b(arrange|grid|organi[sz]e|lay ?out|align|tidy|sort|cluster|group)\b",
+    "createConnector": r"\b(connect|arrows?|flow ?chart|diagram|link|tree|mind ?map)\b",
+    "multiStep": r"\b(then|after that|brainstorm|plan|journey|roadmap|ideas)\b",
+}
+
+# Tool name -> pattern for commands the fast model handles well.
+SIMPLE_PATTERNS = {
+    "bulkCreate": r"\b(create|add|generate|make)\s+\d+\b",
+    "deleteAll": r"\b(clear|wipe|delete|remove)\b.*\b(everything|all|board|canvas)\b",
+    "changeColor": rf"\b(make|turn|colou?r|paint|change)\b.*\b{COLOR_PATTERN}\b",
+    "deleteObject": r"\b(delete|remove)\b",
+    "moveObject": r"\bmove\b",
+    "resizeObject": r"\b(resize|bigger|smaller|larger|wider|taller|shrink|grow)\b",
+    "updateText": r"\b(rename|retitle|(change|update|edit|set) the (text|title))\b",
+    "createStickyNote": rf"\b(add|create|make|put|draw)\b.*\b(a|an|one)\b.*\b{_SHAPES}\b",
+}
+
+_COMPLEX_RE = {name: re.compile(pattern) for name, pattern in COMPLEX_PATTERNS.items()}
+_SIMPLE_RE = {name: re.compile(pattern) for name, pattern in SIMPLE_PATTERNS.items()}
+
+# Commands longer than this are treated as multi-step.
+MAX_SIMPLE_WORDS = 25
+
+model_routes = Counter("ai_model_routes_total", "Routing decisions by tier and rule")
+model_fallbacks = Counter("ai_model_fallbacks_total", "Fast-model responses retried on the strong model")
+
+
+class RouteDecision(BaseModel):
+    model: str
+    tier: str      # "fast" | "strong"
+    reason: str    # Matched tool pattern or rule, for logs and metrics
+
+
+def route_command(
+    command: str,
+    board_size: int,
+    fast_model: str,
+    strong_model: str,
+    max_board_objects: int,
+) -> RouteDecision:
+    """Choose a model for `command`; routing is off when `fast_model` is empty."""
+    text = command.lower()
+    if not fast_model or fast_model == strong_model:
+        decision = RouteDecision(model=strong_model, tier="strong", reason="routing disabled")
+    elif len(text.split()) > MAX_SIMPLE_WORDS:
+        decision = RouteDecision(model=strong_model, tier="strong", reason="long command")
+    elif board_size > max_board_objects:
+        decision = RouteDecision(model=strong_model, tier="strong", reason="large board")
+    else:
+        complex_match = next((name for name, rx in _COMPLEX_RE.items() if rx.search(text)), None)
+        simple_match = next((name for name, rx in _SIMPLE_RE.items() if rx.search(text)), None)
+        if complex_match:
+            decision = RouteDecision(model=strong_model, tier="strong", reason=complex_match)
+        elif simple_match:
+            decision = RouteDecision(model=fast_model, tier="fast", reason=simple_match)
+        else:
+            decision = RouteDecision(model=strong_model, tier="strong", reason="unrecognized")
+
+    model_routes.inc(tier=decision.tier, reason=decision.reason)
+    logger.info(f"Routed command to {decision.model} ({decision.tier}: {decision.reason})")
+    return decision
+
+
+def usable_output(tool_calls, allow_empty: bool = False) -> bool:
+    """Whether a response's tool calls all pass app.tool_validation, after
+    its local fixes (and, unless `allow_empty`, whether there is at least
+    one). Fenced JSON, string numbers and the like do not need the strong
+    model."""
+    if not tool_calls:
+        return allow_empty
+    return all(check_tool_call(tc, count=False).ok for tc in tool_calls)
@@ -0,0 +1,135 @@
+"""Admission control for AI commands, per user and per board.
+
+Each user and each board has two token buckets: requests per minute, checked
+as a command arrives, and estimated prompt tokens per minute, checked once
+the prompt is built and before the model is called. A bucket holds up to
+one minute's allowance and refills continuously; a command is admitted only
+if every bucket it draws from can pay, otherwise it is rejected at once with
+the time until it would fit.
+
+Buckets live behind RateLimitStore so a shared store (e.g. Redis running
+the same refill arithmetic in a script) can replace the in-process one when
+several instances serve the same users.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from app.metrics import Counter
+
+rate_limited = Counter("ai_rate_limited_total", "Commands rejected by admission control, by limit")
+
+
+class RateLimitedError(Exception):
+    """Raised when a command exceeds a limit; `retry_after` is in seconds."""
+
+    def __init__(self, limit: str, retry_after: float):
+        super().__init__(f"{limit} limit exceeded, retry in {retry_after:.1f}s")
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class RateLimitStore(ABC):
+    """Interface: `acquire` takes from every bucket or from none.
+
+    Buckets are `(key, capacity, cost)`; each refills at `capacity` per
+    minute up to `capacity`. Returns, per bucket, the seconds until it could
+    pay its cost; the costs were taken only if all of them are 0.
+    """
+
+    @abstractmethod
+    def acquire(self, buckets: list[tuple[str, float, float]]) -> list[float]:
+        ...
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Buckets in an LRU of at most `max_keys`; an evicted bucket comes back full."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # key -> (level, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets: list[tuple[str, float, float]]) -> list[float]:
+        now = time.monotonic()
+        with self._lock:
+            levels, waits = [], []
+            for key, capacity, cost in buckets:
+                level, updated_at = self._buckets.get(key, (capacity, now))
+                rate = capacity / 60
+                level = min(capacity, level + (now - updated_at) * rate)
+                levels.append(level)
+                waits.append(max(0.0, (cost - level) / rate))
+            if any(waits):
+                return waits
+            for (key, _, cost), level in zip(buckets, levels):
+                self._buckets[key] = (level - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return waits
+
+
+class RateLimiter:
+    """Per-user and per-board limits over a RateLimitStore; a limit of 0 is off."""
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        user_requests: int,
+        user_tokens: int,
+        board_requests: int,
+        board_tokens: int,
+    ):
+        self.store = store
+        self.limits = {
+            "user_requests": user_requests,
+            "user_tokens": user_tokens,
+            "board_requests": board_requests,
+            "board_tokens": board_tokens,
+        }
+
+    def _acquire(self, kind: str, uid: str, board_id: str, cost: float):
+        buckets, names = [], []
+        for scope, key in (("user", uid), ("board", board_id)):
+            name = f"{scope}_{kind}"
+            capacity = self.limits[name]
+            if capacity > 0:
+                # A cost above the whole allowance is admitted from a full bucket.
+                buckets.append((f"{name}:{key}", capacity, min(cost, capacity)))
+                names.append(name)
+        if not buckets:
+            return
+        waits = self.store.acquire(buckets)
+        if any(waits):
+            wait, limit = max(zip(waits, names))
+            rate_limited.inc(limit=limit)
+            raise RateLimitedError(limit, wait)
+
+    def admit_request(self, uid: str, board_id: str):
+        """Count one command against the request limits."""
+        self._acquire("requests", uid, board_id, 1)
+
+    def admit_tokens(self, uid: str, board_id: str, tokens: int):
+        """Charge a prompt's estimated tokens against the token limits."""
+        self._acquire("tokens", uid, board_id, tokens)
+
+
+def make_rate_limiter(
+    backend: str,
+    max_keys: int,
+    user_requests: int,
+    user_tokens: int,
+    board_requests: int,
+    board_tokens: int,
+) -> RateLimiter | None:
+    """Build the configured limiter, or None when admission control is off."""
+    if backend == "memory":
+        store = InMemoryRateLimitStore(max_keys)
+    elif backend in ("", "none"):
+        return None
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return RateLimiter(store, user_requests, user_tokens, board_requests, board_tokens)
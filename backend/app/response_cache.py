@@ -0,0 +1,137 @@
+"""Opt-in cache of LLM tool-call responses for repeated commands.
+
+Keys combine the normalized command, the model, a fingerprint of the
+compacted board state and a coarse viewport bucket. Values are the raw tool
+calls plus summary message — not resolved actions — so server-side tools
+(bulkCreate, layouts, selections) are re-run against the live board on a hit.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from app.board_context import compact_board
+from app.schemas import BoardObject
+
+VIEWPORT_BUCKET = 500
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_command(command: str) -> str:
+    return _WS_RE.sub(" ", command.strip().lower()).rstrip(".!?")
+
+
+def board_fingerprint(board_state: list[BoardObject]) -> str:
+    objects, edges = compact_board(sorted(board_state, key=lambda o: o.id))
+    payload = json.dumps([objects, edges], separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_key(command: str, model: str, board_state: list[BoardObject], viewport: dict | None) -> str:
+    bucket = None
+    if viewport:
+        bucket = (
+            round(viewport.get("x", 0) / VIEWPORT_BUCKET),
+            round(viewport.get("y", 0) / VIEWPORT_BUCKET),
+        )
+    raw = json.dumps([normalize_command(command), model, board_fingerprint(board_state), bucket])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Interface: `get` returns the stored entry or None; `set` stores one."""
+
+    @abstractmethod
+    def get(self, key: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: dict) -> None:
+        ...
+
+
+class InMemoryResponseCache(ResponseCache):
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SqliteResponseCache(ResponseCache):
+    """File-backed cache; survives restarts and can be shared by local workers."""
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+def make_response_cache(backend: str, path: str, max_entries: int, ttl: float) -> ResponseCache | None:
+    """Build the configured cache, or None when caching is disabled."""
+    if backend == "memory":
+        return InMemoryResponseCache(max_entries, ttl)
+    if backend == "sqlite":
+        return SqliteResponseCache(path, max_entries, ttl)
+    if backend in ("", "none"):
+        return None
+    raise ValueError(f"Unknown response cache backend: {backend}")
@@ -1,23 +1,112 @@
 import json
 import logging
-import random
+import math
+import time
+from contextlib import ExitStack, nullcontext
+from types import SimpleNamespace
 
 from fastapi import APIRouter, Depends, HTTPException
-from langfuse.openai import OpenAI # type: ignore
-from langfuse import observe
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
 
 from app.auth import verify_firebase_token
+from app.board_context import build_board_context, compact_object, estimate_tokens
+from app.board_scheduler import BoardScheduler, predict_footprint
+from app.board_store import StaleSnapshotError, make_board_store
+from app.clients import openai_client
+from app.bulk import bulk_count, generate_bulk_actions, iter_bulk_create_many
+from app.coalescing import SingleFlight, command_key, idempotency_key
+from app.compact_actions import compact_actions, delete_many, object_count
+from app.concurrency import ConcurrencyLimiter, QueueFullError, QueueTimeoutError
 from app.config import settings
+from app.fast_path import parse_command
+from app.layout import arrange_grid, arrange_in_frame, create_template
+from app.metrics import (
+    Counter,
+    actions_per_response,
+    record_usage,
+    span,
+    stage_seconds,
+    tool_calls_per_request,
+    track_request,
+)
+from app.model_routing import model_fallbacks, route_command, usable_output
 from app.prompts import SYSTEM_PROMPT
-from app.schemas import AiCommandRequest, AiCommandResponse, Action
+from app.rate_limit import RateLimitedError, make_rate_limiter
+from app.response_cache import board_fingerprint, cache_key, make_response_cache
+from app.schemas import AiCommandRequest, AiCommandResponse, Action, BoardObject
+from app.serialization import FastJSONResponse, json_body
+from app.spatial import BoardIndex
+from app.token_budget import (
+    PromptTooLargeError,
+    complete_tool_calls,
+    context_window,
+    continuation_messages,
+    continuations,
+    count_prompt_tokens,
+    max_tokens_set,
+    output_budget,
+    prompt_tokens_estimated,
+    prompts_compacted,
+)
+from app.tool_registry import all_tools, select_tools
+from app.tool_validation import check_tool_call, check_tool_calls, repair_messages, tool_call_repairs
 from app.tools import TOOLS
 
 logger = logging.getLogger(__name__)
 
-COLORS = ["#FDE68A", "#FBCFE8", "#BFDBFE", "#BBF7D0", "#DDD6FE", "#FED7AA", "#FECACA", "#E5E7EB"]
+# Lookups answered from the board with no actions; the model gets another
+# round to act on their results.
+READ_ONLY_TOOLS = {"findObjects", "getFrameBounds"}
+
+# Tools expanded by resolve_tool_call rather than tool_call_to_action.
+SERVER_SIDE_TOOLS = {
+    "bulkCreate", "deleteAll", "selectObjects", "updateSelection",
+    "arrangeGrid", "arrangeInFrame", "createTemplate",
+} | READ_ONLY_TOOLS
+
+# Tools whose create action gets a `new-N` id later calls can reference.
+TEMP_ID_TOOLS = {"createStickyNote", "createShape", "createText", "createLine", "createFrame"}
+
+# Objects and ids returned to the model by lookup tools, at most.
+LOOKUP_LIMIT = 50
+
+tool_set_widened = Counter("ai_tool_set_widened_total", "Commands retried with all tools after a reduced set")
 
 router = APIRouter()
-client = OpenAI(api_key=settings.openai_api_key)
+client = openai_client
+limiter = ConcurrencyLimiter(
+    max_concurrency=settings.ai_max_concurrency,
+    max_queue=settings.ai_max_queue,
+    queue_timeout=settings.ai_queue_timeout_s,
+)
+response_cache = make_response_cache(
+    settings.response_cache_backend,
+    settings.response_cache_path,
+    settings.response_cache_max_entries,
+    settings.response_cache_ttl_s,
+)
+board_store = make_board_store(
+    settings.board_store_backend,
+    settings.board_store_path,
+    settings.board_store_max_boards,
+    settings.board_store_max_objects,
+    settings.board_store_ttl_s,
+)
+rate_limiter = make_rate_limiter(
+    settings.rate_limit_backend,
+    settings.rate_limit_max_keys,
+    settings.rate_limit_user_requests_per_min,
+    settings.rate_limit_user_tokens_per_min,
+    settings.rate_limit_board_requests_per_min,
+    settings.rate_limit_board_tokens_per_min,
+)
+scheduler = BoardScheduler(settings.board_queue_timeout_s) if settings.board_scheduler_enabled else None
+coalescer = (
+    # A leader's rate-limit rejection is about its user's budget, not the command.
+    SingleFlight(settings.idempotency_max_entries, settings.idempotency_ttl_s, personal=(RateLimitedError,))
+    if settings.coalesce_commands else None
+)
 
 
 def tool_call_to_action(tool_call) -> Action | None:
@@ -119,101 +208,864 @@ def tool_call_to_action(tool_call) -> Action | None:
         return Action(type="update", objectId=args["objectId"], properties={"color": args["color"]})
     elif name == "deleteObject":
         return Action(type="delete", objectId=args["objectId"])
-    elif name in ("bulkCreate", "deleteAll"):
-        # Handled separately in ai_command — return None as sentinel
+    elif name in SERVER_SIDE_TOOLS:
+        # Handled separately in resolve_tool_call — return None as sentinel
         return None
     else:
         raise ValueError(f"Unknown tool: {name}")
 
 
-def generate_bulk_actions(args: dict) -> list[Action]:
-    """Generate N random create actions programmatically."""
-    count = args.get("count", 50)
-    types = args.get("types", ["stickyNote", "rectangle", "circle", "text", "line"])
-    area = args.get("area", {"x": 0, "y": 0, "width": 5000, "height": 3000})
-    ax, ay, aw, ah = area.get("x", 0), area.get("y", 0), area.get("width", 5000), area.get("height", 3000)
+def selection_actions(args: dict, objects: list[BoardObject]) -> list[Action]:
+    """Expand an updateSelection call into one Action per selected object."""
+    if args.get("delete"):
+        return [Action(type="delete", objectId=obj.id) for obj in objects]
 
     actions = []
-    for i in range(count):
-        obj_type = random.choice(types)
-        color = random.choice(COLORS)
-        x = random.randint(int(ax), int(ax + aw))
-        y = random.randint(int(ay), int(ay + ah))
-
-        if obj_type == "stickyNote":
-            props = {"x": x, "y": y, "text": f"Note {i+1}", "color": color,
-                     "width": random.randint(150, 250), "height": random.randint(120, 180), "rotation": 0}
-        elif obj_type == "rectangle":
-            props = {"x": x, "y": y, "color": color,
-                     "width": random.randint(80, 200), "height": random.randint(80, 200), "rotation": 0}
-        elif obj_type == "circle":
-            props = {"x": x, "y": y, "color": color, "radius": random.randint(30, 80), "rotation": 0}
-        elif obj_type == "text":
-            props = {"x": x, "y": y, "text": f"Text {i+1}", "color": "#374151",
-                     "fontSize": random.randint(14, 32), "width": random.randint(100, 300), "rotation": 0}
-        elif obj_type == "line":
-            props = {"x": x, "y": y, "color": color,
-                     "width": random.randint(80, 250), "strokeWidth": random.randint(2, 5), "rotation": 0}
-        else:
-            continue
-        actions.append(Action(type="create", objectType=obj_type, properties=props))
+    for obj in objects:
+        props = {}
+        if ("dx" in args or "dy" in args) and obj.type != "connector":
+            props["x"] = (obj.x or 0) + args.get("dx", 0)
+            props["y"] = (obj.y or 0) + args.get("dy", 0)
+        if "color" in args:
+            props["strokeColor" if obj.type == "connector" else "color"] = args["color"]
+        for key in ("width", "height"):
+            if key in args and obj.type not in ("circle", "connector"):
+                props[key] = args[key]
+        if props:
+            actions.append(Action(type="update", objectId=obj.id, properties=props))
     return actions
 
-@observe()
-@router.post("/command", response_model=AiCommandResponse)
-async def ai_command(request: AiCommandRequest, user: dict = Depends(verify_firebase_token)):
-    """Process a natural language AI command against the board."""
-    board_state_summary = json.dumps(
-        [obj.model_dump(exclude_none=True) for obj in request.boardState],
-        indent=None,
+
+class CommandContext:
+    """Per-request state shared by the tool calls of one command."""
+
+    def __init__(self, request: AiCommandRequest):
+        self.request = request
+        self.selections: dict[str, list[BoardObject]] = {}
+        self.created: dict[str, Action] = {}
+        self.ticket = None   # Board scheduler Ticket that reconciles stale actions, if scheduling
+        self._index: BoardIndex | None = None
+        self._temp_ids = 0
+        self._reserved: dict[str, str] = {}  # tool call id -> its `new-N` id
+
+    def _next_temp_id(self) -> str:
+        self._temp_ids += 1
+        return f"new-{self._temp_ids}"
+
+    def reserve_temp_id(self, tool_call):
+        """Hold the next `new-N` id for a create call, in the order the model
+        made its calls, so a call resolved later (after a repair) still gets
+        the id the model meant and the creates after it keep theirs."""
+        call_id = getattr(tool_call, "id", None)
+        if call_id and tool_call.function.name in TEMP_ID_TOOLS and call_id not in self._reserved:
+            self._reserved[call_id] = self._next_temp_id()
+
+    def hand_over_temp_id(self, broken_call, repaired_call):
+        """Give a repaired call the id reserved for the call it replaces."""
+        reserved = self._reserved.pop(getattr(broken_call, "id", None), None)
+        if reserved and getattr(repaired_call, "id", None):
+            self._reserved[repaired_call.id] = reserved
+
+    def assign_temp_id(self, action: Action, call_id: str | None = None):
+        """Give a create action its reserved (or else the next) `new-N` id so
+        later calls can reference it."""
+        action.tempId = self._reserved.pop(call_id, None) or self._next_temp_id()
+        self.created[action.tempId] = action
+
+    @property
+    def index(self) -> BoardIndex:
+        if self._index is None:
+            self._index = BoardIndex(self.request.boardState)
+        return self._index
+
+    def targets(self, args: dict) -> list[BoardObject]:
+        """Objects a layout tool refers to, by `objectIds` or a named `selection`."""
+        if args.get("objectIds"):
+            return [self.index.by_id[oid] for oid in args["objectIds"] if oid in self.index.by_id]
+        return self.selections.get(args.get("selection") or "selection", [])
+
+
+def build_board_message(request: AiCommandRequest, token_budget: int | None = None) -> str:
+    """Render the board state for the prompt.
+
+    Sent as its own message ahead of the command so that, together with the
+    system prompt and tools, it forms a prefix that is byte-identical across
+    commands on an unchanged board and can be served from the provider's
+    prompt cache.
+    """
+    board_state_summary = build_board_context(
+        request.boardState,
+        request.command,
+        request.viewportCenter,
+        token_budget or settings.board_context_token_budget,
     )
+    return f"Board state (current objects on the board):\n{board_state_summary}"
 
+
+def build_user_message(request: AiCommandRequest) -> str:
+    """Render the viewport and command, the per-request tail of the prompt."""
     viewport = json.dumps(request.viewportCenter) if request.viewportCenter else "not provided, use (600, 400) as default center"
 
-    user_message = (
-        f"Board state (current objects on the board):\n{board_state_summary}\n\n"
+    return (
         f"Viewport center: {viewport}\n\n"
         f"User command: {request.command}"
     )
 
-    try:
-        response = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_message},
+
+def choose_model(request: AiCommandRequest) -> str:
+    return route_command(
+        request.command,
+        len(request.boardState),
+        settings.openai_fast_model,
+        settings.openai_model,
+        settings.routing_max_board_objects,
+    ).model
+
+
+def completion_kwargs(request: AiCommandRequest, model: str | None = None) -> dict:
+    """Arguments for chat.completions.create shared by the plain and streaming endpoints.
+
+    Ordered most-stable first (tools, system prompt, board, then command) to
+    maximize the cacheable prompt prefix. Only the tool groups the command
+    needs are sent (see app.tool_registry).
+    """
+    return {
+        "model": model or settings.openai_model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_board_message(request)},
+            {"role": "user", "content": build_user_message(request)},
+        ],
+        "tools": select_tools(request.command, len(request.boardState)).tools,
+        "tool_choice": "auto",
+        "temperature": 0.3,
+        "max_tokens": settings.ai_max_output_tokens,
+    }
+
+
+def resolve_tool_call(tool_call, ctx: CommandContext) -> list[Action]:
+    """Expand one tool call into actions, including the tools handled server-side."""
+    name = tool_call.function.name
+    args = json.loads(tool_call.function.arguments)
+
+    if name == "bulkCreate":
+        if bulk_count(args) >= settings.compact_actions_threshold:
+            return list(iter_bulk_create_many(args, max_count=settings.bulk_create_max_count))
+        return generate_bulk_actions(args, max_count=settings.bulk_create_max_count)
+    if name == "deleteAll":
+        # Generate delete actions for all objects on the board
+        if len(ctx.request.boardState) >= settings.compact_actions_threshold:
+            return [delete_many([obj.id for obj in ctx.request.boardState])]
+        return [Action(type="delete", objectId=obj.id) for obj in ctx.request.boardState]
+    if name == "selectObjects":
+        selected = ctx.index.select(args.get("filter"), args.get("region"))
+        ctx.selections[args.get("name") or "selection"] = selected
+        logger.info(f"selectObjects matched {len(selected)} objects")
+        return []
+    if name == "updateSelection":
+        selected = ctx.selections.get(args.get("selection") or "selection", [])
+        return selection_actions(args, selected)
+    if name == "arrangeGrid":
+        return arrange_grid(ctx.targets(args), ctx.index, columns=args.get("columns"), gap=args.get("gap", 30))
+    if name == "arrangeInFrame":
+        frame = ctx.index.find_frame(args["frame"])
+        if frame is None:
+            raise ValueError(f"Unknown frame: {args['frame']}")
+        return arrange_in_frame(frame, ctx.targets(args), columns=args.get("columns"))
+    if name == "createTemplate":
+        return create_template(
+            args["template"],
+            ctx.index,
+            viewport=ctx.request.viewportCenter,
+            title=args.get("title"),
+            sections=args.get("sections"),
+            items=args.get("items"),
+        )
+    if name in READ_ONLY_TOOLS:
+        return []
+    action = tool_call_to_action(tool_call)
+    if action is None:
+        return []
+    if action.type == "create" and action.objectType != "connector":
+        ctx.assign_temp_id(action, getattr(tool_call, "id", None))
+    return [action]
+
+
+def _frame_result(ref: str, ctx: CommandContext) -> dict:
+    created = ctx.created.get(ref)
+    if created is not None and created.objectType == "frame":
+        props = created.properties or {}
+        return {"id": ref, **{k: props.get(k) for k in ("x", "y", "width", "height")}}
+    frame = ctx.index.find_frame(ref)
+    if frame is None:
+        return {"error": f"No frame matching {ref!r}"}
+    x0, y0, x1, y1 = ctx.index.frame_bounds(frame)
+    return {"id": frame.id, "x": round(x0), "y": round(y0), "width": round(x1 - x0), "height": round(y1 - y0)}
+
+
+def tool_result(tool_call, actions: list[Action], ctx: CommandContext) -> dict:
+    """What the model is told a tool call did, for the next round of the loop."""
+    name = tool_call.function.name
+    args = json.loads(tool_call.function.arguments)
+
+    if name == "findObjects":
+        matches = ctx.index.select(args.get("filter"), args.get("region"))
+        limit = min(int(args.get("limit") or LOOKUP_LIMIT), LOOKUP_LIMIT)
+        return {"count": len(matches), "objects": [compact_object(obj) for obj in matches[:limit]]}
+    if name == "getFrameBounds":
+        return _frame_result(args.get("frame", ""), ctx)
+    if name == "selectObjects":
+        selected = ctx.selections.get(args.get("name") or "selection", [])
+        return {"count": len(selected), "ids": [obj.id for obj in selected[:LOOKUP_LIMIT]]}
+
+    result: dict = {"actions": len(actions)}
+    created = [action.tempId for action in actions if action.tempId]
+    if created:
+        result["ids"] = created
+    return result
+
+
+async def complete(kwargs: dict, allow_empty: bool = False):
+    """One chat completion (its first choice); unusable fast-model output is
+    retried on the strong model.
+
+    A first round must call at least one tool; follow-up rounds may just
+    answer. On fallback `kwargs["model"]` is switched, so later rounds stay
+    on the strong model too.
+    """
+    async with limiter.slot():
+        with span("llm"):
+            response = await client.chat.completions.create(**kwargs)
+    record_usage(getattr(response, "usage", None))
+    choice = response.choices[0]
+    message = choice.message
+    if kwargs["model"] != settings.openai_model and not usable_output(message.tool_calls, allow_empty):
+        logger.warning(f"Unusable output from {kwargs['model']}, retrying on {settings.openai_model}")
+        model_fallbacks.inc()
+        kwargs["model"] = settings.openai_model
+        return await complete(kwargs, allow_empty)
+    if not allow_empty and not message.tool_calls and widen_tools(kwargs):
+        return await complete(kwargs, allow_empty)
+    return choice
+
+
+def continue_kwargs(kwargs: dict, tool_calls: list, content: str | None) -> dict:
+    """Arguments for continuing a reply that stopped at `max_tokens`, with
+    the full output allowance this time."""
+    return {
+        **kwargs,
+        "messages": kwargs["messages"] + continuation_messages(tool_calls, content),
+        "max_tokens": settings.ai_max_output_tokens,
+    }
+
+
+async def complete_round(kwargs: dict, allow_empty: bool = False):
+    """A round's message, continued while the model stops at `max_tokens`;
+    the segments' tool calls and text are merged into one message."""
+    choice = await complete(kwargs, allow_empty)
+    if choice.finish_reason != "length":
+        return choice.message
+    tool_calls, content = [], []
+    for continuation in range(settings.ai_max_continuations + 1):
+        if continuation:
+            logger.warning("Model reply cut off at max_tokens, continuing")
+            continuations.inc()
+            choice = await complete(continue_kwargs(kwargs, tool_calls, "".join(content)), allow_empty=True)
+        message = choice.message
+        content.append(message.content or "")
+        if choice.finish_reason != "length":
+            tool_calls.extend(message.tool_calls or [])
+            break
+        tool_calls.extend(complete_tool_calls(message.tool_calls))
+    return SimpleNamespace(content="".join(content) or None, tool_calls=tool_calls or None)
+
+
+def widen_tools(kwargs: dict) -> bool:
+    """Switch a call that was offered a subset of the tools to all of them.
+
+    Returns False if it already had them all.
+    """
+    if len(kwargs["tools"]) == len(TOOLS):
+        return False
+    logger.warning("No tool calls with the selected tool groups, retrying with all tools")
+    tool_set_widened.inc()
+    kwargs["tools"] = all_tools().tools
+    return True
+
+
+async def repair_tool_calls(kwargs: dict, accepted: list, broken: list, ctx: CommandContext) -> list:
+    """Corrected versions of `broken` calls, from one small follow-up request.
+
+    Only the broken calls are asked for again; whatever is still invalid
+    afterwards is dropped. A repaired call takes over the `new-N` id
+    reserved for the call it replaces.
+    """
+    for checked in broken:
+        logger.warning(f"Invalid {checked.original.function.name} call: {'; '.join(checked.errors)}")
+    if not settings.tool_repair_enabled:
+        tool_call_repairs.inc(len(broken), outcome="dropped")
+        return []
+    repair = {
+        **kwargs,
+        "messages": kwargs["messages"] + repair_messages(accepted, broken),
+        "max_tokens": settings.tool_repair_max_tokens,
+    }
+    message = (await complete(repair, allow_empty=True)).message
+    repaired, still_broken = check_tool_calls(message.tool_calls or [], ctx.request.viewportCenter)
+    repaired = repaired[:len(broken)]
+    for checked, tool_call in zip(broken, repaired):
+        ctx.hand_over_temp_id(checked.original, tool_call)
+    tool_call_repairs.inc(len(repaired), outcome="repaired")
+    if len(broken) > len(repaired):
+        tool_call_repairs.inc(len(broken) - len(repaired), outcome="dropped")
+    for checked in still_broken:
+        logger.warning(f"Dropped unrepaired {checked.original.function.name} call: {'; '.join(checked.errors)}")
+    return repaired
+
+
+def run_tool_calls(tool_calls, ctx: CommandContext) -> tuple[list[Action], list[dict]]:
+    """Resolve one round of tool calls in order: their actions and per-call results."""
+    actions, results = [], []
+    with span("tool_conversion"):
+        for tc in tool_calls:
+            try:
+                produced = resolve_tool_call(tc, ctx)
+                results.append(tool_result(tc, produced, ctx))
+                actions.extend(produced)
+            except Exception as e:
+                logger.error(f"Error processing tool call: {e}")
+                results.append({"error": str(e)})
+    return actions, results
+
+
+def needs_followup(tool_calls, round_no: int, started: float) -> bool:
+    """Whether to send tool results back for another round.
+
+    Only lookups need one; creates, edits and connectors to `new-N` ids all
+    resolve in the round that issued them. Bounded by the round and latency
+    budgets.
+    """
+    if not any(tc.function.name in READ_ONLY_TOOLS for tc in tool_calls):
+        return False
+    if round_no + 1 >= settings.ai_max_rounds:
+        logger.warning("Agent loop stopped: round budget exhausted")
+        return False
+    if time.monotonic() - started >= settings.ai_loop_budget_s:
+        logger.warning("Agent loop stopped: latency budget exhausted")
+        return False
+    return True
+
+
+def followup_messages(tool_calls, content: str | None, results: list[dict]) -> list[dict]:
+    """The assistant turn plus one tool message per call, to append to the conversation."""
+    return [
+        {
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {"id": tc.id, "type": "function",
+                 "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+                for tc in tool_calls
             ],
-            tools=TOOLS, # type: ignore
-            tool_choice="auto",
-            temperature=0.3,
-            max_tokens=4096,
+        },
+        *(
+            {"role": "tool", "tool_call_id": tc.id, "content": to_json(result).decode()}
+            for tc, result in zip(tool_calls, results)
+        ),
+    ]
+
+
+def too_many_requests(e: RateLimitedError) -> HTTPException:
+    retry_after = math.ceil(e.retry_after)
+    return HTTPException(
+        status_code=429,
+        detail=f"Rate limit exceeded, retry in {retry_after}s",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def admit_request(request: AiCommandRequest, user: dict):
+    """Count the command against the caller's and the board's request limits."""
+    if rate_limiter is None:
+        return
+    try:
+        rate_limiter.admit_request(user["uid"], request.boardId)
+    except RateLimitedError as e:
+        logger.warning(f"AI command rejected: {e}")
+        raise too_many_requests(e)
+
+
+def preflight(kwargs: dict, request: AiCommandRequest):
+    """Fit a built prompt to the model: set `max_tokens` for the command and,
+    if prompt plus minimum output would overflow the context window, shrink
+    the board message; raises PromptTooLargeError if that is not enough.
+    """
+    with span("preflight"):
+        context = context_window(kwargs["model"], settings.ai_context_tokens)
+        tokens = count_prompt_tokens(kwargs)
+        overflow = tokens + settings.ai_min_output_tokens - context
+        if overflow > 0:
+            board_tokens = estimate_tokens(kwargs["messages"][1]["content"])
+            if board_tokens - overflow > 0:
+                logger.warning(f"Prompt of ~{tokens} tokens over the context window, compacting the board")
+                prompts_compacted.inc()
+                kwargs["messages"][1]["content"] = build_board_message(request, board_tokens - overflow)
+                tokens = count_prompt_tokens(kwargs)
+            if tokens + settings.ai_min_output_tokens > context:
+                raise PromptTooLargeError(tokens, context)
+        kwargs["max_tokens"] = output_budget(
+            request.command, len(request.boardState), context - tokens,
+            settings.ai_min_output_tokens, settings.ai_max_output_tokens,
         )
+    prompt_tokens_estimated.observe(tokens)
+    max_tokens_set.observe(kwargs["max_tokens"])
+
 
-        message = response.choices[0].message
-        actions = []
+def admit_prompt(kwargs: dict, request: AiCommandRequest, uid: str):
+    """Charge the first round's estimated prompt tokens; raises RateLimitedError.
 
-        if message.tool_calls:
-            for tc in message.tool_calls:
+    Follow-up rounds are not charged: they are bounded by ai_max_rounds, and
+    rejecting one would discard actions already resolved.
+    """
+    if rate_limiter is None:
+        return
+    rate_limiter.admit_tokens(uid, request.boardId, count_prompt_tokens(kwargs))
+
+
+def resolve_board_state(request: AiCommandRequest) -> str | None:
+    """Fill in `request.boardState` from a full snapshot or a delta.
+
+    Returns the snapshot version the client should base its next delta on,
+    or None when the board store is disabled.
+    """
+    if request.boardDelta is not None:
+        if board_store is None:
+            raise HTTPException(status_code=400, detail="Board deltas are not enabled")
+        delta = request.boardDelta
+        try:
+            version, request.boardState = board_store.apply_delta(
+                request.boardId, delta.baseVersion, delta.upserted, delta.removed,
+            )
+        except StaleSnapshotError:
+            raise HTTPException(status_code=409, detail="Board snapshot out of date, resend boardState")
+        return version
+
+    if request.boardState is None:
+        raise HTTPException(status_code=422, detail="boardState or boardDelta is required")
+    if board_store is None:
+        return None
+    version, _ = board_store.replace(request.boardId, request.boardState)
+    return version
+
+
+def _cache_key(request: AiCommandRequest, model: str) -> str | None:
+    """Response-cache key of a command routed to `model`, or None without a cache."""
+    if response_cache is None:
+        return None
+    return cache_key(request.command, model, request.boardState, request.viewportCenter)
+
+
+def _cache_entry(tool_calls, message: str | None) -> dict:
+    return {
+        "tool_calls": [{"name": tc.function.name, "arguments": tc.function.arguments} for tc in tool_calls],
+        "message": message,
+    }
+
+
+def _cached_tool_calls(entry: dict) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(function=SimpleNamespace(name=tc["name"], arguments=tc["arguments"]))
+        for tc in entry["tool_calls"]
+    ]
+
+
+def run_fast_path(request: AiCommandRequest, ctx: CommandContext) -> tuple[list[Action], str] | None:
+    """Actions and summary for a command the local parser understands, else None."""
+    if not settings.fast_path_enabled:
+        return None
+    parsed = parse_command(request.command)
+    if parsed is None:
+        return None
+    actions, _ = run_tool_calls(parsed.tool_calls, ctx)
+    logger.info(f"AI command answered by fast path ({parsed.rule})")
+    return actions, parsed.message.format(count=object_count(actions))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {to_json(data, exclude_none=True).decode()}\n\n"
+
+
+def _action_events(actions: list[Action]) -> list[str]:
+    actions = compact_actions(actions, settings.compact_actions_threshold)
+    return [_sse("action", action) for action in actions]
+
+
+async def execute_command(request: AiCommandRequest, uid: str) -> tuple[list[Action], str]:
+    """Actions and summary for a command, from the fast path, the response
+    cache, or the model.
+
+    Runs the model in rounds: every round's tool calls are resolved
+    together, and only lookups (findObjects, getFrameBounds) send results
+    back for another round, up to the round and latency budgets.
+    """
+    ctx = CommandContext(request)
+    fast = run_fast_path(request, ctx)
+    if fast is not None:
+        return fast
+
+    model = choose_model(request)
+    key = _cache_key(request, model)
+    cached = response_cache.get(key) if key else None
+    if cached is not None:
+        logger.info("AI command served from response cache")
+        actions, _ = run_tool_calls(_cached_tool_calls(cached), ctx)
+        return actions, cached["message"] or "Done!"
+
+    with span("prompt_build"):
+        kwargs = completion_kwargs(request, model)
+    preflight(kwargs, request)
+    admit_prompt(kwargs, request, uid)
+    actions: list[Action] = []
+    all_calls, content, started = [], None, time.monotonic()
+    for round_no in range(settings.ai_max_rounds):
+        message = await complete_round(kwargs, allow_empty=round_no > 0)
+        for tool_call in message.tool_calls or []:
+            ctx.reserve_temp_id(tool_call)
+        tool_calls, broken = check_tool_calls(message.tool_calls or [], request.viewportCenter)
+        if broken:
+            tool_calls = tool_calls + await repair_tool_calls(kwargs, tool_calls, broken, ctx)
+        content = message.content or content
+
+        round_actions, results = run_tool_calls(tool_calls, ctx)
+        actions.extend(round_actions)
+        all_calls.extend(tool_calls)
+        if not needs_followup(tool_calls, round_no, started):
+            break
+        kwargs["messages"] = kwargs["messages"] + followup_messages(tool_calls, message.content, results)
+
+    tool_calls_per_request.observe(len(all_calls))
+    if key and all_calls:
+        response_cache.set(key, _cache_entry(all_calls, content))
+    return actions, content or "Done!"
+
+
+async def scheduled_command(request: AiCommandRequest, uid: str) -> tuple[list[Action], str]:
+    """`execute_command` in the board's scheduler slot, with its actions
+    reconciled against commands on the board that finished meanwhile."""
+    if scheduler is None:
+        return await execute_command(request, uid)
+    async with scheduler.slot(request.boardId, predict_footprint(request)) as ticket:
+        actions, summary = await execute_command(request, uid)
+        return ticket.reconcile(actions), summary
+
+
+def flight_keys(request: AiCommandRequest, user: dict, board_version: str | None) -> tuple[list[str], str | None]:
+    """Single-flight keys for a command, and the idempotency key (if the
+    client sent one) its result is replayed under.
+
+    The snapshot version doubles as the board fingerprint when the board
+    store computed one.
+    """
+    fingerprint = board_version or board_fingerprint(request.boardState)
+    keys = [command_key(request.boardId, request.command, fingerprint)]
+    if not request.idempotencyKey:
+        return keys, None
+    replay_key = idempotency_key(user["uid"], request.boardId, request.idempotencyKey)
+    return [replay_key, *keys], replay_key
+
+
+@router.post("/command", response_model=AiCommandResponse)
+async def ai_command(
+    # Auth first: FastAPI resolves dependencies in order, and the body should
+    # not be read or validated for unauthenticated callers.
+    user: dict = Depends(verify_firebase_token),
+    request: AiCommandRequest = Depends(json_body(AiCommandRequest)),
+):
+    """Process a natural language AI command against the board.
+
+    Identical commands on the same board state that are already running
+    share that run's result (see app.coalescing); the rest are ordered per
+    board by footprint and reconciled with each other (see
+    app.board_scheduler).
+    """
+    with track_request("command"):
+        admit_request(request, user)
+        board_version = resolve_board_state(request)
+        try:
+            coalesced = None
+            if coalescer is None:
+                actions, summary = await scheduled_command(request, user["uid"])
+            else:
+                keys, replay_key = flight_keys(request, user, board_version)
+                (actions, summary), shared_key = await coalescer.run(
+                    keys, lambda: scheduled_command(request, user["uid"]), remember=replay_key,
+                )
+                if shared_key is not None and shared_key != replay_key:
+                    logger.info("AI command coalesced with an identical in-flight command")
+                    coalesced = True
+
+            actions_per_response.observe(object_count(actions))
+            with span("serialization"):
+                actions = compact_actions(actions, settings.compact_actions_threshold)
+                return FastJSONResponse(AiCommandResponse(
+                    actions=actions, message=summary, error=None, boardVersion=board_version, coalesced=coalesced,
+                ))
+
+        except (QueueFullError, QueueTimeoutError) as e:
+            logger.warning(f"AI command rejected: {e}")
+            raise HTTPException(status_code=503, detail="AI service busy, please retry")
+        except RateLimitedError as e:
+            logger.warning(f"AI command rejected: {e}")
+            raise too_many_requests(e)
+        except PromptTooLargeError as e:
+            logger.warning(f"AI command rejected: {e}")
+            raise HTTPException(status_code=413, detail="Board and command are too large for the AI model")
+        except Exception as e:
+            logger.error(f"AI command error: {e}")
+            raise HTTPException(status_code=500, detail="AI request failed")
+
+
+async def _stream_segment(kwargs: dict, state: SimpleNamespace, finish):
+    """Stream one model call, passing each tool call to `finish` as it completes.
+
+    Sets `state.finish_reason`; when it is "length" a last call cut off
+    mid-arguments is dropped rather than finished.
+    """
+    state.finish_reason = None
+    async with limiter.slot():
+        with span("llm"):
+            started = time.perf_counter()
+            stream = await client.chat.completions.create(
+                **kwargs, stream=True, stream_options={"include_usage": True},
+            )
+
+            # Tool calls arrive as argument fragments keyed by index. Once a
+            # higher index shows up, every lower one is complete.
+            pending: dict[int, SimpleNamespace] = {}
+
+            async for chunk in stream:
+                if started is not None:
+                    stage_seconds.observe(time.perf_counter() - started, stage="ttft")
+                    started = None
+                # With include_usage, the last chunk has no choices, only usage.
+                if getattr(chunk, "usage", None) is not None:
+                    record_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                if chunk.choices[0].finish_reason:
+                    state.finish_reason = chunk.choices[0].finish_reason
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    state.content.append(delta.content)
+
+                for tc_delta in delta.tool_calls or []:
+                    if tc_delta.index not in pending:
+                        for index in sorted(i for i in pending if i < tc_delta.index):
+                            for event in finish(pending.pop(index)):
+                                yield event
+                        pending[tc_delta.index] = SimpleNamespace(
+                            id=tc_delta.id, function=SimpleNamespace(name="", arguments=""),
+                        )
+                    fn = tc_delta.function
+                    if fn is not None:
+                        pending[tc_delta.index].function.name += fn.name or ""
+                        pending[tc_delta.index].function.arguments += fn.arguments or ""
+
+            calls = [pending[index] for index in sorted(pending)]
+            if state.finish_reason == "length":
+                calls = complete_tool_calls(calls)
+            for tool_call in calls:
+                for event in finish(tool_call):
+                    yield event
+
+
+async def _stream_round(kwargs: dict, ctx: CommandContext, state: SimpleNamespace):
+    """Stream one model round, yielding SSE action events as tool calls complete.
+
+    Fills `state.calls`, `state.results` and `state.content` for the caller
+    and appends the emitted Actions to `state.actions`. Each call is checked
+    (and trivially fixed) as it completes; invalid ones are held back and
+    sent for repair together once the stream ends. On the fast model a round
+    with no valid call is not repaired: the caller reruns it on the strong
+    model. A reply cut off at `max_tokens` is continued in further segments
+    of the same round.
+    """
+    state.calls, state.results, state.content, state.broken = [], [], [], []
+    viewport = ctx.request.viewportCenter
+
+    def finish(tool_call) -> list[str]:
+        ctx.reserve_temp_id(tool_call)
+        checked = check_tool_call(tool_call, viewport)
+        if not checked.ok:
+            state.broken.append(checked)
+            return []
+        tool_call = checked.tool_call
+        actions, results = run_tool_calls([tool_call], ctx)
+        if ctx.ticket:
+            actions = ctx.ticket.reconcile(actions)
+        state.calls.append(tool_call)
+        state.results.extend(results)
+        state.actions.extend(actions)
+        return _action_events(actions)
+
+    segment = kwargs
+    for continuation in range(settings.ai_max_continuations + 1):
+        if continuation:
+            logger.warning("Model reply cut off at max_tokens, continuing")
+            continuations.inc()
+            segment = continue_kwargs(kwargs, state.calls, "".join(state.content))
+        async for event in _stream_segment(segment, state, finish):
+            yield event
+        if state.finish_reason != "length":
+            break
+
+    if state.broken and (state.calls or kwargs["model"] == settings.openai_model):
+        for tool_call in await repair_tool_calls(kwargs, state.calls, state.broken, ctx):
+            for event in finish(tool_call):
+                yield event
+
+
+async def stream_command(request: AiCommandRequest, result: SimpleNamespace, uid: str, ticket=None):
+    """SSE action events for a command as its tool calls complete.
+
+    Collects every emitted Action in `result.actions` and the summary in
+    `result.message` for the caller's `done` event. With a scheduler
+    `ticket`, actions are reconciled as they are emitted.
+    """
+    ctx = CommandContext(request)
+    ctx.ticket = ticket
+    result.actions, result.message = [], "Done!"
+
+    def emit(actions: list[Action]) -> list[str]:
+        if ctx.ticket:
+            actions = ctx.ticket.reconcile(actions)
+        result.actions.extend(actions)
+        return _action_events(actions)
+
+    fast = run_fast_path(request, ctx)
+    if fast is not None:
+        for event in emit(fast[0]):
+            yield event
+        result.message = fast[1]
+        return
+
+    model = choose_model(request)
+    key = _cache_key(request, model)
+    cached = response_cache.get(key) if key else None
+    if cached is not None:
+        logger.info("AI command served from response cache")
+        for tc in _cached_tool_calls(cached):
+            actions, _ = run_tool_calls([tc], ctx)
+            for event in emit(actions):
+                yield event
+        result.message = cached["message"] or "Done!"
+        return
+
+    with span("prompt_build"):
+        kwargs = completion_kwargs(request, model)
+    preflight(kwargs, request)
+    admit_prompt(kwargs, request, uid)
+    state = SimpleNamespace(actions=result.actions)
+    all_calls, content, started = [], None, time.monotonic()
+    for round_no in range(settings.ai_max_rounds):
+        async for event in _stream_round(kwargs, ctx, state):
+            yield event
+        if round_no == 0 and kwargs["model"] != settings.openai_model and not state.calls:
+            logger.warning(f"Unusable output from {kwargs['model']}, retrying on {settings.openai_model}")
+            model_fallbacks.inc()
+            kwargs["model"] = settings.openai_model
+            async for event in _stream_round(kwargs, ctx, state):
+                yield event
+        if round_no == 0 and not state.calls and widen_tools(kwargs):
+            async for event in _stream_round(kwargs, ctx, state):
+                yield event
+        round_content = "".join(state.content) or None
+        content = round_content or content
+        all_calls.extend(state.calls)
+        if not needs_followup(state.calls, round_no, started):
+            break
+        kwargs["messages"] = kwargs["messages"] + followup_messages(state.calls, round_content, state.results)
+
+    tool_calls_per_request.observe(len(all_calls))
+    if key and all_calls:
+        response_cache.set(key, _cache_entry(all_calls, content))
+    result.message = content or "Done!"
+
+
+@router.post("/command/stream")
+async def ai_command_stream(
+    # Auth first: FastAPI resolves dependencies in order, and the body should
+    # not be read or validated for unauthenticated callers.
+    user: dict = Depends(verify_firebase_token),
+    request: AiCommandRequest = Depends(json_body(AiCommandRequest)),
+):
+    """Streaming variant of /command, sent as Server-Sent Events.
+
+    Emits an `action` event for every Action as soon as the tool call that
+    produced it has its complete arguments, then a single `done` event with
+    the summary message. Failures are reported as an `error` event. A
+    command coalesced with an identical in-flight one gets all of that
+    command's actions at once when it finishes.
+    """
+    # Rejections before the stream starts are plain HTTP errors, but are
+    # tracked like the rest; the open tracking is handed to the stream.
+    with ExitStack() as stack:
+        outcome = stack.enter_context(track_request("command_stream"))
+        admit_request(request, user)
+        board_version = resolve_board_state(request)
+        tracking = stack.pop_all()
+
+    async def events():
+        with tracking:
+            try:
+                keys, replay_key = flight_keys(request, user, board_version) if coalescer else ([], None)
+                shared = await coalescer.join(keys) if coalescer else None
+                if shared is not None:
+                    (actions, message), shared_key = shared
+                    for event in _action_events(actions):
+                        yield event
+                    coalesced = True if shared_key != replay_key else None
+                    yield _sse("done", {"message": message, "boardVersion": board_version, "coalesced": coalesced})
+                    return
+
+                flight = coalescer.lead(keys, replay_key) if coalescer else None
+                result = SimpleNamespace()
                 try:
-                    name = tc.function.name # type: ignore
-                    tc_args = json.loads(tc.function.arguments) # type: ignore
-
-                    if name == "bulkCreate":
-                        actions.extend(generate_bulk_actions(tc_args))
-                    elif name == "deleteAll":
-                        # Generate delete actions for all objects on the board
-                        for obj in request.boardState:
-                            actions.append(Action(type="delete", objectId=obj.id))
-                    else:
-                        action = tool_call_to_action(tc)
-                        if action is not None:
-                            actions.append(action)
+                    footprint = predict_footprint(request)
+                    async with scheduler.slot(request.boardId, footprint) if scheduler else nullcontext() as ticket:
+                        async for event in stream_command(request, result, user["uid"], ticket):
+                            yield event
+                    if flight:
+                        coalescer.settle(flight, (result.actions, result.message))
                 except Exception as e:
-                    logger.error(f"Error processing tool call: {e}")
+                    if flight:
+                        coalescer.settle(flight, error=e)
+                    raise
+                finally:
+                    # Client went away mid-stream: waiters run the command themselves.
+                    if flight:
+                        coalescer.settle(flight)
+                yield _sse("done", {"message": result.message, "boardVersion": board_version})
 
-        summary = message.content or "Done!"
-        return AiCommandResponse(actions=actions, message=summary, error=None)
+            except (QueueFullError, QueueTimeoutError) as e:
+                logger.warning(f"AI command rejected: {e}")
+                outcome.status = "503"
+                yield _sse("error", {"detail": "AI service busy, please retry"})
+            except RateLimitedError as e:
+                logger.warning(f"AI command rejected: {e}")
+                outcome.status = "429"
+                yield _sse("error", {"detail": too_many_requests(e).detail, "retryAfter": math.ceil(e.retry_after)})
+            except PromptTooLargeError as e:
+                logger.warning(f"AI command rejected: {e}")
+                outcome.status = "413"
+                yield _sse("error", {"detail": "Board and command are too large for the AI model"})
+            except Exception as e:
+                logger.error(f"AI command stream error: {e}")
+                outcome.status = "500"
+                yield _sse("error", {"detail": "AI request failed"})
 
-    except Exception as e:
-        logger.error(f"AI command error: {e}")
-        raise HTTPException(status_code=500, detail="AI request failed")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
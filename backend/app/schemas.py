@@ -1,8 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 
 class BoardObject(BaseModel):
+    # Sizes and positions feed the spatial index and layout math; reject
+    # NaN/Infinity (and overflowing literals like 1e999) up front.
+    model_config = ConfigDict(allow_inf_nan=False)
+
     id: str
     type: str
     x: Optional[float] = None
@@ -24,21 +28,34 @@ class BoardObject(BaseModel):
     createdBy: Optional[str] = None
 
 
+class BoardDelta(BaseModel):
+    baseVersion: str                     # boardVersion from the previous response
+    upserted: list[BoardObject] = []     # Added or changed objects
+    removed: list[str] = []              # Deleted object ids
+
+
 class AiCommandRequest(BaseModel):
     command: str
-    boardState: list[BoardObject]
+    boardState: Optional[list[BoardObject]] = None   # Full snapshot; or send boardDelta
+    boardDelta: Optional[BoardDelta] = None
     boardId: str = "default-board"
     viewportCenter: Optional[dict] = None
+    idempotencyKey: Optional[str] = None   # Retries with the same key get the original response
 
 
 class Action(BaseModel):
-    type: str              # "create" | "update" | "delete"
-    objectType: Optional[str] = None   # For create: stickyNote, rectangle, etc.
+    type: str              # "create" | "update" | "delete" | "createMany" | "deleteMany"
+    objectType: Optional[str] = None   # For create: stickyNote, rectangle, etc. For createMany: when all share one type
     objectId: Optional[str] = None     # For update/delete
-    properties: Optional[dict] = None
+    properties: Optional[dict] = None  # For createMany: properties shared by every object
+    objectIds: Optional[list[str]] = None        # For deleteMany
+    columns: Optional[dict[str, list]] = None    # For createMany: parallel per-object arrays (None = unset)
+    tempId: Optional[str] = None       # For create: "new-N" id later actions in the response may reference
 
 
 class AiCommandResponse(BaseModel):
     actions: list[Action]
     message: str
     error: Optional[str] = None
+    boardVersion: Optional[str] = None   # Base for the next request's boardDelta
+    coalesced: Optional[bool] = None     # Shared from an identical in-flight command whose client applies it
@@ -0,0 +1,42 @@
+"""Fast JSON paths for large request and response bodies.
+
+Request bodies are validated straight from bytes by pydantic-core
+(`model_validate_json`) instead of `json.loads` followed by model
+validation, and responses are rendered by pydantic-core instead of going
+through FastAPI's `jsonable_encoder`.
+"""
+
+from typing import Any
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import BaseModel, ValidationError
+from pydantic_core import to_json
+
+from app.metrics import span
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered by pydantic-core; None fields are omitted."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, exclude_none=True)
+
+
+def json_body(model: type[BaseModel]):
+    """FastAPI dependency factory: parse and validate the raw body as `model`."""
+
+    async def parse(request: Request) -> BaseModel:
+        body = await request.body()
+        try:
+            with span("validation"):
+                return model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            )
+
+    return parse
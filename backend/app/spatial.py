@@ -0,0 +1,164 @@
+"""In-request spatial and attribute indexes over the board state.
+
+Built once per command so selection tools (`selectObjects`,
+`updateSelection`) can resolve "all pink notes in the Strengths frame"
+server-side instead of the model scanning the board and emitting one tool
+call per object.
+"""
+
+import math
+from collections import defaultdict
+
+from app.schemas import BoardObject
+
+# Default sizes used when an object omits them, mirroring the frontend.
+DEFAULT_SIZES = {
+    "stickyNote": (200, 150),
+    "rectangle": (120, 120),
+    "frame": (400, 300),
+    "text": (200, 20),
+    "line": (150, 0),
+}
+
+CELL_SIZE = 500
+
+# Objects spanning more cells than this are kept out of the grid and checked
+# by every query, so one huge (client-sized) object cannot blow up the index.
+MAX_CELLS_PER_OBJECT = 64
+
+
+def bounds(obj: BoardObject) -> tuple[float, float, float, float]:
+    """Axis-aligned `(x0, y0, x1, y1)` of an object, ignoring rotation."""
+    x, y = obj.x or 0, obj.y or 0
+    if obj.type == "circle":
+        r = obj.radius if obj.radius is not None else 60
+        return x - r, y - r, x + r, y + r
+    w, h = DEFAULT_SIZES.get(obj.type, (120, 120))
+    if obj.width is not None:
+        w = obj.width
+    if obj.type == "text" and obj.fontSize is not None:
+        h = obj.fontSize
+    elif obj.height is not None:
+        h = obj.height
+    return x, y, x + w, y + h
+
+
+def center(obj: BoardObject) -> tuple[float, float]:
+    x0, y0, x1, y1 = bounds(obj)
+    return (x0 + x1) / 2, (y0 + y1) / 2
+
+
+class BoardIndex:
+    """Uniform-grid spatial index plus type/color lookups for one board snapshot."""
+
+    def __init__(self, objects: list[BoardObject], cell_size: int = CELL_SIZE):
+        self.cell_size = cell_size
+        self.by_id: dict[str, BoardObject] = {}
+        self.by_type: dict[str, set[str]] = defaultdict(set)
+        self.by_color: dict[str, set[str]] = defaultdict(set)
+        self._bounds: dict[str, tuple[float, float, float, float]] = {}
+        self._cells: dict[tuple[int, int], set[str]] = defaultdict(set)
+        self._oversized: set[str] = set()
+
+        for obj in objects:
+            self.by_id[obj.id] = obj
+            self.by_type[obj.type].add(obj.id)
+            if obj.color:
+                self.by_color[obj.color.upper()].add(obj.id)
+            if obj.type == "connector":
+                continue
+            box = bounds(obj)
+            self._bounds[obj.id] = box
+            if self._span(box) > MAX_CELLS_PER_OBJECT:
+                self._oversized.add(obj.id)
+                continue
+            for cell in self._cells_for(box):
+                self._cells[cell].add(obj.id)
+
+    def _span(self, box: tuple[float, float, float, float]) -> float:
+        """Grid cells a box covers; infinite for non-finite boxes."""
+        if not all(math.isfinite(v) for v in box):
+            return math.inf
+        x0, y0, x1, y1 = (v // self.cell_size for v in box)
+        return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+    def _cells_for(self, box: tuple[float, float, float, float]):
+        x0, y0, x1, y1 = (int(v // self.cell_size) for v in box)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield cx, cy
+
+    def query_region(self, x: float, y: float, width: float, height: float) -> set[str]:
+        """IDs of objects whose bounds intersect the region."""
+        region = (x, y, x + width, y + height)
+        if self._span(region) > len(self._cells):
+            # Huge regions touch more cells than are occupied; scan instead.
+            candidates = set(self._bounds)
+        else:
+            candidates = set(self._oversized)
+            for cell in self._cells_for(region):
+                candidates |= self._cells.get(cell, set())
+        return {
+            oid for oid in candidates
+            if self._bounds[oid][0] <= region[2] and self._bounds[oid][2] >= region[0]
+            and self._bounds[oid][1] <= region[3] and self._bounds[oid][3] >= region[1]
+        }
+
+    def find_frame(self, ref: str) -> BoardObject | None:
+        """Look a frame up by id, or by case-insensitive title."""
+        if ref in self.by_type.get("frame", ()):
+            return self.by_id[ref]
+        ref = ref.strip().lower()
+        for oid in self.by_type.get("frame", ()):
+            if (self.by_id[oid].title or "").strip().lower() == ref:
+                return self.by_id[oid]
+        return None
+
+    def frame_bounds(self, frame: BoardObject) -> tuple[float, float, float, float]:
+        return self._bounds[frame.id]
+
+    def select(self, filter: dict | None = None, region: dict | None = None) -> list[BoardObject]:
+        """Objects matching every given criterion, in board order.
+
+        `filter` keys: `types`, `colors`, `text` (substring of text/title),
+        `ids`, and `frame` (id or title; matches objects whose center lies
+        inside that frame). `region` is `{x, y, width, height}`.
+        """
+        filter = filter or {}
+        ids: set[str] | None = None
+
+        def narrow(found: set[str]):
+            nonlocal ids
+            ids = found if ids is None else ids & found
+
+        if filter.get("ids"):
+            narrow(set(filter["ids"]) & self.by_id.keys())
+        if filter.get("types"):
+            narrow(set().union(*(self.by_type.get(t, set()) for t in filter["types"])))
+        if filter.get("colors"):
+            narrow(set().union(*(self.by_color.get(c.upper(), set()) for c in filter["colors"])))
+        if region:
+            narrow(self.query_region(
+                region.get("x", 0), region.get("y", 0),
+                region.get("width", 0), region.get("height", 0),
+            ))
+        if filter.get("frame"):
+            frame = self.find_frame(filter["frame"])
+            if frame is None:
+                return []
+            fx0, fy0, fx1, fy1 = self.frame_bounds(frame)
+            inside = {
+                oid for oid in self.query_region(fx0, fy0, fx1 - fx0, fy1 - fy0)
+                if oid != frame.id and fx0 <= center(self.by_id[oid])[0] <= fx1
+                and fy0 <= center(self.by_id[oid])[1] <= fy1
+            }
+            narrow(inside)
+
+        matches = self.by_id.keys() if ids is None else ids
+        needle = (filter.get("text") or "").lower()
+        if needle:
+            matches = {
+                oid for oid in matches
+                if needle in f"{self.by_id[oid].text or ''}\n{self.by_id[oid].title or ''}".lower()
+            }
+        return [obj for oid, obj in self.by_id.items() if oid in matches]
@@ -0,0 +1,146 @@
+"""Preflight token accounting for model calls.
+
+Before the first model call of a command the prompt is counted locally
+(with the same estimate the board context uses) and checked against the
+model's context window, and `max_tokens` is sized to the command: a few
+hundred tokens for a single edit, more for commands that name many objects
+or several steps. Large quantities are left to bulkCreate, a single call,
+so they do not raise the budget.
+
+A reply that still stops at `max_tokens` (finish reason "length") is
+continued: complete tool calls are kept, a call cut off mid-arguments is
+dropped, and the model is asked to carry on from there.
+"""
+
+import json
+import re
+
+from app.board_context import estimate_tokens
+from app.metrics import Counter, Histogram
+
+# Context windows of the models we route to; others use
+# settings.ai_context_tokens.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+}
+
+# Per-message framing the estimate does not see (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Output estimate: summary text plus one tool call per object and step.
+OUTPUT_BASE_TOKENS = 256
+TOKENS_PER_CALL = 80
+# Quantities at least this large go through bulkCreate (one call).
+BULK_QUANTITY = 20
+# Objects an "all"/"every" edit is assumed to touch, at most.
+EDIT_ALL_CAP = 50
+
+NUMBER_WORDS = {
+    "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "dozen": 12, "twenty": 20,
+}
+_QUANTITY_RE = re.compile(r"\b(\d+|" + "|".join(NUMBER_WORDS) + r")\b")
+_STEP_RE = re.compile(r",|;|\band\b|\bthen\b")
+_ALL_RE = re.compile(r"\b(all|every|each)\b")
+
+CONTINUE_PROMPT = (
+    "Your previous reply hit the length limit, and any tool call it was in the middle of was "
+    "discarded. Finish the command: make the remaining tool calls, keeping each one small "
+    "(prefer bulkCreate or templates over many single creates), and do not repeat calls that "
+    "already succeeded."
+)
+
+prompt_tokens_estimated = Histogram(
+    "ai_prompt_tokens_estimated", "Estimated prompt tokens per command at preflight",
+    (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+)
+max_tokens_set = Histogram(
+    "ai_max_tokens", "max_tokens chosen per command at preflight",
+    (256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+continuations = Counter("ai_continuations_total", "Model replies continued after stopping at max_tokens")
+prompts_compacted = Counter("ai_prompts_compacted_total", "Prompts shrunk to fit the model's context window")
+
+
+class PromptTooLargeError(Exception):
+    """Raised when a prompt cannot be made to fit the model's context window."""
+
+    def __init__(self, tokens: int, limit: int):
+        super().__init__(f"Prompt of ~{tokens} tokens exceeds the {limit}-token context window")
+        self.tokens = tokens
+        self.limit = limit
+
+
+def context_window(model: str, default: int) -> int:
+    return MODEL_CONTEXT_TOKENS.get(model, default)
+
+
+def count_prompt_tokens(kwargs: dict) -> int:
+    """Estimated prompt tokens of chat.completions.create arguments, tools included."""
+    tokens = estimate_tokens(json.dumps(kwargs.get("tools") or []))
+    for message in kwargs["messages"]:
+        tokens += MESSAGE_OVERHEAD_TOKENS
+        if message.get("content"):
+            tokens += estimate_tokens(message["content"])
+        if message.get("tool_calls"):
+            tokens += estimate_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def estimate_output_tokens(command: str, board_size: int) -> int:
+    """Rough output tokens a command needs: one tool call per object per step."""
+    text = command.lower()
+    quantities = [int(q) if q.isdigit() else NUMBER_WORDS[q] for q in _QUANTITY_RE.findall(text)]
+    per_step = max(quantities, default=1)
+    if per_step >= BULK_QUANTITY:
+        per_step = 1
+    if _ALL_RE.search(text):
+        per_step = max(per_step, min(board_size, EDIT_ALL_CAP))
+    steps = 1 + len(_STEP_RE.findall(text))
+    return OUTPUT_BASE_TOKENS + per_step * steps * TOKENS_PER_CALL
+
+
+def output_budget(command: str, board_size: int, available: int, minimum: int, maximum: int) -> int:
+    """`max_tokens` for a command: its estimate within [minimum, maximum], and
+    never more than the `available` context."""
+    return min(available, max(minimum, min(maximum, estimate_output_tokens(command, board_size))))
+
+
+def complete_tool_calls(tool_calls) -> list:
+    """Calls of a cut-off reply minus a last one whose arguments were cut off."""
+    calls = list(tool_calls or [])
+    if calls:
+        try:
+            json.loads(calls[-1].function.arguments or "{}")
+        except ValueError:
+            calls.pop()
+    return calls
+
+
+def continuation_messages(tool_calls: list, content: str | None) -> list[dict]:
+    """Messages that replay a cut-off reply (its complete calls marked done)
+    and ask the model to continue it.
+
+    A reply that kept nothing (cut off inside its only call, with no text)
+    is not replayed: an assistant turn with neither content nor calls is
+    rejected by the API.
+    """
+    if not tool_calls and not content:
+        return [{"role": "user", "content": CONTINUE_PROMPT}]
+    assistant = {"role": "assistant", "content": content or None}
+    messages = [assistant]
+    if tool_calls:
+        assistant["tool_calls"] = [
+            {"id": tc.id, "type": "function",
+             "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+            for tc in tool_calls
+        ]
+        messages += [
+            {"role": "tool", "tool_call_id": tc.id, "content": json.dumps({"ok": True})} for tc in tool_calls
+        ]
+    messages.append({"role": "user", "content": CONTINUE_PROMPT})
+    return messages
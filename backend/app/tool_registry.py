@@ -0,0 +1,183 @@
+"""Per-command tool selection and compacted tool schemas.
+
+Tools are grouped (create, edit, layout, bulk) and each command is offered
+only the groups its wording calls for, matched with cheap keyword rules;
+commands that match nothing get every tool. Schemas are compacted once at
+import: property descriptions that only restate the property name are
+dropped and the color palette, already listed in the system prompt, is not
+repeated in every color field.
+
+The tool list leads the prompt, so each distinct group combination is its
+own cacheable prefix; commands of the same kind still share one.
+"""
+
+import copy
+import json
+import logging
+import re
+
+from pydantic import BaseModel
+
+from app.board_context import COLOR_PATTERN, estimate_tokens
+from app.metrics import COUNT_BUCKETS, Counter, Histogram
+from app.tools import TOOLS
+
+logger = logging.getLogger(__name__)
+
+# Group -> tool names, in no particular order (TOOLS order is kept when sending).
+TOOL_GROUPS = {
+    "create": {
+        "createStickyNote", "createShape", "createText", "createLine", "createFrame", "createConnector",
+        "getFrameBounds",
+    },
+    "edit": {
+        "moveObject", "resizeObject", "updateText", "changeColor", "deleteObject",
+        "selectObjects", "updateSelection", "findObjects", "getFrameBounds",
+    },
+    "layout": {
+        "arrangeGrid", "arrangeInFrame", "createTemplate", "selectObjects", "findObjects", "getFrameBounds",
+    },
+    "bulk": {"bulkCreate", "deleteAll"},
+}
+
+GROUP_PATTERNS = {
+    "create": (
+        r"\b(add|create|draw|put|insert|write|build|brainstorm|new)\b"
+        r"|\bmake (a|an|one|two|three|four|five|some|a few|several)\b"
+        r"|\b(connect|link|arrows?|flow ?chart|diagram|mind ?map|tree)\b"
+    ),
+    "edit": (
+        rf"\b(move|drag|shift|resize|bigger|smaller|larger|wider|taller|shrink|grow|rename|retitle|change|update"
+        rf"|edit|set|recolou?r|colou?r|paint|turn|delete|remove|erase|get rid)\b|\b{COLOR_PATTERN}\b"
+    ),
+    "layout": (
+        r"\b(arrange|grid|organi[sz]e|lay ?out|align|tidy|sort|cluster|group|stack|spread|distribute"
+        r"|swot|kanban|retro|retrospective|template)\b"
+    ),
+    "bulk": r"\b(clear|wipe|empty|reset|everything|random|fill)\b|\b\d{2,}\b",
+}
+
+_GROUP_RE = {group: re.compile(pattern) for group, pattern in GROUP_PATTERNS.items()}
+
+_PALETTE_RE = re.compile(r"\.? ?Available: (#[0-9A-Fa-f]{6} \(\w+\)(, )?)+")
+
+# Words that add nothing to a property description beyond its name.
+_FILLER = {"a", "an", "the", "of", "to", "on", "in", "new", "position", "canvas", "pixels", "object", "objects"}
+
+_REWRITES = [
+    (re.compile(r"\bFirestore ID\b"), "ID"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def _name_words(name: str) -> set[str]:
+    return {w.lower() for w in re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])", name)}
+
+
+def _compact_description(name: str, description: str) -> str | None:
+    text = _PALETTE_RE.sub(" from the palette", description)
+    for pattern, replacement in _REWRITES:
+        text = pattern.sub(replacement, text)
+    text = text.strip()
+    if set(re.findall(r"[a-z]+", text.lower())) - _FILLER <= _name_words(name):
+        return None
+    return text
+
+
+def compact_schema(schema: dict, name: str = "") -> dict:
+    """Copy of a JSON schema with redundant property descriptions removed."""
+    out = copy.copy(schema)
+    if "description" in out:
+        description = _compact_description(name, out["description"]) if name else out["description"]
+        if description is None:
+            del out["description"]
+        else:
+            out["description"] = description
+    if "properties" in out:
+        out["properties"] = {key: compact_schema(value, key) for key, value in out["properties"].items()}
+    if isinstance(out.get("items"), dict):
+        out["items"] = compact_schema(out["items"])
+    return out
+
+
+def compact_tool(tool: dict) -> dict:
+    function = dict(tool["function"])
+    function["parameters"] = compact_schema(function["parameters"])
+    return {**tool, "function": function}
+
+
+def _tokens(tools: list[dict]) -> int:
+    return estimate_tokens(json.dumps(tools))
+
+
+COMPACT_TOOLS = [compact_tool(tool) for tool in TOOLS]
+FULL_TOOLS_TOKENS = _tokens(TOOLS)
+ALL_TOOLS_TOKENS = _tokens(COMPACT_TOOLS)
+
+tool_schema_tokens = Histogram(
+    "ai_tool_schema_tokens", "Estimated tokens of the tool schemas sent per command",
+    (250, 500, 1000, 1500, 2000, 2500, 3000, 4000),
+)
+tool_schema_tokens_saved = Counter(
+    "ai_tool_schema_tokens_saved_total", "Estimated prompt tokens saved by tool selection and compaction",
+)
+tools_offered = Histogram("ai_tools_offered", "Tools offered to the model per command", COUNT_BUCKETS)
+
+
+class ToolSelection(BaseModel):
+    groups: list[str]      # Selected groups, or ["all"]
+    tools: list[dict]
+    tokens: int            # Estimated tokens of `tools`
+    saved: int             # Versus the full, uncompacted TOOLS
+
+
+def classify_groups(command: str, board_size: int) -> list[str] | None:
+    """Tool groups a command needs, or None when it needs all of them."""
+    text = command.lower()
+    groups = [group for group, rx in _GROUP_RE.items() if rx.search(text)]
+    if board_size == 0:
+        # Nothing to edit yet; a command that only reads as an edit gets everything.
+        groups = [group for group in groups if group != "edit"]
+    return groups or None
+
+
+def _select(groups: tuple[str, ...] | None) -> ToolSelection:
+    if groups is None:
+        return ToolSelection(groups=["all"], tools=COMPACT_TOOLS, tokens=ALL_TOOLS_TOKENS,
+                             saved=FULL_TOOLS_TOKENS - ALL_TOOLS_TOKENS)
+    names = set().union(*(TOOL_GROUPS[group] for group in groups))
+    tools = [tool for tool in COMPACT_TOOLS if tool["function"]["name"] in names]
+    tokens = _tokens(tools)
+    return ToolSelection(groups=list(groups), tools=tools, tokens=tokens, saved=FULL_TOOLS_TOKENS - tokens)
+
+
+_selections: dict[tuple[str, ...] | None, ToolSelection] = {}
+
+
+def select_tools(command: str, board_size: int) -> ToolSelection:
+    """Tools to offer for a command, with their estimated token cost and savings.
+
+    Selections are built once per group combination and shared, so equal
+    combinations send byte-identical tool lists.
+    """
+    groups = classify_groups(command, board_size)
+    key = tuple(groups) if groups is not None else None
+    selection = _selections.get(key)
+    if selection is None:
+        selection = _selections[key] = _select(key)
+
+    tool_schema_tokens.observe(selection.tokens)
+    tool_schema_tokens_saved.inc(selection.saved)
+    tools_offered.observe(len(selection.tools))
+    logger.info(
+        f"Offering {len(selection.tools)}/{len(TOOLS)} tools ({', '.join(selection.groups)}): "
+        f"~{selection.tokens} tokens, ~{selection.saved} saved"
+    )
+    return selection
+
+
+def all_tools() -> ToolSelection:
+    """Every tool, compacted: the fallback when a reduced set was not enough."""
+    if None not in _selections:
+        _selections[None] = _select(None)
+    return _selections[None]
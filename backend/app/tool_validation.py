@@ -0,0 +1,251 @@
+"""Schema-driven checking and fixing of tool-call arguments.
+
+Every call is checked against its schema in TOOLS before it is resolved.
+Trivially fixable problems are fixed in place: JSON wrapped in code fences
+or with trailing commas, numbers and booleans sent as strings, enum values
+in the wrong case, colors given by name or off the palette (snapped to the
+nearest palette color where the schema lists the palette), missing
+positions and texts (filled with defaults),
+and unknown keys (dropped). Calls that still fail — unknown tools, missing
+ids, unparseable arguments — are returned as broken, for the caller to send
+back to the model in a small repair request.
+"""
+
+import json
+import re
+from types import SimpleNamespace
+
+from app.board_context import COLOR_HEX, COLOR_NAMES
+from app.metrics import Counter
+from app.tools import TOOLS
+
+SCHEMAS = {tool["function"]["name"]: tool["function"]["parameters"] for tool in TOOLS}
+
+PALETTE = {hex_: tuple(int(hex_[i:i + 2], 16) for i in (1, 3, 5)) for hex_ in COLOR_NAMES}
+
+# Required keys with a safe default when the model leaves them out; x and y
+# default to the viewport center, as the system prompt tells the model to.
+REQUIRED_DEFAULTS = {"text": "", "title": "Untitled"}
+DEFAULT_CENTER = {"x": 600, "y": 400}
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_NUMBER_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(?:px)?\s*$")
+_HEX_RE = re.compile(r"^#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})$")
+
+tool_call_fixes = Counter("ai_tool_call_fixes_total", "Tool-call arguments fixed locally, by kind")
+tool_call_repairs = Counter("ai_tool_call_repairs_total", "Broken tool calls sent for repair, by outcome")
+
+
+class CheckedCall:
+    """A tool call after checking: the (fixed) tool call when it passed, the
+    problems that remain otherwise, and what was fixed either way."""
+
+    def __init__(self, tool_call, args: dict | None, errors: list[str], fixes: list[str]):
+        self.original = tool_call
+        self.args = args
+        self.errors = errors
+        self.fixes = fixes
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def tool_call(self):
+        """The call with fixed arguments (the original object if nothing changed)."""
+        if not self.fixes:
+            return self.original
+        return SimpleNamespace(
+            id=getattr(self.original, "id", None),
+            type="function",
+            function=SimpleNamespace(name=self.original.function.name, arguments=json.dumps(self.args)),
+        )
+
+
+def _parse(arguments: str | None, fixes: list[str]) -> object:
+    text = (arguments or "").strip() or "{}"
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    cleaned = _TRAILING_COMMA_RE.sub(r"\1", _FENCE_RE.sub("", text))
+    value = json.loads(cleaned)  # ValueError propagates: not trivially fixable
+    fixes.append("json")
+    return value
+
+
+def snap_color(value: str) -> str | None:
+    """Palette hex for a color name or any hex color (nearest by RGB), else None."""
+    text = value.strip().lower()
+    if text in COLOR_HEX:
+        return COLOR_HEX[text]
+    match = _HEX_RE.match(text)
+    if not match:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = "".join(c * 2 for c in digits)
+    rgb = tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+    return min(PALETTE, key=lambda hex_: sum((a - b) ** 2 for a, b in zip(PALETTE[hex_], rgb)))
+
+
+def _coerce(key: str, value, schema: dict, path: str, errors: list[str], fixes: list[str]):
+    """`value` made to fit `schema`; appends to `errors` when it cannot."""
+    kind = schema.get("type")
+    if kind in ("number", "integer"):
+        if isinstance(value, str) and (match := _NUMBER_RE.match(value)):
+            value = float(match.group(1))
+            fixes.append("number")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{path} must be a number")
+            return value
+        if kind == "integer" and not isinstance(value, int):
+            value = int(round(value))
+        return value
+    if kind == "boolean":
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            fixes.append("boolean")
+            return value.strip().lower() == "true"
+        if not isinstance(value, bool):
+            errors.append(f"{path} must be a boolean")
+        return value
+    if kind == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+            fixes.append("string")
+        if not isinstance(value, str):
+            errors.append(f"{path} must be a string")
+            return value
+        if "enum" in schema and value not in schema["enum"]:
+            folded = {option.lower(): option for option in schema["enum"]}
+            option = folded.get(value.lower()) or folded.get(value.lower().rstrip("s"))
+            if option is None:
+                errors.append(f"{path} must be one of {schema['enum']}")
+                return value
+            fixes.append("enum")
+            value = option
+        if "color" in key.lower() and value.upper() not in PALETTE:
+            if "Available:" in schema.get("description", ""):
+                snapped = snap_color(value)
+                if snapped is None:
+                    errors.append(f"{path} must be a palette color hex")
+                    return value
+            else:
+                # Free color fields take any hex; only names need translating.
+                snapped = COLOR_HEX.get(value.strip().lower())
+                if snapped is None:
+                    return value
+            fixes.append("color")
+            value = snapped
+        return value
+    if kind == "array":
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            value = [value]
+            fixes.append("array")
+        if not isinstance(value, list):
+            errors.append(f"{path} must be an array")
+            return value
+        items = schema.get("items") or {}
+        return [_coerce(key, item, items, f"{path}[{i}]", errors, fixes) for i, item in enumerate(value)]
+    if kind == "object":
+        if not isinstance(value, dict):
+            errors.append(f"{path} must be an object")
+            return value
+        return _coerce_object(value, schema, path, errors, fixes)
+    return value
+
+
+def _coerce_object(args: dict, schema: dict, path: str, errors: list[str], fixes: list[str]) -> dict:
+    properties = schema.get("properties")
+    if properties is None:
+        return args
+    out = {}
+    for key, value in args.items():
+        if key not in properties:
+            fixes.append("unknown_key")
+            continue
+        if value is None:
+            fixes.append("null")
+            continue
+        out[key] = _coerce(key, value, properties[key], f"{path}.{key}" if path else key, errors, fixes)
+    return out
+
+
+def check_tool_call(tool_call, viewport: dict | None = None, count: bool = True) -> CheckedCall:
+    """Check (and where trivial, fix) one tool call's arguments; `count`
+    records the fixes in `ai_tool_call_fixes_total`."""
+    name = tool_call.function.name
+    fixes: list[str] = []
+    schema = SCHEMAS.get(name)
+    if schema is None:
+        return CheckedCall(tool_call, None, [f"unknown tool {name!r}"], fixes)
+    try:
+        args = _parse(tool_call.function.arguments, fixes)
+    except ValueError as e:
+        return CheckedCall(tool_call, None, [f"arguments are not valid JSON ({e})"], fixes)
+    if not isinstance(args, dict):
+        return CheckedCall(tool_call, None, ["arguments must be a JSON object"], fixes)
+
+    errors: list[str] = []
+    args = _coerce_object(args, schema, "", errors, fixes)
+    for key in schema.get("required", []):
+        if key in args:
+            continue
+        if key in ("x", "y"):
+            args[key] = (viewport or DEFAULT_CENTER).get(key, DEFAULT_CENTER[key])
+        elif key in REQUIRED_DEFAULTS:
+            args[key] = REQUIRED_DEFAULTS[key]
+        else:
+            errors.append(f"missing required {key!r}")
+            continue
+        fixes.append("default")
+
+    for kind in fixes if count else ():
+        tool_call_fixes.inc(kind=kind)
+    return CheckedCall(tool_call, args, errors, fixes)
+
+
+def check_tool_calls(tool_calls, viewport: dict | None = None) -> tuple[list, list[CheckedCall]]:
+    """Split a round's calls into usable ones (fixed where needed) and broken ones."""
+    usable, broken = [], []
+    for tc in tool_calls:
+        checked = check_tool_call(tc, viewport)
+        if checked.ok:
+            usable.append(checked.tool_call)
+        else:
+            broken.append(checked)
+    return usable, broken
+
+
+def repair_messages(accepted: list, broken: list[CheckedCall]) -> list[dict]:
+    """Follow-up messages asking the model to resend only the broken calls.
+
+    Appended to the conversation so far, so the repair shares its cached
+    prefix and the model sees the board and command it was answering; the
+    round's accepted calls are shown as done so they are not repeated.
+    """
+    calls = [(tc, None) for tc in accepted] + [(checked.original, checked.errors) for checked in broken]
+    return [
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": tc.id, "type": "function",
+                 "function": {"name": tc.function.name, "arguments": tc.function.arguments or ""}}
+                for tc, _ in calls
+            ],
+        },
+        *(
+            {
+                "role": "tool",
+                "tool_call_id": tc.id,
+                "content": json.dumps({"error": "; ".join(errors)} if errors else {"ok": True}),
+            }
+            for tc, errors in calls
+        ),
+        {
+            "role": "user",
+            "content": "Some tool calls were rejected. Resend corrected versions of only the rejected calls.",
+        },
+    ]
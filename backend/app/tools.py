@@ -1,3 +1,25 @@
+# Object filter shared by selectObjects and findObjects.
+SELECTION_FILTER = {
+    "type": "object",
+    "properties": {
+        "types": {"type": "array", "items": {"type": "string"}, "description": "Object types to match, e.g. ['stickyNote']"},
+        "colors": {"type": "array", "items": {"type": "string"}, "description": "Color hexes to match"},
+        "text": {"type": "string", "description": "Case-insensitive substring of the object's text or title"},
+        "frame": {"type": "string", "description": "ID or title of a frame; matches objects inside it"},
+        "ids": {"type": "array", "items": {"type": "string"}, "description": "Explicit object IDs"},
+    },
+    "description": "All given criteria must match.",
+}
+
+SELECTION_REGION = {
+    "type": "object",
+    "properties": {
+        "x": {"type": "number"}, "y": {"type": "number"},
+        "width": {"type": "number"}, "height": {"type": "number"},
+    },
+    "description": "Only objects intersecting this canvas region.",
+}
+
 TOOLS = [
     {
         "type": "function",
@@ -106,12 +128,12 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "createConnector",
-            "description": "Create a connector (arrow) between two existing objects. Only use for objects that already exist in the boardState (have known IDs).",
+            "description": "Create a connector (arrow) between two objects: existing ones (IDs from the board state) or ones created earlier in this request (their new-N temporary IDs).",
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "fromId": {"type": "string", "description": "Firestore ID of the source object"},
-                    "toId": {"type": "string", "description": "Firestore ID of the target object"},
+                    "fromId": {"type": "string", "description": "Firestore ID or new-N temporary ID of the source object"},
+                    "toId": {"type": "string", "description": "Firestore ID or new-N temporary ID of the target object"},
                     "strokeColor": {"type": "string", "description": "Connector color. Default #6B7280."},
                     "strokeWidth": {"type": "number", "description": "Stroke width. Default 2."},
                     "arrowEnd": {"type": "boolean", "description": "Show arrowhead. Default true."},
@@ -201,6 +223,134 @@ TOOLS = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "selectObjects",
+            "description": "Select existing objects by filter and/or region, server-side. Use instead of scanning the board state when a command targets a group (e.g. 'all pink sticky notes', 'everything in the Strengths frame'). Apply changes to the selection with updateSelection.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "filter": SELECTION_FILTER,
+                    "region": SELECTION_REGION,
+                    "name": {"type": "string", "description": "Name for the selection. Default 'selection'."},
+                },
+                "required": [],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "findObjects",
+            "description": "Look up existing objects by filter and/or region and get their properties back before continuing. Read-only. Use when the board state omits objects you need (large boards list only the relevant ones).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "filter": SELECTION_FILTER,
+                    "region": SELECTION_REGION,
+                    "limit": {"type": "integer", "description": "Maximum objects to return. Default 50."},
+                },
+                "required": [],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "getFrameBounds",
+            "description": "Get a frame's id, x, y, width and height before continuing. Read-only. Accepts a frame ID, a frame title, or the new-N id of a frame created in this request.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "frame": {"type": "string", "description": "Frame ID or title"},
+                },
+                "required": ["frame"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "updateSelection",
+            "description": "Apply one change to every object in a selection made with selectObjects: move by an offset, recolor, resize, or delete.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "selection": {"type": "string", "description": "Selection name. Default 'selection'."},
+                    "dx": {"type": "number", "description": "Move right by this many pixels (negative = left)"},
+                    "dy": {"type": "number", "description": "Move down by this many pixels (negative = up)"},
+                    "color": {
+                        "type": "string",
+                        "description": "New color hex. Available: #FDE68A (Yellow), #FBCFE8 (Pink), #BFDBFE (Blue), #BBF7D0 (Green), #DDD6FE (Purple), #FED7AA (Orange), #FECACA (Red), #E5E7EB (Gray), #1F2937 (Black)",
+                    },
+                    "width": {"type": "number", "description": "New width"},
+                    "height": {"type": "number", "description": "New height"},
+                    "delete": {"type": "boolean", "description": "Delete the selected objects"},
+                },
+                "required": [],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "arrangeGrid",
+            "description": "Arrange existing objects in a tidy, non-overlapping grid. The server computes all positions. Use for 'arrange these in a grid', 'tidy up', 'organize the notes'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "objectIds": {"type": "array", "items": {"type": "string"}, "description": "IDs of the objects to arrange"},
+                    "selection": {"type": "string", "description": "Name of a selectObjects selection to arrange instead of objectIds"},
+                    "columns": {"type": "integer", "description": "Number of columns. Default: square-ish grid."},
+                    "gap": {"type": "number", "description": "Gap between objects in pixels. Default 30."},
+                },
+                "required": [],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "arrangeInFrame",
+            "description": "Move existing objects into a frame and lay them out in a grid inside it, growing the frame if needed.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "frame": {"type": "string", "description": "ID or title of the target frame"},
+                    "objectIds": {"type": "array", "items": {"type": "string"}, "description": "IDs of the objects to move into the frame"},
+                    "selection": {"type": "string", "description": "Name of a selectObjects selection to use instead of objectIds"},
+                    "columns": {"type": "integer", "description": "Number of columns. Default: as many as fit."},
+                },
+                "required": ["frame"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "createTemplate",
+            "description": "Create a complete structured template (frames, heading and sticky notes) near the viewport, laid out by the server without overlapping existing objects. Use for SWOT analyses, kanban boards and retrospectives.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "template": {"type": "string", "enum": ["swot", "kanban", "retro"], "description": "Template to create"},
+                    "title": {"type": "string", "description": "Heading text. Defaults to the template name."},
+                    "sections": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Custom section/column titles, replacing the template defaults (SWOT: Strengths, Weaknesses, Opportunities, Threats; kanban: To Do, In Progress, Done; retro: What Went Well, What Didn't Go Well, Action Items).",
+                    },
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": {"type": "array", "items": {"type": "string"}},
+                        "description": "Sticky-note texts per section, keyed by section title.",
+                    },
+                },
+                "required": ["template"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -223,6 +373,8 @@ TOOLS = [
                         },
                         "description": "Area to place objects in. Defaults to 5000x3000 starting at (0,0).",
                     },
+                    "nonOverlapping": {"type": "boolean", "description": "Place objects on a jittered grid so none overlap. Default false."},
+                    "seed": {"type": "integer", "description": "Random seed for reproducible output."},
                 },
                 "required": ["count"],
             },
@@ -0,0 +1,54 @@
+"""Throughput of the bulkCreate generator, per-object vs columnar createMany.
+
+Run from backend/:  python -m benchmarks.bulk_create
+"""
+
+import json
+import time
+
+from app.bulk import generate_bulk_actions, iter_bulk_create_many
+
+COUNTS = [1_000, 10_000, 100_000]
+
+
+def bench(count: int, non_overlapping: bool) -> tuple[float, float]:
+    args = {"count": count, "seed": 0, "nonOverlapping": non_overlapping}
+    start = time.perf_counter()
+    actions = generate_bulk_actions(args)
+    generated = time.perf_counter() - start
+    json.dumps([a.model_dump(exclude_none=True) for a in actions])
+    serialized = time.perf_counter() - start
+    return generated, serialized
+
+
+def bench_encoding(count: int) -> dict[str, tuple[float, int]]:
+    """Generate + serialize time and JSON size for both response encodings."""
+    args = {"count": count, "seed": 0}
+    results = {}
+    for name, make in (
+        ("per-object", lambda: generate_bulk_actions(args)),
+        ("createMany", lambda: list(iter_bulk_create_many(args))),
+    ):
+        start = time.perf_counter()
+        body = json.dumps([a.model_dump(exclude_none=True) for a in make()])
+        results[name] = (time.perf_counter() - start, len(body))
+    return results
+
+
+def main():
+    print(f"{'count':>8} {'layout':>8} {'generate':>10} {'objs/s':>12} {'+json':>10}")
+    for count in COUNTS:
+        for non_overlapping in (False, True):
+            generated, serialized = bench(count, non_overlapping)
+            layout = "grid" if non_overlapping else "random"
+            print(f"{count:>8,} {layout:>8} {generated * 1000:>8.1f}ms {count / generated:>12,.0f} {serialized * 1000:>8.1f}ms")
+
+    print()
+    print(f"{'count':>8} {'encoding':>11} {'gen+json':>10} {'bytes':>12}")
+    for count in COUNTS:
+        for name, (elapsed, size) in bench_encoding(count).items():
+            print(f"{count:>8,} {name:>11} {elapsed * 1000:>8.1f}ms {size:>12,}")
+
+
+if __name__ == "__main__":
+    main()
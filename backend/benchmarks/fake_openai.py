@@ -0,0 +1,130 @@
+"""Stand-in OpenAI-compatible chat completions server for offline benchmarks.
+
+Answers `POST /v1/chat/completions` with canned tool calls after a
+configurable delay, either as one JSON response or as an SSE stream that
+splits the tool-call arguments into fragments (with `stream_options.
+include_usage` honoured). Usage reports prompt tokens estimated from the
+request size, so token counters move as they would against the real API.
+
+Used in-process by `benchmarks.load`, or standalone for a running backend
+(set OPENAI_BASE_URL=http://localhost:9000/v1):
+
+    python -m benchmarks.fake_openai --port 9000 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# A small flowchart: two notes, a connector between them, and an edit.
+DEFAULT_TOOL_CALLS = [
+    ("createStickyNote", {"x": 100, "y": 100, "text": "Start", "color": "#FDE68A"}),
+    ("createStickyNote", {"x": 400, "y": 100, "text": "Finish", "color": "#BBF7D0"}),
+    ("createConnector", {"fromId": "new-1", "toId": "new-2"}),
+    ("moveObject", {"objectId": "obj000001xxxxxxxxxxx", "x": 700, "y": 100}),
+]
+
+
+def create_fake_openai(
+    latency_s: float = 0.05,
+    chunk_delay_s: float = 0.0,
+    tool_calls: list[tuple[str, dict]] | None = None,
+    content: str = "Done!",
+    fragments: int = 3,
+) -> FastAPI:
+    """ASGI app serving canned completions.
+
+    `latency_s` is the delay before the response (time to first token when
+    streaming), `chunk_delay_s` the gap between stream chunks, and
+    `fragments` how many pieces each tool call's arguments are split into.
+    """
+    tool_calls = DEFAULT_TOOL_CALLS if tool_calls is None else tool_calls
+    app = FastAPI()
+
+    def usage(body: bytes) -> dict:
+        prompt = len(body) // 4
+        completion = sum(len(json.dumps(args)) for _, args in tool_calls) // 4 + len(content) // 4
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+    def chunk(model: str, delta: dict, finish_reason: str | None = None) -> str:
+        payload = {
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream(model: str, body: bytes, include_usage: bool):
+        yield chunk(model, {"role": "assistant", "content": None})
+        for index, (name, args) in enumerate(tool_calls):
+            arguments = json.dumps(args)
+            step = max(1, -(-len(arguments) // fragments))
+            for start in range(0, len(arguments), step):
+                if chunk_delay_s:
+                    await asyncio.sleep(chunk_delay_s)
+                call = {"index": index, "function": {"arguments": arguments[start:start + step]}}
+                if start == 0:
+                    call.update(id=f"call_{index}", type="function")
+                    call["function"]["name"] = name
+                yield chunk(model, {"tool_calls": [call]})
+        if content:
+            yield chunk(model, {"content": content})
+        yield chunk(model, {}, "tool_calls" if tool_calls else "stop")
+        if include_usage:
+            payload = {
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model, "choices": [], "usage": usage(body),
+            }
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.body()
+        params = json.loads(body)
+        model = params.get("model", "fake-model")
+        await asyncio.sleep(latency_s)
+
+        if params.get("stream"):
+            include_usage = bool((params.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(stream(model, body, include_usage), media_type="text/event-stream")
+
+        message = {
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+                for i, (name, args) in enumerate(tool_calls)
+            ] or None,
+        }
+        return JSONResponse({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": usage(body),
+        })
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--chunk-delay-ms", type=float, default=0)
+    args = parser.parse_args()
+    app = create_fake_openai(args.latency_ms / 1000, args.chunk_delay_ms / 1000)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Import-time breakdown of the backend, the bulk of a Cloud Run cold start.
+
+Imports `main` in fresh interpreters under `python -X importtime` and
+reports the total and the time attributed to each top-level package (the
+sum of its modules' own import time) and to each `app.*` module, taking the
+median over several runs. Compares the total and every package against
+`import_baseline.json` (exit status 1 on regression), so a change that
+makes a heavy dependency load eagerly again shows up by name.
+
+Run from backend/:
+    python -m benchmarks.import_time                    # compare with the baseline
+    python -m benchmarks.import_time --save-baseline    # record a new baseline
+
+Baselines are machine-specific; re-record them when changing hardware.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BASELINE_PATH = Path(__file__).with_name("import_baseline.json")
+BACKEND = Path(__file__).resolve().parent.parent
+
+ENV_DEFAULTS = {"OPENAI_API_KEY": "sk-bench-fake-key", "GOOGLE_CLOUD_PROJECT": "bench-project"}
+
+# Packages below this many milliseconds are neither reported nor compared.
+MIN_MS = 5.0
+
+
+def measure_once() -> dict[str, float]:
+    """Milliseconds per top-level package and `app.*` module, plus "total"."""
+    env = {**ENV_DEFAULTS, **os.environ}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    times: dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        times[name.split(".")[0]] += int(self_us) / 1000
+        if name.startswith("app."):
+            times[name] = int(cumulative_us) / 1000
+        if name == "main":
+            times["total"] = int(cumulative_us) / 1000
+    return times
+
+
+def measure(runs: int) -> dict[str, float]:
+    samples = [measure_once() for _ in range(runs)]
+    names = set().union(*samples)
+    medians = {name: round(statistics.median(s.get(name, 0.0) for s in samples), 1) for name in names}
+    return {name: ms for name, ms in sorted(medians.items(), key=lambda kv: -kv[1]) if ms >= MIN_MS}
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Regressions beyond `tolerance` (fractional), including packages new since the baseline."""
+    regressions = []
+    for name, ms in results.items():
+        base = baseline.get(name)
+        if base is None:
+            regressions.append(f"{name}: not in baseline, now {ms} ms")
+        elif ms > base * (1 + tolerance) and ms - base >= MIN_MS:
+            regressions.append(f"{name}: {base} -> {ms} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed fractional regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    for name, ms in results.items():
+        print(f"{name:>32} {ms:8.1f} ms")
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {BASELINE_PATH.name}")
+        return
+    if not BASELINE_PATH.exists():
+        print("No baseline recorded; run with --save-baseline first.")
+        return
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
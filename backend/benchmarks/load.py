@@ -0,0 +1,204 @@
+"""Offline load test of /api/ai/command against a fake OpenAI server.
+
+Drives the real FastAPI app in-process (httpx ASGI transport, auth
+bypassed) with N concurrent clients sending synthetic boards of 10, 1k and
+10k objects; the OpenAI client is pointed at `benchmarks.fake_openai`, so
+runs need no network or API key and the model time is a fixed, known delay.
+Reports p50/p95/p99 latency, throughput and peak RSS per scenario, and
+compares p95 and RPS against `baseline.json` (exit status 1 on regression).
+Each scenario runs in a fresh interpreter, so its peak RSS (and the app's
+caches and stores) are its own rather than left over from a larger one.
+
+Run from backend/:
+    python -m benchmarks.load                    # compare with the baseline
+    python -m benchmarks.load --save-baseline    # record a new baseline
+
+Baselines are machine-specific; re-record them when changing hardware.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-fake-key")
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "bench-project")
+# All load comes from one user.
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+
+import firebase_admin  # noqa: E402
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+# Auth is overridden below; keep auth.py from initializing a real app.
+firebase_admin._apps = {"[DEFAULT]": object()}
+
+from langfuse.openai import AsyncOpenAI  # type: ignore # noqa: E402
+
+import app.routes.ai as ai_routes  # noqa: E402
+from app.auth import verify_firebase_token  # noqa: E402
+from benchmarks.fake_openai import create_fake_openai  # noqa: E402
+from benchmarks.synthetic import make_body  # noqa: E402
+from main import app  # noqa: E402
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Not in the fast-path grammar, so every request reaches the (fake) model.
+COMMAND = "move the pink notes to the right"
+
+# name -> (endpoint, board objects, requests, identical). Requests go to
+# distinct boards unless `identical`, which sends one body to be coalesced.
+SCENARIOS = {
+    "command-10": ("/api/ai/command", 10, 200, False),
+    "command-1k": ("/api/ai/command", 1_000, 100, False),
+    "command-10k": ("/api/ai/command", 10_000, 20, False),
+    "stream-1k": ("/api/ai/command/stream", 1_000, 100, False),
+    "identical-1k": ("/api/ai/command", 1_000, 100, True),
+}
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _fake_verify(authorization: str = "Bearer bench"):
+    return {"uid": "bench-user", "email": "bench@example.com"}
+
+
+async def run_scenario(
+    http: httpx.AsyncClient, endpoint: str, count: int, requests: int, identical: bool, concurrency: int,
+) -> dict:
+    """Send `requests` commands with at most `concurrency` in flight."""
+    if identical:
+        bodies = [make_body(count, COMMAND, boardId="bench-identical")]
+    else:
+        bodies = [make_body(count, COMMAND, seed=i % 8, boardId=f"bench-{i}") for i in range(requests)]
+    latencies: list[float] = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            start = time.perf_counter()
+            response = await http.post(
+                endpoint, content=bodies[i % len(bodies)],
+                headers={"Content-Type": "application/json", "Authorization": "Bearer bench"},
+            )
+            # SSE errors arrive in-band with a 200 status.
+            if response.status_code != 200 or b"event: error" in response.content:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "rps": round(requests / elapsed, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def run(names: list[str], concurrency: int, latency_s: float) -> dict[str, dict]:
+    fake = create_fake_openai(latency_s=latency_s)
+    ai_routes.client = AsyncOpenAI(
+        api_key="sk-bench-fake-key",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake)),
+    )
+    app.dependency_overrides[verify_firebase_token] = _fake_verify
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+            for name in names:
+                results[name] = await run_scenario(http, *SCENARIOS[name], concurrency)
+                print(f"{name:>12} " + " ".join(f"{k}={v}" for k, v in results[name].items()))
+    return results
+
+
+def run_isolated(name: str, concurrency: int, latency_ms: float) -> dict:
+    """Results of one scenario run alone in a child interpreter."""
+    proc = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.load", "--scenario", name, "--json",
+            "--concurrency", str(concurrency), "--latency-ms", str(latency_ms),
+        ],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(proc.stdout.splitlines()[-1])[name]
+    print(f"{name:>12} " + " ".join(f"{k}={v}" for k, v in result.items()))
+    return result
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Regressions beyond `tolerance` (fractional) in p95 latency or RPS."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {base['rps']} -> {current['rps']}")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake model response delay")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="run in this process and print results as JSON")
+    args = parser.parse_args()
+
+    # Per-request logging (and langfuse's missing-key warnings) would dominate.
+    logging.disable(logging.WARNING)
+
+    names = args.scenario or list(SCENARIOS)
+    if args.json:
+        results = asyncio.run(run(names, args.concurrency, args.latency_ms / 1000))
+        print(json.dumps(results))
+        return
+    results = {name: run_isolated(name, args.concurrency, args.latency_ms) for name in names}
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline to {BASELINE_PATH.name}")
+        return
+    if not BASELINE_PATH.exists():
+        print("No baseline recorded; run with --save-baseline first.")
+        return
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Request body -> prompt text, before and after the fast JSON path.
+
+"before" mirrors the original handler: json.loads + model validation, then
+model_dump per object and json.dumps. "after" validates straight from bytes
+with pydantic-core and renders the compact board context.
+
+Run from backend/:  python -m benchmarks.request_to_prompt
+"""
+
+import json
+import time
+
+from app.board_context import build_board_context
+from app.schemas import AiCommandRequest
+from benchmarks.synthetic import make_body
+
+COUNTS = [1_000, 10_000]
+
+
+def before(body: bytes) -> str:
+    request = AiCommandRequest.model_validate(json.loads(body))
+    return json.dumps([obj.model_dump(exclude_none=True) for obj in request.boardState], indent=None)
+
+
+def after(body: bytes, budget: int) -> str:
+    request = AiCommandRequest.model_validate_json(body)
+    return build_board_context(request.boardState, request.command, request.viewportCenter, budget)
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'objects':>8} {'path':>20} {'time':>10} {'prompt chars':>14}")
+    for count in COUNTS:
+        body = make_body(count)
+        rows = [
+            ("before", lambda: before(body)),
+            ("after (no pruning)", lambda: after(body, budget=10**9)),
+            ("after (8k budget)", lambda: after(body, budget=8000)),
+        ]
+        for name, fn in rows:
+            elapsed = timed(fn)
+            print(f"{count:>8,} {name:>20} {elapsed * 1000:>8.1f}ms {len(fn()):>14,}")
+
+
+if __name__ == "__main__":
+    main()
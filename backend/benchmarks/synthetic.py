@@ -0,0 +1,32 @@
+"""Synthetic boards and request bodies for the benchmarks."""
+
+import json
+import random
+
+TYPES = ["stickyNote", "rectangle", "circle", "text", "frame"]
+COLORS = ["#FDE68A", "#FBCFE8", "#BFDBFE", "#BBF7D0"]
+
+
+def object_id(i: int) -> str:
+    """Firestore-length (20 char) id for the i-th synthetic object."""
+    return f"obj{i:06d}xxxxxxxxxxx"
+
+
+def make_board(count: int, seed: int = 0) -> list[dict]:
+    """`count` objects shaped like what the frontend sends, including null fields."""
+    rng = random.Random(seed)
+    board = []
+    for i in range(count):
+        board.append({
+            "id": object_id(i), "type": rng.choice(TYPES),
+            "x": rng.uniform(0, 10000), "y": rng.uniform(0, 10000),
+            "width": 200, "height": 150, "text": f"Item {i}", "color": rng.choice(COLORS),
+            "rotation": 0, "zIndex": i, "createdBy": "user-abc",
+            "radius": None, "title": None, "fontSize": None,
+        })
+    return board
+
+
+def make_body(count: int, command: str = "move the pink notes", seed: int = 0, **extra) -> bytes:
+    """JSON body for /api/ai/command with a synthetic board of `count` objects."""
+    return json.dumps({"command": command, "boardState": make_board(count, seed), **extra}).encode()
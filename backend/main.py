@@ -1,9 +1,14 @@
 import logging
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from app import metrics
+from app.auth import verify_ops_token
+from app.clients import close_clients, open_clients, pool_stats, warmup
 from app.config import settings
 from app.routes.ai import router as ai_router
 
@@ -30,7 +35,19 @@ else:
 _level = logging.INFO if os.getenv("K_SERVICE") else logging.DEBUG
 logging.basicConfig(level=_level, handlers=[_handler])
 
-app = FastAPI(title="CollabBoard AI Agent")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_clients()
+    if settings.warmup_on_startup:
+        logging.getLogger(__name__).info(f"Warmup: {await warmup()}")
+    try:
+        yield
+    finally:
+        await close_clients()
+
+
+app = FastAPI(title="CollabBoard AI Agent", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,3 +63,25 @@ app.include_router(ai_router, prefix="/api/ai")
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/warmup", dependencies=[Depends(verify_ops_token)])
+async def warmup_clients():
+    """Create the OpenAI and Firebase clients and open their connections.
+
+    Meant for a Cloud Run startup probe (sending the ops token), so the
+    first user command does not pay the imports, TLS handshakes and
+    certificate fetches.
+    """
+    steps = await warmup()
+    return {
+        "status": "ok" if all(step["ok"] for step in steps.values()) else "degraded",
+        "steps": steps,
+        "pool": pool_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(verify_ops_token)])
+async def prometheus_metrics():
+    """Per-process counters and latency histograms in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -5,6 +5,8 @@ from unittest.mock import MagicMock
 # Set env vars BEFORE any app imports
 os.environ.setdefault("OPENAI_API_KEY", "sk-test-fake-key")
 os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+# Every test calls as the same user; rate limiting is exercised in test_rate_limit.
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
 
 # Mock Firebase before auth.py import
 import firebase_admin
@@ -48,10 +50,63 @@ def sample_board_state():
 
 @pytest.fixture
 def make_tool_call():
-    """Factory for creating mock OpenAI tool_call objects."""
-    def _make(name: str, arguments: dict):
+    """Factory for creating mock OpenAI tool_call objects.
+
+    `arguments` is a dict, or a string for raw (possibly invalid) JSON.
+    """
+    def _make(name: str, arguments: dict | str, call_id: str | None = None):
         tc = MagicMock()
+        if call_id is not None:
+            tc.id = call_id
         tc.function.name = name
-        tc.function.arguments = json.dumps(arguments)
+        tc.function.arguments = arguments if isinstance(arguments, str) else json.dumps(arguments)
         return tc
     return _make
+
+
+@pytest.fixture
+def make_completion():
+    """Factory for mock chat.completions.create responses with one choice."""
+    def _make(tool_calls=None, content=None, finish_reason="stop"):
+        message = MagicMock(tool_calls=tool_calls, content=content)
+        return MagicMock(choices=[MagicMock(message=message, finish_reason=finish_reason)], usage=None)
+    return _make
+
+
+@pytest.fixture
+def make_chunk():
+    """Factory for mock streaming chunks."""
+    def _make(content=None, tool_calls=None, finish_reason=None):
+        chunk = MagicMock()
+        chunk.usage = None
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = content
+        chunk.choices[0].delta.tool_calls = tool_calls
+        chunk.choices[0].finish_reason = finish_reason
+        return chunk
+    return _make
+
+
+@pytest.fixture
+def make_tool_delta():
+    """Factory for the tool-call deltas of a streaming chunk."""
+    def _make(index: int, name: str | None = None, arguments: str | None = None, call_id: str | None = None):
+        delta = MagicMock()
+        delta.index = index
+        if call_id is not None:
+            delta.id = call_id
+        delta.function.name = name
+        delta.function.arguments = arguments
+        return delta
+    return _make
+
+
+@pytest.fixture
+def make_stream():
+    """Factory for a mock streaming response that yields `chunks`."""
+    def _make(chunks):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        return stream()
+    return _make
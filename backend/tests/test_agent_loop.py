@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch, AsyncMock
+
+from app.config import settings
+
+
+BOARD = [
+    {"id": "f1", "type": "frame", "x": 0, "y": 0, "width": 400, "height": 300, "title": "Ideas"},
+    {"id": "n1", "type": "stickyNote", "x": 20, "y": 50, "text": "Hello", "color": "#FBCFE8"},
+]
+HEADERS = {"Authorization": "Bearer fake"}
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_creates_and_connects_in_one_round(mock_create, client, make_tool_call, make_completion):
+    mock_create.return_value = make_completion([
+        make_tool_call("createStickyNote", {"x": 0, "y": 0, "text": "Start"}, "c1"),
+        make_tool_call("createShape", {"shapeType": "rectangle", "x": 300, "y": 0}, "c2"),
+        make_tool_call("createConnector", {"fromId": "new-1", "toId": "new-2"}, "c3"),
+    ], "Flowchart ready")
+
+    resp = client.post("/api/ai/command", json={"command": "flowchart", "boardState": BOARD}, headers=HEADERS)
+
+    actions = resp.json()["actions"]
+    assert mock_create.await_count == 1
+    assert [a.get("tempId") for a in actions] == ["new-1", "new-2", None]
+    assert actions[2]["properties"]["fromId"] == "new-1"
+    assert actions[2]["properties"]["toId"] == "new-2"
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_lookup_results_feed_a_second_round(mock_create, client, make_tool_call, make_completion):
+    mock_create.side_effect = [
+        make_completion([
+            make_tool_call("getFrameBounds", {"frame": "ideas"}, "c1"),
+            make_tool_call("findObjects", {"filter": {"colors": ["#fbcfe8"]}}, "c2"),
+        ]),
+        make_completion([make_tool_call("moveObject", {"objectId": "n1", "x": 40, "y": 60}, "c3")], "Moved"),
+    ]
+
+    resp = client.post("/api/ai/command", json={"command": "tidy the pink note", "boardState": BOARD},
+                       headers=HEADERS)
+
+    assert resp.json()["actions"] == [{"type": "update", "objectId": "n1", "properties": {"x": 40, "y": 60}}]
+    assert resp.json()["message"] == "Moved"
+    followup = mock_create.call_args_list[1].kwargs["messages"]
+    assert followup[-3]["tool_calls"][0]["function"]["name"] == "getFrameBounds"
+    assert json.loads(followup[-2]["content"]) == {"id": "f1", "x": 0, "y": 0, "width": 400, "height": 300}
+    found = json.loads(followup[-1]["content"])
+    assert found["count"] == 1 and found["objects"][0]["id"] == "n1"
+    assert followup[-1]["tool_call_id"] == "c2"
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_loop_stops_at_round_budget(mock_create, client, make_tool_call, make_completion):
+    mock_create.return_value = make_completion([make_tool_call("findObjects", {}, "c1")])
+
+    resp = client.post("/api/ai/command", json={"command": "look around", "boardState": BOARD}, headers=HEADERS)
+
+    assert resp.status_code == 200
+    assert mock_create.await_count == settings.ai_max_rounds
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_stream_runs_followup_round(mock_create, client, make_chunk, make_tool_delta, make_stream):
+    note = '{"x": 20, "y": 40, "text": "Inside"}'
+    mock_create.side_effect = [
+        make_stream([make_chunk(tool_calls=[make_tool_delta(0, "getFrameBounds", '{"frame": "f1"}', "c1")])]),
+        make_stream([
+            make_chunk(tool_calls=[make_tool_delta(0, "createStickyNote", note, "c2")]),
+            make_chunk(content="Added"),
+        ]),
+    ]
+
+    resp = client.post("/api/ai/command/stream", json={"command": "add a note to f1", "boardState": BOARD},
+                       headers=HEADERS)
+
+    blocks = [dict(line.split(": ", 1) for line in b.splitlines()) for b in resp.text.strip().split("\n\n")]
+    assert [b["event"] for b in blocks] == ["action", "done"]
+    assert json.loads(blocks[0]["data"])["tempId"] == "new-1"
+    assert json.loads(blocks[1]["data"])["message"] == "Added"
+    assert mock_create.call_args_list[1].kwargs["messages"][-1]["tool_call_id"] == "c1"
@@ -1,4 +1,4 @@
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
 
 def _mock_openai_response(tool_calls=None, content="Done!"):
@@ -11,7 +11,7 @@ def _mock_openai_response(tool_calls=None, content="Done!"):
     return mock_response
 
 
-@patch("app.routes.ai.client.chat.completions.create")
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
 def test_single_tool_call(mock_create, client, sample_board_state, make_tool_call):
     tc = make_tool_call("createStickyNote", {"x": 100, "y": 200, "text": "Test"})
     mock_create.return_value = _mock_openai_response(tool_calls=[tc], content="Created!")
@@ -29,7 +29,7 @@ def test_single_tool_call(mock_create, client, sample_board_state, make_tool_cal
     assert data["message"] == "Created!"
 
 
-@patch("app.routes.ai.client.chat.completions.create")
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
 def test_no_tool_calls(mock_create, client, sample_board_state):
     mock_create.return_value = _mock_openai_response(content="I can't do that")
 
@@ -44,7 +44,7 @@ def test_no_tool_calls(mock_create, client, sample_board_state):
     assert data["message"] == "I can't do that"
 
 
-@patch("app.routes.ai.client.chat.completions.create")
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
 def test_delete_all(mock_create, client, sample_board_state, make_tool_call):
     tc = make_tool_call("deleteAll", {})
     mock_create.return_value = _mock_openai_response(tool_calls=[tc])
@@ -62,7 +62,7 @@ def test_delete_all(mock_create, client, sample_board_state, make_tool_call):
     assert ids == {"obj-1", "obj-2"}
 
 
-@patch("app.routes.ai.client.chat.completions.create")
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
 def test_bulk_create(mock_create, client, sample_board_state, make_tool_call):
     tc = make_tool_call("bulkCreate", {"count": 5})
     mock_create.return_value = _mock_openai_response(tool_calls=[tc])
@@ -78,7 +78,7 @@ def test_bulk_create(mock_create, client, sample_board_state, make_tool_call):
     assert all(a["type"] == "create" for a in data["actions"])
 
 
-@patch("app.routes.ai.client.chat.completions.create")
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
 def test_openai_error_returns_500(mock_create, client, sample_board_state):
     mock_create.side_effect = Exception("API down")
 
@@ -89,3 +89,79 @@ def test_openai_error_returns_500(mock_create, client, sample_board_state):
 
     assert resp.status_code == 500
     assert resp.json()["detail"] == "AI request failed"
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_queue_full_returns_503(mock_create, client, sample_board_state):
+    from app.concurrency import QueueFullError
+    from app.routes.ai import limiter
+
+    with patch.object(limiter, "slot", side_effect=QueueFullError("full")):
+        resp = client.post("/api/ai/command", json={
+            "command": "create something",
+            "boardState": sample_board_state,
+        }, headers={"Authorization": "Bearer fake"})
+
+    assert resp.status_code == 503
+    mock_create.assert_not_called()
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_select_and_update_selection(mock_create, client, make_tool_call):
+    board = [
+        {"id": "p1", "type": "stickyNote", "x": 0, "y": 0, "color": "#FBCFE8"},
+        {"id": "p2", "type": "stickyNote", "x": 300, "y": 0, "color": "#FBCFE8"},
+        {"id": "y1", "type": "stickyNote", "x": 600, "y": 0, "color": "#FDE68A"},
+    ]
+    mock_create.return_value = _mock_openai_response(tool_calls=[
+        make_tool_call("selectObjects", {"filter": {"types": ["stickyNote"], "colors": ["#FBCFE8"]}}),
+        make_tool_call("updateSelection", {"dx": 100}),
+    ])
+
+    resp = client.post("/api/ai/command", json={
+        "command": "move all pink sticky notes to the right",
+        "boardState": board,
+    }, headers={"Authorization": "Bearer fake"})
+
+    assert resp.status_code == 200
+    actions = resp.json()["actions"]
+    assert [(a["objectId"], a["properties"]) for a in actions] == [
+        ("p1", {"x": 100, "y": 0}),
+        ("p2", {"x": 400, "y": 0}),
+    ]
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_create_template_tool(mock_create, client, make_tool_call):
+    mock_create.return_value = _mock_openai_response(tool_calls=[
+        make_tool_call("createTemplate", {"template": "kanban", "items": {"To Do": ["Write docs"]}}),
+    ])
+
+    resp = client.post("/api/ai/command", json={
+        "command": "create a kanban board",
+        "boardState": [],
+        "viewportCenter": {"x": 1000, "y": 800},
+    }, headers={"Authorization": "Bearer fake"})
+
+    assert resp.status_code == 200
+    types = [a["objectType"] for a in resp.json()["actions"]]
+    assert types == ["text", "frame", "stickyNote", "frame", "frame"]
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_prompt_prefix_is_stable_across_commands(mock_create, client, sample_board_state):
+    mock_create.return_value = _mock_openai_response(content="ok")
+    headers = {"Authorization": "Bearer fake"}
+
+    client.post("/api/ai/command", json={"command": "make it blue", "boardState": sample_board_state},
+                headers=headers)
+    first = mock_create.call_args.kwargs
+    client.post("/api/ai/command", json={
+        "command": "delete the note", "boardState": list(reversed(sample_board_state)),
+        "viewportCenter": {"x": 10, "y": 10},
+    }, headers=headers)
+    second = mock_create.call_args.kwargs
+
+    assert first["tools"] == second["tools"]
+    assert first["messages"][:2] == second["messages"][:2]
+    assert "delete the note" in second["messages"][-1]["content"]
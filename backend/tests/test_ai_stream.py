@@ -0,0 +1,127 @@
+import json
+from unittest.mock import patch, AsyncMock
+
+from app.token_budget import CONTINUE_PROMPT
+
+
+def _parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_stream_emits_actions_then_done(
+    mock_create, client, sample_board_state, make_chunk, make_tool_delta, make_stream,
+):
+    mock_create.return_value = make_stream([
+        make_chunk(tool_calls=[make_tool_delta(0, "createStickyNote", '{"x": 1')]),
+        make_chunk(tool_calls=[make_tool_delta(0, None, '0, "y": 20, "text": "A"}')]),
+        make_chunk(tool_calls=[make_tool_delta(1, "deleteObject", '{"objectId": "obj-1"}')]),
+        make_chunk(content="Created "),
+        make_chunk(content="and deleted."),
+    ])
+
+    resp = client.post("/api/ai/command/stream", json={
+        "command": "create a note and delete obj-1",
+        "boardState": sample_board_state,
+    }, headers={"Authorization": "Bearer fake"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _parse_events(resp.text)
+    assert [e for e, _ in events] == ["action", "action", "done"]
+    assert events[0][1]["objectType"] == "stickyNote"
+    assert events[0][1]["properties"]["x"] == 10
+    assert events[1][1] == {"type": "delete", "objectId": "obj-1"}
+    assert events[2][1]["message"] == "Created and deleted."
+    assert mock_create.call_args.kwargs["stream"] is True
+    assert mock_create.call_args.kwargs["stream_options"] == {"include_usage": True}
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_stream_skips_malformed_tool_call(
+    mock_create, client, sample_board_state, make_completion, make_chunk, make_tool_delta, make_stream,
+):
+    unrepaired = make_completion()
+    mock_create.side_effect = [
+        make_stream([
+            make_chunk(tool_calls=[make_tool_delta(0, "moveObject", '{"objectId": ')]),
+            make_chunk(tool_calls=[make_tool_delta(1, "deleteAll", "{}")]),
+        ]),
+        unrepaired,
+    ]
+
+    resp = client.post("/api/ai/command/stream", json={
+        "command": "clear",
+        "boardState": sample_board_state,
+    }, headers={"Authorization": "Bearer fake"})
+
+    events = _parse_events(resp.text)
+    assert [e for e, _ in events] == ["action", "action", "done"]
+    assert {d["objectId"] for _, d in events[:2]} == {"obj-1", "obj-2"}
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_stream_openai_error_emits_error_event(mock_create, client, sample_board_state):
+    mock_create.side_effect = Exception("API down")
+
+    resp = client.post("/api/ai/command/stream", json={
+        "command": "create something",
+        "boardState": sample_board_state,
+    }, headers={"Authorization": "Bearer fake"})
+
+    assert resp.status_code == 200
+    assert _parse_events(resp.text) == [("error", {"detail": "AI request failed"})]
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_stream_continues_reply_cut_off_at_length(
+    mock_create, client, sample_board_state, make_chunk, make_tool_delta, make_stream,
+):
+    cut_off = make_chunk(tool_calls=[make_tool_delta(1, "createStickyNote", '{"x": 0, "y": 2')], finish_reason="length")
+    mock_create.side_effect = [
+        make_stream([
+            make_chunk(tool_calls=[make_tool_delta(0, "createStickyNote", '{"x": 0, "y": 0, "text": "A"}')]),
+            cut_off,
+        ]),
+        make_stream([
+            make_chunk(tool_calls=[make_tool_delta(0, "createStickyNote", '{"x": 0, "y": 200, "text": "B"}')]),
+        ]),
+    ]
+
+    resp = client.post("/api/ai/command/stream", json={
+        "command": "add two notes",
+        "boardState": sample_board_state,
+    }, headers={"Authorization": "Bearer fake"})
+
+    events = _parse_events(resp.text)
+    assert [e for e, _ in events] == ["action", "action", "done"]
+    assert [d["properties"]["text"] for _, d in events[:2]] == ["A", "B"]
+    assert mock_create.call_args.kwargs["messages"][-1]["content"] == CONTINUE_PROMPT
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_stream_repaired_create_keeps_its_temp_id(
+    mock_create, client, make_tool_call, make_completion, make_chunk, make_tool_delta, make_stream,
+):
+    repaired = make_completion([make_tool_call("createShape", {"shapeType": "circle", "x": 0, "y": 0})])
+    mock_create.side_effect = [
+        make_stream([
+            make_chunk(tool_calls=[make_tool_delta(0, "createShape", '{"x": 0, "y": 0}')]),
+            make_chunk(tool_calls=[make_tool_delta(1, "createStickyNote", '{"x": 300, "y": 0, "text": "B"}')]),
+            make_chunk(tool_calls=[make_tool_delta(2, "createConnector", '{"fromId": "new-1", "toId": "new-2"}')]),
+        ]),
+        repaired,
+    ]
+
+    resp = client.post("/api/ai/command/stream", json={
+        "command": "add a circle and a note B, then connect the circle to the note",
+        "boardState": [],
+    }, headers={"Authorization": "Bearer fake"})
+
+    ids = {data["objectType"]: data.get("tempId") for event, data in _parse_events(resp.text) if event == "action"}
+    assert ids["circle"] == "new-1"
+    assert ids["stickyNote"] == "new-2"
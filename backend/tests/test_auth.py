@@ -1,8 +1,18 @@
+import time
+
 import pytest
 from unittest.mock import patch
 from fastapi import HTTPException
 
 
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    from app.auth import token_cache
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
 @pytest.mark.asyncio
 async def test_missing_bearer_prefix():
     from app.auth import verify_firebase_token
@@ -31,3 +41,63 @@ async def test_valid_token(mock_verify):
     result = await verify_firebase_token("Bearer good-token")
     assert result["uid"] == "abc"
     mock_verify.assert_called_once_with("good-token")
+
+
+@pytest.mark.asyncio
+@patch("app.auth.firebase_auth.verify_id_token")
+async def test_verified_token_is_cached_until_exp(mock_verify):
+    from app.auth import verify_firebase_token
+    mock_verify.return_value = {"uid": "abc", "exp": time.time() + 3600}
+    await verify_firebase_token("Bearer good-token")
+    result = await verify_firebase_token("Bearer good-token")
+    assert result["uid"] == "abc"
+    mock_verify.assert_called_once_with("good-token")
+
+
+@pytest.mark.asyncio
+@patch("app.auth.firebase_auth.verify_id_token")
+async def test_invalid_token_is_not_cached(mock_verify):
+    from app.auth import verify_firebase_token
+    mock_verify.side_effect = Exception("bad token")
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await verify_firebase_token("Bearer bad-token")
+    assert mock_verify.call_count == 2
+
+
+def test_cache_honors_exp_and_max_ttl():
+    from app.auth import TokenCache
+    cache = TokenCache(max_size=10, max_ttl=60)
+    cache.put("expired", {"uid": "a", "exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+    cache.put("fresh", {"uid": "b", "exp": time.time() + 3600})
+    with patch("app.auth.time.time", return_value=time.time() + 61):
+        assert cache.get("fresh") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    from app.auth import TokenCache
+    cache = TokenCache(max_size=2, max_ttl=60)
+    exp = time.time() + 3600
+    cache.put("t1", {"uid": "1", "exp": exp})
+    cache.put("t2", {"uid": "2", "exp": exp})
+    cache.get("t1")
+    cache.put("t3", {"uid": "3", "exp": exp})
+    assert cache.get("t2") is None
+    assert cache.get("t1")["uid"] == "1"
+    assert cache.get("t3")["uid"] == "3"
+
+
+@pytest.mark.parametrize("endpoint", ["/api/ai/command", "/api/ai/command/stream"])
+def test_auth_runs_before_body_validation(endpoint):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    resp = TestClient(app).post(
+        endpoint, json={"command": "hi", "boardState": [{"id": 1}]}, headers={"Authorization": "Basic dXNlcg=="},
+    )
+
+    assert resp.status_code == 401
+    assert "boardState" not in resp.text
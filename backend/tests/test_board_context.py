@@ -0,0 +1,68 @@
+from app.board_context import build_board_context, compact_board, compact_object, estimate_tokens
+from app.schemas import BoardObject
+
+
+def _note(i, color="#FDE68A", text=None, x=None, y=0):
+    return BoardObject(
+        id=f"note-{i}", type="stickyNote", x=x if x is not None else i * 10, y=y,
+        width=200, height=150, color=color, text=text or f"Idea {i}", rotation=0, zIndex=i,
+    )
+
+
+def test_compact_object_drops_defaults_and_rounds():
+    obj = BoardObject(id="a", type="stickyNote", x=10.6, y=20.2, width=200, height=150,
+                      text="Hi", color="#FDE68A", rotation=0, zIndex=3, createdBy="u1")
+    assert compact_object(obj) == {"id": "a", "t": "stickyNote", "x": 11, "y": 20, "text": "Hi", "c": "#FDE68A"}
+
+
+def test_compact_board_lists_connectors_as_edges():
+    objects, edges = compact_board([
+        BoardObject(id="a", type="circle", x=0, y=0, radius=60),
+        BoardObject(id="c1", type="connector", fromId="a", toId="b", strokeWidth=2, arrowEnd=True),
+    ])
+    assert objects == [{"id": "a", "t": "circle", "x": 0, "y": 0}]
+    assert edges == [["c1", "a", "b"]]
+
+
+def test_small_board_is_not_pruned():
+    board = [_note(i) for i in range(3)]
+    context = build_board_context(board, "make them blue", None, token_budget=10_000)
+    assert "omitted" not in context
+    assert all(f"note-{i}" in context for i in range(3))
+
+
+def test_large_board_keeps_matching_objects_within_budget():
+    board = [_note(i) for i in range(500)]
+    board.append(_note(999, color="#FBCFE8", x=90000))
+    board.append(_note(1000, text="Marketing plan", x=95000))
+    context = build_board_context(board, "move the pink note and the marketing note", {"x": 0, "y": 0}, token_budget=600)
+
+    assert estimate_tokens(context) <= 600
+    assert "note-999" in context
+    assert "note-1000" in context
+    assert "other objects omitted: stickyNote" in context
+    assert "yellow" in context
+
+
+def test_pruning_prefers_viewport_and_keeps_containing_frame():
+    board = [_note(i, x=i * 1000) for i in range(300)]
+    board.append(BoardObject(id="frame-1", type="frame", x=290000, y=-100, width=2000, height=1000, title="Ideas"))
+    context = build_board_context(board, "tidy up", {"x": 299000, "y": 0}, token_budget=400)
+
+    assert "note-299" in context
+    assert "note-0\"" not in context
+    assert "frame-1" in context
+
+
+def test_containing_frames_count_against_the_budget():
+    board = [_note(i, color="#FBCFE8", x=i * 1000) for i in range(300)]
+    board += [
+        BoardObject(id=f"frame-{i}", type="frame", x=i * 1000 - 50, y=-50, width=300, height=250, title="Q" * 200)
+        for i in range(300)
+    ]
+    context = build_board_context(board, "move the pink notes", {"x": 0, "y": 0}, token_budget=400)
+
+    assert estimate_tokens(context) <= 400
+    kept_notes = [i for i in range(300) if f'"note-{i}"' in context]
+    assert kept_notes
+    assert all(f'"frame-{i}"' in context for i in kept_notes)
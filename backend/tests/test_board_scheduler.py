@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.board_scheduler import BoardScheduler, Footprint, predict_footprint
+from app.concurrency import QueueTimeoutError
+from app.schemas import Action, AiCommandRequest
+
+LEFT = Footprint((0, 0, 1000, 1000))
+RIGHT = Footprint((5000, 0, 6000, 1000))
+WHOLE = Footprint()
+
+
+def _request(command, viewport=None):
+    return AiCommandRequest(command=command, boardState=[], viewportCenter=viewport)
+
+
+def test_predict_footprint():
+    assert predict_footprint(_request("add a note", {"x": 0, "y": 0})).region == (-1000, -1000, 1000, 1000)
+    assert predict_footprint(_request("arrange these in a grid", {"x": 0, "y": 0})).region is None
+    assert predict_footprint(_request("create 50 stickies", {"x": 0, "y": 0})).region is None
+    assert predict_footprint(_request("add a note")).region is None
+
+
+async def _run(scheduler, footprint, log, name, hold=0.02):
+    async with scheduler.slot("b", footprint):
+        log.append(f"start {name}")
+        await asyncio.sleep(hold)
+        log.append(f"end {name}")
+
+
+@pytest.mark.asyncio
+async def test_disjoint_commands_run_in_parallel():
+    scheduler = BoardScheduler(queue_timeout=1.0)
+    log = []
+    await asyncio.gather(_run(scheduler, LEFT, log, "left"), _run(scheduler, RIGHT, log, "right"))
+    assert log[:2] == ["start left", "start right"]
+
+
+@pytest.mark.asyncio
+async def test_conflicting_commands_queue_in_arrival_order():
+    scheduler = BoardScheduler(queue_timeout=1.0)
+    log = []
+    await asyncio.gather(
+        _run(scheduler, LEFT, log, "left"),
+        _run(scheduler, WHOLE, log, "whole"),
+        # Disjoint from "left", but must not overtake the earlier board-wide command.
+        _run(scheduler, RIGHT, log, "right"),
+    )
+    assert log == ["start left", "end left", "start whole", "end whole", "start right", "end right"]
+    assert scheduler._boards == {}
+
+
+@pytest.mark.asyncio
+async def test_waiting_too_long_raises():
+    scheduler = BoardScheduler(queue_timeout=0.01)
+    holder = asyncio.create_task(_run(scheduler, WHOLE, [], "holder", hold=0.1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueTimeoutError):
+        async with scheduler.slot("b", LEFT):
+            pass
+    await holder
+
+
+@pytest.mark.asyncio
+async def test_reconcile_drops_edits_to_objects_deleted_meanwhile():
+    scheduler = BoardScheduler(queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def deleter():
+        async with scheduler.slot("b", WHOLE) as ticket:
+            await release.wait()
+            ticket.reconcile([Action(type="deleteMany", objectIds=["a", "b"])])
+
+    task = asyncio.create_task(deleter())
+    await asyncio.sleep(0)
+    release.set()
+    async with scheduler.slot("b", LEFT) as ticket:
+        await task
+        kept = ticket.reconcile([
+            Action(type="update", objectId="a", properties={"x": 1}),
+            Action(type="deleteMany", objectIds=["b", "c"]),
+            Action(type="create", objectType="connector", properties={"fromId": "a", "toId": "c"}),
+            Action(type="update", objectId="c", properties={"x": 1}),
+        ])
+
+    assert [(a.type, a.objectId or a.objectIds) for a in kept] == [("deleteMany", ["c"]), ("update", "c")]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_shifts_creates_clear_of_new_objects():
+    scheduler = BoardScheduler(queue_timeout=1.0)
+    note = {"x": 0, "y": 0, "width": 200, "height": 150}
+
+    async with scheduler.slot("b", LEFT) as before:
+        # Finishes while `before` is running, so its note is news to `before`.
+        async with scheduler.slot("b", RIGHT) as other:
+            other.reconcile([Action(type="create", objectType="stickyNote", properties=note)])
+        kept = before.reconcile([
+            Action(type="create", objectType="stickyNote", properties={**note, "x": 100}),
+            Action(type="createMany", properties={}, columns={"x": [300, 500], "y": [0, 0]}),
+        ])
+
+    assert kept[0].properties["x"] == 240
+    assert kept[1].columns["x"] == [440, 640]
@@ -0,0 +1,125 @@
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from app.board_store import (
+    InMemoryBoardStore,
+    SqliteBoardStore,
+    StaleSnapshotError,
+    make_board_store,
+    snapshot_version,
+)
+from app.schemas import BoardObject
+
+A = BoardObject(id="a", type="stickyNote", x=0, y=0, text="Hi")
+B = BoardObject(id="b", type="circle", x=100, y=100)
+C = BoardObject(id="c", type="rectangle", x=300, y=0)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryBoardStore(max_boards=10, max_objects=3, ttl=60)
+    return SqliteBoardStore(str(tmp_path / "boards.sqlite3"), max_boards=10, max_objects=3, ttl=60)
+
+
+def test_version_is_content_addressed():
+    assert snapshot_version([A, B]) == snapshot_version([B, A])
+    assert snapshot_version([A, B]) != snapshot_version([A, B.model_copy(update={"x": 101})])
+
+
+def test_replace_and_get(store):
+    version, objects = store.replace("board", [A, B])
+    assert version == snapshot_version([A, B])
+    assert store.get("board") == (version, [A, B])
+    assert store.get("other") is None
+
+
+def test_delta_matches_full_snapshot(store):
+    version, _ = store.replace("board", [A, B])
+    moved = A.model_copy(update={"x": 50})
+    new_version, objects = store.apply_delta("board", version, [moved, C], ["b"])
+
+    assert {obj.id: obj for obj in objects} == {"a": moved, "c": C}
+    assert new_version == snapshot_version([moved, C])
+    assert store.get("board")[0] == new_version
+
+
+def test_stale_or_missing_base_is_rejected(store):
+    version, _ = store.replace("board", [A])
+    with pytest.raises(StaleSnapshotError):
+        store.apply_delta("board", snapshot_version([B]), [C], [])
+    with pytest.raises(StaleSnapshotError):
+        store.apply_delta("missing", version, [C], [])
+    # A rejected delta leaves the snapshot untouched.
+    assert store.get("board") == (version, [A])
+
+
+def test_lru_eviction_and_ttl(tmp_path):
+    store = InMemoryBoardStore(max_boards=2, max_objects=100, ttl=60)
+    store.replace("b1", [A])
+    store.replace("b2", [B])
+    store.get("b1")
+    store.replace("b3", [C])
+    assert store.get("b2") is None
+    assert store.get("b1") is not None
+
+    expired = SqliteBoardStore(str(tmp_path / "boards.sqlite3"), max_boards=2, max_objects=100, ttl=0)
+    expired.replace("b1", [A])
+    assert expired.get("b1") is None
+
+
+def test_eviction_by_total_objects(store):
+    store.replace("b1", [A])
+    store.replace("b2", [B, C])
+    store.get("b1")
+    version, _ = store.get("b1")
+    store.apply_delta("b1", version, [C], [])
+    assert store.get("b2") is None
+    assert store.get("b1") is not None
+
+    store.replace("big", [A, B, C, BoardObject(id="d", type="circle", x=0, y=0)])
+    assert store.get("big") is None
+    assert store.get("b1") is None
+
+
+def test_make_board_store(tmp_path):
+    assert make_board_store("none", "", 1, 1, 1) is None
+    assert isinstance(make_board_store("memory", "", 1, 1, 1), InMemoryBoardStore)
+    with pytest.raises(ValueError):
+        make_board_store("redis", "", 1, 1, 1)
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_command_accepts_delta_after_full_snapshot(mock_create, client, sample_board_state, make_completion):
+    mock_create.return_value = make_completion(content="Done!")
+    headers = {"Authorization": "Bearer fake"}
+    with patch("app.routes.ai.board_store", InMemoryBoardStore(max_boards=10, max_objects=1000, ttl=60)):
+        first = client.post("/api/ai/command", json={
+            "command": "hi", "boardId": "b1", "boardState": sample_board_state,
+        }, headers=headers)
+        version = first.json()["boardVersion"]
+
+        second = client.post("/api/ai/command", json={
+            "command": "hi", "boardId": "b1",
+            "boardDelta": {
+                "baseVersion": version,
+                "upserted": [{"id": "obj-3", "type": "circle", "x": 0, "y": 0, "text": "Fresh"}],
+                "removed": ["obj-2"],
+            },
+        }, headers=headers)
+
+        stale = client.post("/api/ai/command", json={
+            "command": "hi", "boardId": "b1", "boardDelta": {"baseVersion": version},
+        }, headers=headers)
+
+    assert second.status_code == 200
+    assert second.json()["boardVersion"] != version
+    prompt = mock_create.call_args.kwargs["messages"][1]["content"]
+    assert "obj-3" in prompt and "obj-1" in prompt and "obj-2" not in prompt
+    assert stale.status_code == 409
+
+
+def test_command_requires_board(client):
+    resp = client.post("/api/ai/command", json={"command": "hi"}, headers={"Authorization": "Bearer fake"})
+    assert resp.status_code == 422
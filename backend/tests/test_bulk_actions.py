@@ -22,3 +22,39 @@ def test_bulk_respects_area():
     for a in actions:
         assert 100 <= a.properties["x"] <= 400
         assert 200 <= a.properties["y"] <= 600
+
+
+def test_bulk_seed_is_reproducible():
+    a = generate_bulk_actions({"count": 30, "seed": 7})
+    b = generate_bulk_actions({"count": 30, "seed": 7})
+    assert [x.model_dump() for x in a] == [x.model_dump() for x in b]
+
+
+def test_bulk_properties_are_plain_python_types():
+    import json
+    actions = generate_bulk_actions({"count": 25, "seed": 1})
+    json.dumps([a.model_dump() for a in actions])
+    for a in actions:
+        assert isinstance(a.properties["x"], int)
+
+
+def test_bulk_non_overlapping():
+    from app.schemas import BoardObject
+    from app.spatial import bounds
+
+    area = {"x": 0, "y": 0, "width": 2000, "height": 2000}
+    actions = generate_bulk_actions({"count": 40, "area": area, "nonOverlapping": True, "seed": 3})
+    boxes = [bounds(BoardObject(id=str(i), type=a.objectType, **a.properties)) for i, a in enumerate(actions)]
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            assert not (a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3])
+
+
+def test_bulk_count_capped():
+    assert len(generate_bulk_actions({"count": 500}, max_count=100)) == 100
+
+
+def test_bulk_null_count_uses_default():
+    assert len(generate_bulk_actions({"count": None})) == 50
+    assert len(generate_bulk_actions({})) == 50
+    assert generate_bulk_actions({"count": 0}) == []
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import pytest
+
+from app.clients import (
+    FIREBASE_CERT_URI,
+    Lazy,
+    _prefetch_firebase_certs,
+    close_clients,
+    http_client,
+    pool_stats,
+    warmup,
+)
+
+
+def test_lazy_builds_target_once_on_first_access():
+    factory = MagicMock(return_value=MagicMock(value=42))
+    lazy = Lazy(factory)
+
+    assert not lazy.loaded
+    factory.assert_not_called()
+    assert lazy.value == 42 and lazy.value == 42
+    assert lazy.loaded
+    factory.assert_called_once()
+
+
+def test_importing_main_defers_heavy_clients():
+    code = "import sys, main; print(sorted(m for m in ('langfuse', 'openai', 'firebase_admin') if m in sys.modules))"
+    env = {**os.environ, "OPENAI_API_KEY": "sk-test-fake-key"}
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).parent.parent, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == "[]"
+
+
+@pytest.mark.asyncio
+async def test_warmup_reports_failed_steps_without_raising():
+    with patch("app.clients._open_openai_connection", new_callable=AsyncMock) as connect, \
+         patch("app.clients._prefetch_firebase_certs", side_effect=OSError("no network")):
+        report = await warmup()
+
+    connect.assert_awaited_once()
+    assert {name: step["ok"] for name, step in report.items()} == {
+        "openai_client": True, "openai_connection": True, "firebase_app": True, "firebase_certs": False,
+    }
+    assert report["firebase_certs"]["error"] == "no network"
+
+
+def test_cert_prefetch_on_unknown_firebase_version_uses_public_transport():
+    request = MagicMock(return_value=MagicMock(status=200))
+    with patch("firebase_admin.__version__", "99.0.0"), \
+         patch("google.auth.transport.requests.Request", return_value=request), \
+         patch("app.clients.firebase_auth") as firebase_auth:
+        _prefetch_firebase_certs()
+
+    request.assert_called_once()
+    assert request.call_args.args == (FIREBASE_CERT_URI,)
+    firebase_auth._get_client.assert_not_called()
+
+    request.return_value = MagicMock(status=503)
+    with patch("firebase_admin.__version__", "99.0.0"), \
+         patch("google.auth.transport.requests.Request", return_value=request), \
+         pytest.raises(OSError):
+        _prefetch_firebase_certs()
+
+
+def test_warmup_endpoint(client):
+    with patch("app.clients._open_openai_connection", new_callable=AsyncMock), \
+         patch("app.clients._prefetch_firebase_certs"), \
+         patch("app.auth.settings.ops_token", "ops-secret"):
+        resp = client.get("/warmup", headers={"Authorization": "Bearer ops-secret"})
+
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "ok"
+    assert set(resp.json()["steps"]) == {"openai_client", "openai_connection", "firebase_app", "firebase_certs"}
+
+
+@pytest.mark.parametrize("ops_token, headers, status", [
+    ("", {"Authorization": "Bearer anything"}, 404),
+    ("ops-secret", {}, 401),
+    ("ops-secret", {"Authorization": "Bearer wrong"}, 401),
+])
+def test_ops_endpoints_need_the_ops_token(client, ops_token, headers, status):
+    with patch("app.clients._open_openai_connection", new_callable=AsyncMock) as connect, \
+         patch("app.auth.settings.ops_token", ops_token):
+        assert client.get("/warmup", headers=headers).status_code == status
+        assert client.get("/metrics", headers=headers).status_code == status
+
+    connect.assert_not_awaited()
+
+
+async def _serve(delay: float):
+    async def handle(reader, writer):
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                await asyncio.sleep(delay)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()  # Client closed the kept-alive connection
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connections_and_reports_waiters():
+    server, url = await _serve(delay=0.1)
+    try:
+        with patch("app.clients.settings.http_max_connections", 1):
+            await close_clients()
+            assert pool_stats() == {"in_use": 0, "idle": 0, "waiters": 0}
+
+            await http_client.get(url)
+            assert pool_stats() == {"in_use": 0, "idle": 1, "waiters": 0}
+
+            requests = [asyncio.create_task(http_client.get(url)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            assert pool_stats() == {"in_use": 1, "idle": 0, "waiters": 2}
+            await asyncio.gather(*requests)
+            assert pool_stats()["idle"] == 1
+    finally:
+        await close_clients()
+        server.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_are_zero_when_pool_internals_change():
+    try:
+        with patch.object(http_client.load(), "_transport", object()):
+            assert pool_stats() == {"in_use": 0, "idle": 0, "waiters": 0}
+    finally:
+        await close_clients()
@@ -0,0 +1,141 @@
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+import httpx
+import pytest
+
+from app.coalescing import SingleFlight
+
+BOARD = [{"id": "n1", "type": "stickyNote", "x": 0, "y": 0, "text": "Hi", "color": "#FDE68A"}]
+HEADERS = {"Authorization": "Bearer fake"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_run():
+    flight = SingleFlight(max_replays=10, replay_ttl=60)
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.run(["k"], work) for _ in range(3)))
+
+    assert calls == 1
+    assert [r for r, _ in results] == ["result"] * 3
+    assert sorted(key or "" for _, key in results) == ["", "k", "k"]
+
+
+@pytest.mark.asyncio
+async def test_failure_is_shared_and_not_remembered():
+    flight = SingleFlight(max_replays=10, replay_ttl=60)
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(flight.run(["k"], fail), flight.run(["k"], fail), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def ok():
+        return "fresh"
+    assert await flight.run(["k"], ok) == ("fresh", None)
+
+
+@pytest.mark.asyncio
+async def test_personal_failure_makes_followers_run_themselves():
+    flight = SingleFlight(max_replays=10, replay_ttl=60, personal=(PermissionError,))
+    calls = []
+
+    async def work():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise PermissionError("leader over its budget")
+        return "follower's own"
+
+    leader, follower = await asyncio.gather(flight.run(["k"], work), flight.run(["k"], work), return_exceptions=True)
+    assert isinstance(leader, PermissionError)
+    assert follower == ("follower's own", None)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_remembered_result_is_replayed_after_completion():
+    flight = SingleFlight(max_replays=10, replay_ttl=60)
+
+    async def work():
+        return "original"
+
+    assert await flight.run(["idem", "cmd"], work, remember="idem") == ("original", None)
+    # Only the idempotency key outlives the flight.
+    assert await flight.join(["idem"]) == ("original", "idem")
+    assert await flight.join(["cmd"]) is None
+
+
+@pytest.mark.asyncio
+async def test_abandoned_flight_lets_waiters_run_themselves():
+    flight = SingleFlight(max_replays=10, replay_ttl=60)
+    leader = flight.lead(["k"])
+    waiter = asyncio.create_task(flight.join(["k"]))
+    await asyncio.sleep(0)
+
+    flight.settle(leader)
+
+    assert await waiter is None
+
+
+@pytest.mark.asyncio
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+async def test_identical_concurrent_commands_call_the_model_once(
+    mock_create, mock_firebase_auth, make_tool_call, make_completion,
+):
+    from main import app
+
+    async def slow(**kwargs):
+        await asyncio.sleep(0.05)
+        return make_completion([make_tool_call("moveObject", {"objectId": "n1", "x": 500, "y": 0})], "Done")
+    mock_create.side_effect = slow
+
+    body = {"command": "Move the note right", "boardState": BOARD, "boardId": "b-coalesce"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        first, second = await asyncio.gather(
+            http.post("/api/ai/command", json=body, headers=HEADERS),
+            http.post("/api/ai/command", json=body, headers=HEADERS),
+        )
+
+    assert mock_create.await_count == 1
+    assert first.json()["actions"] == second.json()["actions"]
+    assert sorted(r.json().get("coalesced", False) for r in (first, second)) == [False, True]
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_retry_with_idempotency_key_replays_the_response(mock_create, client, make_tool_call, make_completion):
+    note = make_tool_call("createStickyNote", {"x": 0, "y": 0, "text": "Once"})
+    mock_create.return_value = make_completion([note], "Done")
+    body = {"command": "Add a note", "boardState": BOARD, "boardId": "b-idem", "idempotencyKey": "req-1"}
+
+    first = client.post("/api/ai/command", json=body, headers=HEADERS)
+    # The retry carries the board as the client now sees it.
+    retry = client.post(
+        "/api/ai/command", json={**body, "boardState": BOARD + [{"id": "n2", "type": "text", "x": 9, "y": 9}]},
+        headers=HEADERS,
+    )
+
+    assert mock_create.await_count == 1
+    assert retry.json()["actions"] == first.json()["actions"]
+    assert "coalesced" not in retry.json()
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_idempotency_keys_are_scoped_per_board(mock_create, client, make_tool_call, make_completion):
+    note = make_tool_call("createStickyNote", {"x": 0, "y": 0, "text": "Once"})
+    mock_create.return_value = make_completion([note], "Done")
+    body = {"command": "Add a note", "boardState": BOARD, "idempotencyKey": "req-2"}
+
+    client.post("/api/ai/command", json={**body, "boardId": "b-one"}, headers=HEADERS)
+    client.post("/api/ai/command", json={**body, "boardId": "b-two"}, headers=HEADERS)
+
+    assert mock_create.await_count == 2
@@ -0,0 +1,89 @@
+import json
+from unittest.mock import patch, AsyncMock
+
+from app.bulk import generate_bulk_actions, iter_bulk_create_many
+from app.compact_actions import compact_actions, create_many, expand_actions
+from app.schemas import Action
+
+
+def _creates(n, obj_type="stickyNote"):
+    return [
+        Action(type="create", objectType=obj_type, properties={"x": i, "y": 2 * i, "color": "#FDE68A", "rotation": 0})
+        for i in range(n)
+    ]
+
+
+def test_create_many_is_columnar_with_shared_defaults():
+    action = create_many(_creates(3))
+    assert action.type == "createMany"
+    assert action.objectType == "stickyNote"
+    assert action.properties == {"color": "#FDE68A", "rotation": 0}
+    assert action.columns == {"x": [0, 1, 2], "y": [0, 2, 4]}
+
+
+def test_create_many_mixed_types_and_sparse_properties():
+    creates = [
+        Action(type="create", objectType="circle", properties={"x": 0, "y": 0, "radius": 40}),
+        Action(type="create", objectType="rectangle", properties={"x": 1, "y": 1, "width": 90}),
+    ]
+    action = create_many(creates)
+    assert action.columns["type"] == ["circle", "rectangle"]
+    assert action.columns["radius"] == [40, None]
+    assert expand_actions([action]) == creates
+
+
+def test_compact_below_threshold_is_unchanged():
+    actions = _creates(5)
+    assert compact_actions(actions, threshold=10) is actions
+
+
+def test_compact_round_trips_and_keeps_order():
+    update = Action(type="update", objectId="u", properties={"x": 1})
+    connector = Action(type="create", objectType="connector", properties={"fromId": "a", "toId": "b"})
+    deletes = [Action(type="delete", objectId=f"d{i}") for i in range(4)]
+    actions = [update, *_creates(4), connector, *deletes]
+
+    compacted = compact_actions(actions, threshold=4)
+    assert [a.type for a in compacted] == ["update", "createMany", "create", "deleteMany"]
+    assert compacted[3].objectIds == ["d0", "d1", "d2", "d3"]
+
+    def canonical(items):
+        return sorted(json.dumps(a.model_dump(), sort_keys=True) for a in items)
+
+    assert canonical(expand_actions(compacted)) == canonical(actions)
+
+
+def test_compact_keeps_creates_with_temp_ids():
+    referenced = Action(type="create", objectType="circle", properties={"x": 0, "y": 0}, tempId="new-1")
+    plain = [Action(type="create", objectType="circle", properties={"x": i, "y": 0}) for i in range(3)]
+    out = compact_actions([referenced, *plain], threshold=3)
+    assert out[0] is referenced
+    assert [a.type for a in out] == ["create", "createMany"]
+
+
+def test_bulk_create_many_matches_per_object_generator():
+    args = {"count": 250, "seed": 11}
+    columnar = list(iter_bulk_create_many(args, chunk_size=100))
+    assert [len(a.columns["x"]) for a in columnar] == [100, 100, 50]
+    assert expand_actions(columnar) == generate_bulk_actions(args)
+
+
+def test_bulk_create_many_single_type():
+    (action,) = iter_bulk_create_many({"count": 10, "types": ["circle"], "seed": 1})
+    assert action.objectType == "circle"
+    assert "type" not in action.columns
+    assert all(a.objectType == "circle" and "radius" in a.properties for a in expand_actions([action]))
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_delete_all_on_large_board_emits_delete_many(mock_create, client, make_tool_call, make_completion):
+    board = [{"id": f"obj-{i}", "type": "rectangle", "x": i, "y": 0} for i in range(300)]
+    mock_create.return_value = make_completion([make_tool_call("deleteAll", {})], "Cleared")
+
+    resp = client.post("/api/ai/command", json={"command": "clear the board", "boardState": board},
+                       headers={"Authorization": "Bearer fake"})
+
+    actions = resp.json()["actions"]
+    assert len(actions) == 1
+    assert actions[0]["type"] == "deleteMany"
+    assert len(actions[0]["objectIds"]) == 300
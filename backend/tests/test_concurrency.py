@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.concurrency import ConcurrencyLimiter, QueueFullError, QueueTimeoutError
+
+
+@pytest.mark.asyncio
+async def test_limits_in_flight_calls():
+    limiter = ConcurrencyLimiter(max_concurrency=2, max_queue=10, queue_timeout=1.0)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.active)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(work() for _ in range(6)))
+    assert peak == 2
+    assert limiter.active == 0
+    assert limiter.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1, queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(QueueFullError):
+        async with limiter.slot():
+            pass
+
+    release.set()
+    await asyncio.gather(holder, queued)
+
+
+@pytest.mark.asyncio
+async def test_times_out_waiting_for_slot():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout=0.01)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(QueueTimeoutError):
+        async with limiter.slot():
+            pass
+    assert limiter.waiting == 0
+
+    release.set()
+    await holder
@@ -0,0 +1,87 @@
+import json
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from app.fast_path import parse_command
+
+BOARD = [
+    {"id": "n1", "type": "stickyNote", "x": 0, "y": 0, "color": "#FBCFE8"},
+    {"id": "n2", "type": "stickyNote", "x": 300, "y": 0, "color": "#BFDBFE"},
+    {"id": "r1", "type": "rectangle", "x": 0, "y": 300},
+]
+HEADERS = {"Authorization": "Bearer fake"}
+
+
+def _calls(command):
+    parsed = parse_command(command)
+    return [(tc.function.name, json.loads(tc.function.arguments)) for tc in parsed.tool_calls]
+
+
+@pytest.mark.parametrize("command", [
+    "Clear the board", "clear canvas.", "Delete everything", "please remove all objects on the board",
+])
+def test_clear_commands(command):
+    assert _calls(command) == [("deleteAll", {})]
+
+
+def test_bulk_and_recolor_commands():
+    assert _calls("Create 200 random objects") == [("bulkCreate", {"count": 200})]
+    assert _calls("add 50 sticky notes") == [("bulkCreate", {"count": 50, "types": ["stickyNote"]})]
+    assert _calls("Make all notes yellow!") == [
+        ("selectObjects", {"filter": {"types": ["stickyNote"]}}),
+        ("updateSelection", {"color": "#FDE68A"}),
+    ]
+    assert _calls("turn everything grey") == [("selectObjects", {}), ("updateSelection", {"color": "#E5E7EB"})]
+
+
+@pytest.mark.parametrize("command", [
+    "clear the board and add a note",
+    "make the first note yellow",
+    "create 20 frames",
+    "create a SWOT analysis",
+    "delete the blue note",
+])
+def test_everything_else_goes_to_the_llm(command):
+    assert parse_command(command) is None
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_fast_path_skips_llm_with_same_actions(mock_create, client):
+    resp = client.post("/api/ai/command", json={"command": "make all notes green", "boardState": BOARD},
+                       headers=HEADERS)
+
+    mock_create.assert_not_called()
+    assert resp.json()["actions"] == [
+        {"type": "update", "objectId": "n1", "properties": {"color": "#BBF7D0"}},
+        {"type": "update", "objectId": "n2", "properties": {"color": "#BBF7D0"}},
+    ]
+    assert resp.json()["message"] == "Made 2 notes green."
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_fast_path_bulk_create_counts_compact_actions(mock_create, client):
+    resp = client.post("/api/ai/command", json={"command": "create 500 circles", "boardState": []},
+                       headers=HEADERS)
+
+    mock_create.assert_not_called()
+    assert resp.json()["message"] == "Created 500 circles."
+    assert resp.json()["actions"][0]["type"] == "createMany"
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_fast_path_streams(mock_create, client):
+    resp = client.post("/api/ai/command/stream", json={"command": "delete everything", "boardState": BOARD},
+                       headers=HEADERS)
+
+    mock_create.assert_not_called()
+    events = [block.split("\n")[0] for block in resp.text.strip().split("\n\n")]
+    assert events == ["event: action"] * 3 + ["event: done"]
+    assert "Cleared the board (3 objects deleted)." in resp.text
+
+
+@patch("app.routes.ai.settings.fast_path_enabled", False)
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_fast_path_can_be_disabled(mock_create, client):
+    client.post("/api/ai/command", json={"command": "clear the board", "boardState": BOARD}, headers=HEADERS)
+    mock_create.assert_called_once()
@@ -0,0 +1,91 @@
+import pytest
+
+from app.layout import arrange_grid, arrange_in_frame, create_template, find_free_origin
+from app.schemas import BoardObject
+from app.spatial import BoardIndex, bounds
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _notes(n, x=0, y=0):
+    return [BoardObject(id=f"n{i}", type="stickyNote", x=x + i * 7, y=y + i * 3) for i in range(n)]
+
+
+def test_arrange_grid_is_deterministic_and_non_overlapping():
+    notes = _notes(5)
+    index = BoardIndex(notes)
+    actions = arrange_grid(notes, index)
+    assert actions == arrange_grid(notes, index)
+
+    placed = [
+        bounds(BoardObject(id=a.objectId, type="stickyNote", **a.properties))
+        for a in actions
+    ]
+    assert len(placed) == 5
+    assert not any(_overlaps(a, b) for i, a in enumerate(placed) for b in placed[i + 1:])
+    # 5 objects -> 3 columns; anchored at the selection's top-left
+    assert actions[0].properties == {"x": 0, "y": 0}
+    assert actions[3].properties == {"x": 0, "y": 180}
+
+
+def test_arrange_grid_handles_circle_centers():
+    circle = BoardObject(id="c", type="circle", x=500, y=500, radius=50)
+    note = BoardObject(id="n", type="stickyNote", x=400, y=400)
+    actions = arrange_grid([note, circle], BoardIndex([note, circle]), columns=2)
+    assert actions[1].properties == {"x": 400 + 230 + 50, "y": 450}
+
+
+def test_arrange_in_frame_grows_frame():
+    frame = BoardObject(id="f", type="frame", x=0, y=0, width=400, height=300, title="Strengths")
+    notes = _notes(6, x=2000)
+    actions = arrange_in_frame(frame, notes)
+    moves = [a for a in actions if a.objectId != "f"]
+    assert moves[0].properties == {"x": 20, "y": 40}
+    assert all(0 <= a.properties["x"] < 400 for a in moves)
+    assert actions[-1].objectId == "f"
+    assert actions[-1].properties["height"] > 300
+
+
+def test_find_free_origin_skips_occupied_area():
+    blocker = BoardObject(id="b", type="rectangle", x=0, y=0, width=300, height=300)
+    x, y = find_free_origin(BoardIndex([blocker]), 200, 200, 0, 0)
+    placed = (x, y, x + 200, y + 200)
+    assert not _overlaps(placed, bounds(blocker))
+
+
+def test_create_swot_template_places_notes_inside_frames():
+    existing = BoardObject(id="old", type="rectangle", x=300, y=200, width=600, height=400)
+    actions = create_template(
+        "swot",
+        BoardIndex([existing]),
+        viewport={"x": 600, "y": 400},
+        items={"Strengths": ["Fast", "Cheap", "Loved"], "threats": ["Competitors"]},
+    )
+    frames = [a for a in actions if a.objectType == "frame"]
+    notes = [a for a in actions if a.objectType == "stickyNote"]
+    assert [f.properties["title"] for f in frames] == ["Strengths", "Weaknesses", "Opportunities", "Threats"]
+    assert len(notes) == 4
+    assert notes[0].properties["color"] == "#BBF7D0"
+
+    strengths = frames[0].properties
+    for note in notes[:3]:
+        p = note.properties
+        assert strengths["x"] <= p["x"] and p["x"] + p["width"] <= strengths["x"] + strengths["width"]
+        assert strengths["y"] <= p["y"] and p["y"] + p["height"] <= strengths["y"] + strengths["height"]
+
+    for a in actions:
+        p = a.properties
+        box = (p["x"], p["y"], p["x"] + p["width"], p["y"] + p.get("height", 28))
+        assert not _overlaps(box, bounds(existing))
+
+
+def test_create_template_custom_sections():
+    actions = create_template("retro", BoardIndex([]), sections=["Start", "Stop", "Continue", "Kudos"])
+    assert [a.properties["title"] for a in actions if a.objectType == "frame"] == ["Start", "Stop", "Continue", "Kudos"]
+
+
+def test_unknown_template_raises():
+    with pytest.raises(ValueError, match="Unknown template"):
+        create_template("gantt", BoardIndex([]))
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.metrics import (
+    Counter,
+    Histogram,
+    llm_requests,
+    prompt_tokens,
+    record_usage,
+    request_errors,
+    requests_total,
+    track_request,
+)
+
+
+def test_counter_labels():
+    c = Counter("test_total", "test")
+    c.inc()
+    c.inc(2, kind="a")
+    c.inc(3, kind="a")
+    assert c.value() == 1
+    assert c.value(kind="a") == 5
+    assert c.value(kind="b") == 0
+
+
+def test_record_usage_splits_cached_prompt_tokens():
+    before = (prompt_tokens.value(kind="cached"), prompt_tokens.value(kind="uncached"), llm_requests.value())
+    record_usage(SimpleNamespace(
+        prompt_tokens=5000, completion_tokens=40,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=4608),
+    ))
+    record_usage(SimpleNamespace(prompt_tokens=100, completion_tokens=5, prompt_tokens_details=None))
+    record_usage(None)
+
+    assert prompt_tokens.value(kind="cached") - before[0] == 4608
+    assert prompt_tokens.value(kind="uncached") - before[1] == 392 + 100
+    assert llm_requests.value() - before[2] == 2
+
+
+def test_histogram_buckets_and_render():
+    h = Histogram("test_seconds", "test", buckets=(0.1, 1))
+    h.observe(0.05, stage="a")
+    h.observe(0.1, stage="a")
+    h.observe(5, stage="a")
+    assert h.count(stage="a") == 3
+    assert h.sum(stage="a") == pytest.approx(5.15)
+    assert h.render()[2:] == [
+        'test_seconds_bucket{stage="a",le="0.1"} 2',
+        'test_seconds_bucket{stage="a",le="1"} 2',
+        'test_seconds_bucket{stage="a",le="+Inf"} 3',
+        'test_seconds_sum{stage="a"} 5.15',
+        'test_seconds_count{stage="a"} 3',
+    ]
+
+
+def test_track_request_uses_http_status():
+    before = requests_total.value(endpoint="test", status="503")
+    with pytest.raises(HTTPException):
+        with track_request("test"):
+            raise HTTPException(status_code=503)
+    with track_request("test") as outcome:
+        outcome.status = "500"
+    assert requests_total.value(endpoint="test", status="503") == before + 1
+    assert request_errors.value(endpoint="test", status="500") >= 1
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_metrics_endpoint_reports_request_stages(
+    mock_create, client, sample_board_state, make_tool_call, make_completion,
+):
+    mock_create.return_value = make_completion([make_tool_call("deleteObject", {"objectId": "obj-1"})], "ok")
+    client.post("/api/ai/command", json={"command": "delete obj-1", "boardState": sample_board_state},
+                headers={"Authorization": "Bearer fake"})
+
+    with patch("app.auth.settings.ops_token", "ops-secret"):
+        resp = client.get("/metrics", headers={"Authorization": "Bearer ops-secret"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    for stage in ("validation", "prompt_build", "llm", "tool_conversion", "serialization"):
+        assert f'ai_stage_seconds_count{{stage="{stage}"}}' in resp.text
+    assert 'ai_requests_total{endpoint="command",status="200"}' in resp.text
+    assert "# TYPE ai_actions_per_response histogram" in resp.text
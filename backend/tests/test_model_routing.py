@@ -0,0 +1,69 @@
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from app.config import settings
+from app.model_routing import route_command, usable_output
+
+
+def _route(command, board_size=10):
+    return route_command(command, board_size, "fast-model", "strong-model", max_board_objects=500)
+
+
+@pytest.mark.parametrize("command,tool", [
+    ("make this blue", "changeColor"),
+    ("delete everything", "deleteAll"),
+    ("create 200 random objects", "bulkCreate"),
+    ("move the note to the right", "moveObject"),
+    ("add a yellow sticky note that says hi", "createStickyNote"),
+])
+def test_simple_commands_use_fast_model(command, tool):
+    decision = _route(command)
+    assert (decision.model, decision.tier, decision.reason) == ("fast-model", "fast", tool)
+
+
+@pytest.mark.parametrize("command,reason", [
+    ("create a SWOT analysis", "createTemplate"),
+    ("arrange these notes in a grid", "arrangeGrid"),
+    ("draw a flowchart for user signup", "createConnector"),
+    ("brainstorm ideas for the offsite", "multiStep"),
+    ("what is on this board", "unrecognized"),
+])
+def test_complex_or_unknown_commands_use_strong_model(command, reason):
+    decision = _route(command)
+    assert (decision.model, decision.reason) == ("strong-model", reason)
+
+
+def test_board_size_length_and_disabled_routing():
+    assert _route("make this blue", board_size=5000).reason == "large board"
+    assert _route("make this blue " + "please " * 30).reason == "long command"
+    assert route_command("make this blue", 1, "", "strong-model", 500).reason == "routing disabled"
+
+
+def test_usable_output(make_tool_call):
+    assert usable_output([make_tool_call("changeColor", '{"objectId": "a", "color": "#BFDBFE"}')])
+    assert not usable_output([])
+    assert usable_output([], allow_empty=True)
+    assert not usable_output([make_tool_call("paintItBlack", "{}")])
+    assert not usable_output([make_tool_call("changeColor", '{"objectId": ')])
+    assert not usable_output([make_tool_call("changeColor", '{"color": "#BFDBFE"}')])
+    # Locally fixable output stays on the fast model.
+    assert usable_output([make_tool_call("changeColor", '```json\n{"objectId": "a", "color": "blue",}\n```')])
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_fast_model_falls_back_to_strong_on_bad_output(
+    mock_create, client, sample_board_state, make_tool_call, make_completion,
+):
+    good = make_tool_call("changeColor", {"objectId": "obj-1", "color": "#BFDBFE"})
+    mock_create.side_effect = [
+        make_completion([make_tool_call("changeColor", "{not json")]),
+        make_completion([good], "Done"),
+    ]
+
+    resp = client.post("/api/ai/command", json={"command": "make obj-1 blue", "boardState": sample_board_state},
+                       headers={"Authorization": "Bearer fake"})
+
+    models = [call.kwargs["model"] for call in mock_create.call_args_list]
+    assert models == [settings.openai_fast_model, settings.openai_model]
+    assert resp.json()["actions"] == [{"type": "update", "objectId": "obj-1", "properties": {"color": "#BFDBFE"}}]
@@ -0,0 +1,100 @@
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from app.metrics import requests_total
+from app.rate_limit import InMemoryRateLimitStore, RateLimitedError, RateLimiter
+
+HEADERS = {"Authorization": "Bearer fake"}
+BOARD = [{"id": "n1", "type": "stickyNote", "x": 0, "y": 0, "text": "Hi"}]
+
+
+def _limiter(user_requests=0, user_tokens=0, board_requests=0, board_tokens=0):
+    return RateLimiter(InMemoryRateLimitStore(max_keys=100), user_requests, user_tokens, board_requests, board_tokens)
+
+
+def test_bucket_allows_a_minute_of_requests_then_rejects():
+    limiter = _limiter(user_requests=3)
+    for _ in range(3):
+        limiter.admit_request("u1", "b1")
+
+    with pytest.raises(RateLimitedError) as exc:
+        limiter.admit_request("u1", "b1")
+    assert exc.value.limit == "user_requests"
+    assert 0 < exc.value.retry_after <= 20
+
+    # Other users have their own bucket.
+    limiter.admit_request("u2", "b1")
+
+
+def test_rejection_takes_from_no_bucket():
+    limiter = _limiter(user_requests=10, board_requests=1)
+    limiter.admit_request("u1", "b1")
+    with pytest.raises(RateLimitedError) as exc:
+        limiter.admit_request("u1", "b1")
+    assert exc.value.limit == "board_requests"
+
+    # The rejected call did not spend u1's allowance.
+    for i in range(9):
+        limiter.admit_request("u1", f"other-{i}")
+
+
+def test_token_budget_admits_oversized_prompt_from_full_bucket():
+    limiter = _limiter(user_tokens=1000)
+    limiter.admit_tokens("u1", "b1", 5000)
+    with pytest.raises(RateLimitedError) as exc:
+        limiter.admit_tokens("u1", "b1", 10)
+    assert exc.value.limit == "user_tokens"
+    assert exc.value.retry_after == pytest.approx(0.6, abs=0.1)
+
+
+def test_refills_over_time():
+    store = InMemoryRateLimitStore(max_keys=10)
+    with patch("app.rate_limit.time.monotonic", side_effect=[0.0, 0.0, 30.0]):
+        assert store.acquire([("k", 2, 2)]) == [0.0]
+        assert store.acquire([("k", 2, 1)]) == [30.0]
+        assert store.acquire([("k", 2, 1)]) == [0.0]
+
+
+def test_endpoint_returns_429_with_retry_after(client):
+    with patch("app.routes.ai.rate_limiter", _limiter(user_requests=1)):
+        client.post("/api/ai/command", json={"command": "clear the board", "boardState": BOARD}, headers=HEADERS)
+        resp = client.post("/api/ai/command", json={"command": "clear the board", "boardState": BOARD}, headers=HEADERS)
+
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_stream_rejection_is_a_tracked_429(client):
+    before = requests_total.value(endpoint="command_stream", status="429")
+    with patch("app.routes.ai.rate_limiter", _limiter(user_requests=1)):
+        client.post("/api/ai/command", json={"command": "clear the board", "boardState": BOARD}, headers=HEADERS)
+        resp = client.post(
+            "/api/ai/command/stream", json={"command": "clear the board", "boardState": BOARD}, headers=HEADERS,
+        )
+
+    assert resp.status_code == 429
+    assert requests_total.value(endpoint="command_stream", status="429") == before + 1
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_prompt_over_token_budget_is_rejected_before_the_model_call(mock_create, client):
+    limiter = _limiter(board_tokens=5000)
+    limiter.admit_tokens("someone-else", "b-tokens", 5000)
+
+    with patch("app.routes.ai.rate_limiter", limiter):
+        resp = client.post(
+            "/api/ai/command",
+            json={"command": "Write a poem about the notes", "boardState": BOARD, "boardId": "b-tokens"},
+            headers=HEADERS,
+        )
+        stream = client.post(
+            "/api/ai/command/stream",
+            json={"command": "Write a poem about the notes", "boardState": BOARD, "boardId": "b-tokens"},
+            headers=HEADERS,
+        )
+
+    assert resp.status_code == 429
+    assert "Retry-After" in resp.headers
+    assert "event: error" in stream.text and '"retryAfter"' in stream.text
+    mock_create.assert_not_awaited()
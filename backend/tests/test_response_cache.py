@@ -0,0 +1,97 @@
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from app.config import settings
+from app.response_cache import (
+    InMemoryResponseCache,
+    SqliteResponseCache,
+    cache_key,
+    make_response_cache,
+    normalize_command,
+)
+from app.schemas import BoardObject
+
+BOARD = [
+    BoardObject(id="a", type="stickyNote", x=0, y=0, color="#FDE68A"),
+    BoardObject(id="b", type="circle", x=100, y=100),
+]
+
+
+def test_key_ignores_case_whitespace_and_object_order():
+    k1 = cache_key("Create a SWOT analysis!", "gpt", BOARD, {"x": 600, "y": 400})
+    k2 = cache_key("  create a   swot analysis ", "gpt", list(reversed(BOARD)), {"x": 640, "y": 380})
+    assert normalize_command("  Clear the BOARD. ") == "clear the board"
+    assert k1 == k2
+
+
+def test_key_changes_with_board_model_and_viewport():
+    base = cache_key("clear", "gpt", BOARD, None)
+    moved = [BOARD[0].model_copy(update={"x": 50}), BOARD[1]]
+    assert cache_key("clear", "gpt", moved, None) != base
+    assert cache_key("clear", "other-model", BOARD, None) != base
+    assert cache_key("clear", "gpt", BOARD, {"x": 5000, "y": 0}) != base
+
+
+def test_memory_cache_ttl_and_eviction():
+    cache = InMemoryResponseCache(max_entries=2, ttl=60)
+    cache.set("k1", {"v": 1})
+    cache.set("k2", {"v": 2})
+    cache.get("k1")
+    cache.set("k3", {"v": 3})
+    assert cache.get("k2") is None
+    assert cache.get("k1") == {"v": 1}
+    with patch("app.response_cache.time.time", return_value=10**12):
+        assert cache.get("k3") is None
+
+
+def test_sqlite_cache_persists_and_bounds_size(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SqliteResponseCache(path, max_entries=2, ttl=60)
+    cache.set("k1", {"v": 1})
+    cache.set("k2", {"v": 2})
+    cache.set("k3", {"v": 3})
+
+    reopened = SqliteResponseCache(path, max_entries=2, ttl=60)
+    assert reopened.get("k1") is None
+    assert reopened.get("k3") == {"v": 3}
+
+
+def test_make_response_cache():
+    assert make_response_cache("none", "", 1, 1) is None
+    assert isinstance(make_response_cache("memory", "", 1, 1), InMemoryResponseCache)
+    with pytest.raises(ValueError):
+        make_response_cache("redis", "", 1, 1)
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_cache_hit_skips_llm_and_reruns_tools(
+    mock_create, client, sample_board_state, make_tool_call, make_completion,
+):
+    mock_create.return_value = make_completion([make_tool_call("deleteAll", {})], "Cleared!")
+    # Not in the fast-path grammar, so it reaches the LLM.
+    body = {"command": "Get rid of all the stuff on my board", "boardState": sample_board_state}
+
+    with patch("app.routes.ai.response_cache", InMemoryResponseCache(10, 60)):
+        first = client.post("/api/ai/command", json=body, headers={"Authorization": "Bearer fake"})
+        second = client.post("/api/ai/command", json={**body, "command": "get rid of all the stuff on my board."},
+                             headers={"Authorization": "Bearer fake"})
+
+    assert mock_create.call_count == 1
+    assert first.json() == second.json()
+    assert {a["objectId"] for a in second.json()["actions"]} == {"obj-1", "obj-2"}
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_cache_key_uses_the_routed_model(mock_create, client, sample_board_state, make_tool_call, make_completion):
+    mock_create.return_value = make_completion([make_tool_call("deleteObject", {"objectId": "obj-1"})], "Deleted.")
+    body = {"command": "delete obj-1", "boardState": sample_board_state}
+    cache = InMemoryResponseCache(10, 60)
+
+    with patch("app.routes.ai.response_cache", cache):
+        client.post("/api/ai/command", json=body, headers={"Authorization": "Bearer fake"})
+
+    assert mock_create.call_args.kwargs["model"] == settings.openai_fast_model
+    board = [BoardObject(**obj) for obj in sample_board_state]
+    assert cache.get(cache_key(body["command"], settings.openai_fast_model, board, None)) is not None
+    assert cache.get(cache_key(body["command"], settings.openai_model, board, None)) is None
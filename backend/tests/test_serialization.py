@@ -0,0 +1,36 @@
+from unittest.mock import patch, AsyncMock
+
+from app.schemas import Action, AiCommandResponse
+from app.serialization import FastJSONResponse
+
+
+def test_fast_json_response_omits_none():
+    resp = FastJSONResponse(AiCommandResponse(actions=[Action(type="delete", objectId="a")], message="ok"))
+    assert resp.body == b'{"actions":[{"type":"delete","objectId":"a"}],"message":"ok"}'
+    assert resp.media_type == "application/json"
+
+
+def test_invalid_body_returns_422_with_body_loc(client):
+    resp = client.post("/api/ai/command", json={"command": "hi", "boardState": [{"type": "circle"}]},
+                       headers={"Authorization": "Bearer fake"})
+    assert resp.status_code == 422
+    assert resp.json()["detail"][0]["loc"] == ["body", "boardState", 0, "id"]
+
+
+def test_malformed_json_returns_422(client):
+    resp = client.post("/api/ai/command", content=b"{not json",
+                       headers={"Authorization": "Bearer fake", "Content-Type": "application/json"})
+    assert resp.status_code == 422
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_command_response_is_compact_json(mock_create, client, sample_board_state, make_tool_call, make_completion):
+    mock_create.return_value = make_completion([make_tool_call("deleteObject", {"objectId": "obj-1"})], "Deleted")
+
+    resp = client.post("/api/ai/command", json={"command": "delete it", "boardState": sample_board_state},
+                       headers={"Authorization": "Bearer fake"})
+
+    assert resp.status_code == 200
+    assert resp.content.startswith(
+        b'{"actions":[{"type":"delete","objectId":"obj-1"}],"message":"Deleted","boardVersion":"'
+    )
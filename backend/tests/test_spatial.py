@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import BoardObject
+from app.spatial import BoardIndex, bounds
+
+
+def _board():
+    return [
+        BoardObject(id="frame-s", type="frame", x=0, y=0, width=400, height=300, title="Strengths"),
+        BoardObject(id="n1", type="stickyNote", x=20, y=40, color="#FBCFE8", text="Fast shipping"),
+        BoardObject(id="n2", type="stickyNote", x=1000, y=1000, color="#FBCFE8", text="Brand"),
+        BoardObject(id="n3", type="stickyNote", x=50, y=60, color="#FDE68A", text="Team"),
+        BoardObject(id="c1", type="circle", x=2000, y=2000, radius=50, color="#FBCFE8"),
+        BoardObject(id="k1", type="connector", fromId="n1", toId="n2"),
+    ]
+
+
+def test_bounds_uses_type_defaults():
+    assert bounds(BoardObject(id="a", type="stickyNote", x=10, y=20)) == (10, 20, 210, 170)
+    assert bounds(BoardObject(id="b", type="circle", x=100, y=100)) == (40, 40, 160, 160)
+
+
+def test_query_region_finds_intersecting_objects():
+    index = BoardIndex(_board(), cell_size=100)
+    assert index.query_region(900, 900, 200, 200) == {"n2"}
+    assert index.query_region(0, 0, 100, 100) == {"frame-s", "n1", "n3"}
+
+
+def test_query_region_huge_area_scans():
+    index = BoardIndex(_board(), cell_size=10)
+    assert index.query_region(-1e6, -1e6, 2e6, 2e6) == {"frame-s", "n1", "n2", "n3", "c1"}
+
+
+def test_select_by_type_and_color():
+    index = BoardIndex(_board())
+    ids = [o.id for o in index.select({"types": ["stickyNote"], "colors": ["#fbcfe8"]})]
+    assert ids == ["n1", "n2"]
+
+
+def test_select_in_frame_by_title():
+    index = BoardIndex(_board())
+    ids = [o.id for o in index.select({"frame": "strengths"})]
+    assert ids == ["n1", "n3"]
+    assert index.select({"frame": "Missing"}) == []
+
+
+def test_select_text_and_region():
+    index = BoardIndex(_board())
+    assert [o.id for o in index.select({"text": "brand"})] == ["n2"]
+    assert [o.id for o in index.select(region={"x": 1900, "y": 1900, "width": 50, "height": 50})] == ["c1"]
+
+
+def test_oversized_objects_skip_the_grid_but_are_found():
+    giant = BoardObject(id="g", type="rectangle", x=0, y=0, width=1e6, height=1e6)
+    started = time.perf_counter()
+    index = BoardIndex([*_board(), giant])
+    assert time.perf_counter() - started < 0.5
+
+    assert index.query_region(900, 900, 200, 200) == {"n2", "g"}
+    assert index.query_region(-500, -500, 10, 10) == set()
+
+
+def test_non_finite_sizes_are_rejected():
+    with pytest.raises(ValidationError):
+        BoardObject.model_validate_json('{"id": "a", "type": "rectangle", "width": 1e999}')
+    with pytest.raises(ValidationError):
+        BoardObject(id="a", type="rectangle", height=float("nan"))
@@ -0,0 +1,93 @@
+from unittest.mock import patch, AsyncMock
+
+from app.token_budget import CONTINUE_PROMPT, complete_tool_calls, estimate_output_tokens, output_budget
+
+HEADERS = {"Authorization": "Bearer fake"}
+
+
+def test_output_estimate_scales_with_objects_and_steps():
+    single = estimate_output_tokens("make the note blue", board_size=10)
+    assert estimate_output_tokens("add five notes and three shapes", board_size=0) > single
+    assert estimate_output_tokens("recolor all notes", board_size=40) > single
+    # Large quantities go through one bulkCreate call.
+    assert estimate_output_tokens("create 500 notes", board_size=0) == single
+
+
+def test_output_budget_is_clamped_to_bounds_and_context():
+    assert output_budget("move it", 0, available=100000, minimum=512, maximum=4096) == 512
+    assert output_budget("recolor all of them", 500, available=100000, minimum=512, maximum=4096) == 4096
+    assert output_budget("recolor all of them", 500, available=1000, minimum=512, maximum=4096) == 1000
+
+
+def test_complete_tool_calls_drops_cut_off_call(make_tool_call):
+    cut = make_tool_call("createStickyNote", '{"x": 1')
+    kept = make_tool_call("deleteObject", {"objectId": "a"})
+    assert complete_tool_calls([kept, cut]) == [kept]
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_max_tokens_is_sized_per_command(mock_create, client, sample_board_state, make_tool_call, make_completion):
+    mock_create.return_value = make_completion([make_tool_call("deleteObject", {"objectId": "obj-1"})])
+
+    client.post("/api/ai/command", json={"command": "remove that", "boardState": sample_board_state}, headers=HEADERS)
+
+    assert mock_create.call_args.kwargs["max_tokens"] == 512
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_reply_cut_off_at_length_is_continued_and_merged(
+    mock_create, client, sample_board_state, make_tool_call, make_completion,
+):
+    cut = make_tool_call("createStickyNote", '{"x": 0, "y": 0, "te')
+    mock_create.side_effect = [
+        make_completion([make_tool_call("createStickyNote", {"x": 0, "y": 0, "text": "A"}), cut], "Adding ", "length"),
+        make_completion([make_tool_call("createStickyNote", {"x": 0, "y": 200, "text": "B"})], "notes."),
+    ]
+
+    resp = client.post(
+        "/api/ai/command", json={"command": "add two notes", "boardState": sample_board_state}, headers=HEADERS,
+    )
+
+    body = resp.json()
+    assert [a["properties"]["text"] for a in body["actions"]] == ["A", "B"]
+    assert body["message"] == "Adding notes."
+    second = mock_create.call_args_list[1].kwargs
+    assert second["max_tokens"] == 4096
+    assert [m["role"] for m in second["messages"][-3:]] == ["assistant", "tool", "user"]
+    assert len(second["messages"][-3]["tool_calls"]) == 1
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_prompt_over_context_window_is_rejected(mock_create, client, sample_board_state):
+    with patch("app.routes.ai.settings.ai_context_tokens", 1000), \
+         patch("app.token_budget.MODEL_CONTEXT_TOKENS", {}):
+        resp = client.post(
+            "/api/ai/command",
+            json={"command": "Write a poem about the notes", "boardState": sample_board_state},
+            headers=HEADERS,
+        )
+
+    assert resp.status_code == 413
+    mock_create.assert_not_awaited()
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_reply_cut_off_inside_its_only_call_is_continued_without_empty_turn(
+    mock_create, client, make_tool_call, make_completion,
+):
+    cut = make_tool_call("createTemplate", '{"template": "swot", "sections": ["Stren')
+    mock_create.side_effect = [
+        make_completion([cut], None, "length"),
+        make_completion([make_tool_call("createTemplate", {"template": "swot"})], "Added a SWOT."),
+    ]
+
+    resp = client.post(
+        "/api/ai/command", json={"command": "create a SWOT analysis", "boardState": []}, headers=HEADERS,
+    )
+
+    assert resp.status_code == 200
+    assert resp.json()["message"] == "Added a SWOT."
+    messages = mock_create.call_args_list[1].kwargs["messages"]
+    assert messages[-1] == {"role": "user", "content": CONTINUE_PROMPT}
+    assert messages[-2]["role"] == "user"
+    assert all(m["role"] != "assistant" for m in messages)
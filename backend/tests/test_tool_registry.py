@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from app.tool_registry import (
+    ALL_TOOLS_TOKENS,
+    COMPACT_TOOLS,
+    FULL_TOOLS_TOKENS,
+    classify_groups,
+    compact_schema,
+    select_tools,
+)
+from app.tools import TOOLS
+
+
+def _names(selection):
+    return {tool["function"]["name"] for tool in selection.tools}
+
+
+@pytest.mark.parametrize("command, groups", [
+    ("delete the blue note", ["edit"]),
+    ("make it blue", ["edit"]),
+    ("add a note about pricing", ["create"]),
+    ("connect the login box to the dashboard", ["create"]),
+    ("arrange these in a grid", ["layout"]),
+    ("create a SWOT analysis", ["create", "layout"]),
+    ("clear the board", ["bulk"]),
+    ("create 200 random objects", ["create", "bulk"]),
+    ("what's on this board?", None),
+])
+def test_classify_groups(command, groups):
+    assert classify_groups(command, board_size=5) == groups
+
+
+def test_empty_board_drops_edit_tools():
+    assert classify_groups("add a red note", board_size=0) == ["create"]
+    assert classify_groups("make it blue", board_size=0) is None
+
+
+def test_selection_keeps_tools_order_and_saves_tokens():
+    selection = select_tools("delete the blue note", board_size=5)
+
+    assert _names(selection) >= {"deleteObject", "changeColor", "selectObjects", "updateSelection"}
+    assert "createTemplate" not in _names(selection)
+    order = [tool["function"]["name"] for tool in TOOLS]
+    assert [t["function"]["name"] for t in selection.tools] == [n for n in order if n in _names(selection)]
+    assert selection.saved == FULL_TOOLS_TOKENS - selection.tokens
+    assert selection.tokens < ALL_TOOLS_TOKENS / 2
+    # Same groups, same (cacheable) list.
+    assert select_tools("remove the pink note", board_size=5).tools is selection.tools
+
+
+def test_compaction_drops_restated_descriptions_and_palette():
+    schema = compact_schema(TOOLS[0]["function"]["parameters"])
+
+    assert "description" not in schema["properties"]["x"]
+    assert schema["properties"]["color"]["description"] == "Background color hex from the palette"
+    assert schema["properties"]["width"]["description"] == "Width in pixels. Default 200."
+    assert [t["function"]["name"] for t in COMPACT_TOOLS] == [t["function"]["name"] for t in TOOLS]
+    assert ALL_TOOLS_TOKENS < FULL_TOOLS_TOKENS
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_widens_to_all_tools_when_subset_gets_no_calls(
+    mock_create, client, sample_board_state, make_tool_call, make_completion,
+):
+    none = make_completion(content="Can't")
+    done = make_completion([make_tool_call("arrangeGrid", {"objectIds": ["obj-1", "obj-2"]})], "Tidied")
+    mock_create.side_effect = [none, done]
+
+    resp = client.post(
+        "/api/ai/command",
+        json={"command": "delete the duplicates and tidy what is left", "boardState": sample_board_state},
+        headers={"Authorization": "Bearer fake"},
+    )
+
+    assert resp.status_code == 200
+    first, second = (call.kwargs["tools"] for call in mock_create.call_args_list)
+    assert len(first) < len(TOOLS)
+    assert len(second) == len(TOOLS)
+    assert json.dumps(second) == json.dumps(COMPACT_TOOLS)
@@ -0,0 +1,100 @@
+import json
+from unittest.mock import patch, AsyncMock
+
+from app.tool_validation import check_tool_call, check_tool_calls, snap_color
+
+
+def test_fixes_string_numbers_enum_case_and_unknown_keys(make_tool_call):
+    checked = check_tool_call(make_tool_call("createShape", {
+        "shapeType": "Rectangle", "x": "120", "y": "40px", "width": 80, "label": "extra",
+    }))
+
+    assert checked.ok
+    assert checked.args == {"shapeType": "rectangle", "x": 120.0, "y": 40.0, "width": 80}
+    assert json.loads(checked.tool_call.function.arguments) == checked.args
+
+
+def test_snaps_palette_colors_and_translates_names(make_tool_call):
+    assert snap_color("#FFFF00") == "#FDE68A"
+    assert snap_color("blue") == "#BFDBFE"
+    assert snap_color("#fcc") == "#FECACA"
+    assert snap_color("mauve-ish") is None
+
+    palette = check_tool_call(make_tool_call("changeColor", {"objectId": "obj-1", "color": "#3B82F6"}))
+    assert palette.args["color"] == "#BFDBFE"
+    # Free color fields keep any hex.
+    text = check_tool_call(make_tool_call("createText", {"x": 0, "y": 0, "text": "Hi", "color": "#123456"}))
+    assert text.args["color"] == "#123456" and not text.fixes
+
+
+def test_fills_required_defaults_from_viewport(make_tool_call):
+    checked = check_tool_call(make_tool_call("createStickyNote", '```json\n{"text": "Hi",}\n```'), {"x": 50, "y": 60})
+
+    assert checked.ok
+    assert checked.args == {"text": "Hi", "x": 50, "y": 60}
+    assert set(checked.fixes) == {"json", "default"}
+
+
+def test_unfixable_calls_are_broken(make_tool_call):
+    usable, broken = check_tool_calls([
+        make_tool_call("moveObject", {"x": 1, "y": 2}),
+        make_tool_call("teleport", {}),
+        make_tool_call("deleteObject", '{"objectId": '),
+        make_tool_call("deleteObject", {"objectId": "obj-1"}),
+    ])
+
+    assert [tc.function.name for tc in usable] == ["deleteObject"]
+    assert [c.errors[0] for c in broken][:2] == ["missing required 'objectId'", "unknown tool 'teleport'"]
+    assert broken[2].errors[0].startswith("arguments are not valid JSON")
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_repair_request_covers_only_broken_calls(
+    mock_create, client, sample_board_state, make_tool_call, make_completion,
+):
+    first = make_completion([
+        make_tool_call("deleteObject", {"objectId": "obj-1"}),
+        make_tool_call("moveObject", {"x": 10, "y": 20}),
+    ], "Done")
+    repaired = make_completion([
+        make_tool_call("moveObject", {"objectId": "obj-2", "x": 10, "y": 20}),
+    ])
+    mock_create.side_effect = [first, repaired]
+
+    resp = client.post(
+        "/api/ai/command",
+        json={"command": "delete obj-1, then move the rectangle", "boardState": sample_board_state},
+        headers={"Authorization": "Bearer fake"},
+    )
+
+    assert resp.status_code == 200
+    assert [a["type"] for a in resp.json()["actions"]] == ["delete", "update"]
+    repair = mock_create.call_args_list[1].kwargs
+    assert repair["max_tokens"] < 4096
+    tool_messages = [m for m in repair["messages"] if m["role"] == "tool"]
+    assert [json.loads(m["content"]) for m in tool_messages] == [
+        {"ok": True}, {"error": "missing required 'objectId'"},
+    ]
+
+
+@patch("app.routes.ai.client.chat.completions.create", new_callable=AsyncMock)
+def test_repaired_create_keeps_its_temp_id(mock_create, client, make_tool_call, make_completion):
+    first = make_completion([
+        make_tool_call("createShape", {"x": 0, "y": 0}),
+        make_tool_call("createStickyNote", {"x": 300, "y": 0, "text": "B"}),
+        make_tool_call("createConnector", {"fromId": "new-1", "toId": "new-2"}),
+    ], "Done")
+    repaired = make_completion([
+        make_tool_call("createShape", {"shapeType": "circle", "x": 0, "y": 0}),
+    ])
+    mock_create.side_effect = [first, repaired]
+
+    resp = client.post(
+        "/api/ai/command",
+        json={"command": "add a circle and a note B, then connect the circle to the note", "boardState": []},
+        headers={"Authorization": "Bearer fake"},
+    )
+
+    ids = {a["objectType"]: a.get("tempId") for a in resp.json()["actions"]}
+    assert ids["circle"] == "new-1"
+    assert ids["stickyNote"] == "new-2"
@@ -1,5 +1,5 @@
 import { useState, useCallback } from 'react';
-import { sendAiCommand, executeActions } from '../services/ai';
+import { sendAiCommand, executeActions, expandActions } from '../services/ai';
 
 /**
  * Hook for managing AI agent chat state and command execution.
@@ -23,8 +23,17 @@ export function useAiAgent({ objects, user, getViewportCenter }) {
       const viewportCenter = getViewportCenter ? getViewportCenter() : null;
       const result = await sendAiCommand(command, objects, viewportCenter);
 
-      if (result.actions && result.actions.length > 0) {
-        const execResult = await executeActions(result.actions, user.uid, objects);
+      const actions = expandActions(result.actions || []);
+      if (result.coalesced) {
+        // A collaborator sent the same command; their client applies it.
+        setMessages(prev => [...prev, {
+          role: 'assistant',
+          content: `${result.message || 'Done!'} (applied from a collaborator's identical command)`,
+          timestamp: new Date(),
+          actionCount: 0,
+        }]);
+      } else if (actions.length > 0) {
+        const execResult = await executeActions(actions, user.uid, objects);
 
         let content = result.message || 'Done!';
         if (execResult.errorCount > 0) {
@@ -35,7 +44,7 @@ export function useAiAgent({ objects, user, getViewportCenter }) {
           role: 'assistant',
           content,
           timestamp: new Date(),
-          actionCount: result.actions.length,
+          actionCount: actions.length,
           successCount: execResult.successCount,
           errorCount: execResult.errorCount,
         }]);
@@ -6,56 +6,130 @@ import { getObjectCenter } from '../utils/connectorUtils';
 // In local dev, it points to http://localhost:8080.
 const AI_API_URL = import.meta.env.VITE_AI_API_URL ?? 'http://localhost:8080';
 
+// Fields of a board object the backend reads.
+const SYNC_FIELDS = [
+  'id', 'type', 'x', 'y', 'width', 'height', 'radius', 'text', 'title', 'color',
+  'fontSize', 'strokeWidth', 'strokeColor', 'rotation', 'zIndex',
+  'fromId', 'toId', 'arrowEnd', 'createdBy',
+];
+
+// What the backend holds for the current board: its snapshot version and the
+// serialized objects it was built from. Lets later commands upload a delta.
+let lastSync = null;
+
+function serializeObject(obj) {
+  const out = {};
+  for (const field of SYNC_FIELDS) {
+    if (obj[field] !== undefined && obj[field] !== null) out[field] = obj[field];
+  }
+  return JSON.stringify(out);
+}
+
 /**
- * Send a natural language command to the AI backend.
- * Returns { actions, message, error }.
+ * Board payload for a command: a `boardDelta` against the last snapshot the
+ * backend acknowledged for this board, or the full `boardState` otherwise.
+ * Returns { payload, sent } where `sent` maps id -> serialized object.
  */
-export async function sendAiCommand(command, boardState, viewportCenter) {
-  const user = auth.currentUser;
-  if (!user) throw new Error('Not authenticated');
+export function buildBoardPayload(boardState, boardId, sync = lastSync) {
+  const sent = new Map(boardState.map(obj => [obj.id, serializeObject(obj)]));
 
-  const idToken = await user.getIdToken();
+  if (!sync || sync.boardId !== boardId) {
+    return { payload: { boardState: [...sent.values()].map(s => JSON.parse(s)) }, sent };
+  }
 
-  const response = await fetch(`${AI_API_URL}/api/ai/command`, {
+  const upserted = [];
+  for (const [id, serialized] of sent) {
+    if (sync.sent.get(id) !== serialized) upserted.push(JSON.parse(serialized));
+  }
+  const removed = [...sync.sent.keys()].filter(id => !sent.has(id));
+  return { payload: { boardDelta: { baseVersion: sync.version, upserted, removed } }, sent };
+}
+
+async function postCommand(idToken, body) {
+  const send = () => fetch(`${AI_API_URL}/api/ai/command`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
       'Authorization': `Bearer ${idToken}`,
     },
-    body: JSON.stringify({
-      command,
-      boardState: boardState.map(obj => ({
-        id: obj.id,
-        type: obj.type,
-        x: obj.x,
-        y: obj.y,
-        width: obj.width,
-        height: obj.height,
-        radius: obj.radius,
-        text: obj.text,
-        title: obj.title,
-        color: obj.color,
-        fontSize: obj.fontSize,
-        strokeWidth: obj.strokeWidth,
-        strokeColor: obj.strokeColor,
-        rotation: obj.rotation,
-        zIndex: obj.zIndex,
-        fromId: obj.fromId,
-        toId: obj.toId,
-        arrowEnd: obj.arrowEnd,
-        createdBy: obj.createdBy,
-      })),
-      boardId: getBoardId(),
-      viewportCenter,
-    }),
+    body: JSON.stringify(body),
   });
+  try {
+    return await send();
+  } catch {
+    // Network failure: retry once. The body's idempotencyKey makes the
+    // backend replay its response if the first attempt did get through.
+    return send();
+  }
+}
+
+/**
+ * Send a natural language command to the AI backend.
+ * Uploads only what changed since the previous command when the backend
+ * still has that snapshot, falling back to the full board on a 409.
+ * Returns { actions, message, error, coalesced }; `coalesced` responses were
+ * shared from a collaborator's identical command, whose client applies them.
+ */
+export async function sendAiCommand(command, boardState, viewportCenter) {
+  const user = auth.currentUser;
+  if (!user) throw new Error('Not authenticated');
+
+  const idToken = await user.getIdToken();
+  const boardId = getBoardId();
+
+  const idempotencyKey = crypto.randomUUID();
+  let { payload, sent } = buildBoardPayload(boardState, boardId);
+  let response = await postCommand(idToken, { command, ...payload, boardId, viewportCenter, idempotencyKey });
+
+  if (response.status === 409 && payload.boardDelta) {
+    // The backend lost or replaced our snapshot; resend the whole board.
+    lastSync = null;
+    ({ payload, sent } = buildBoardPayload(boardState, boardId, null));
+    response = await postCommand(idToken, { command, ...payload, boardId, viewportCenter, idempotencyKey });
+  }
 
   if (!response.ok) {
+    lastSync = null;
     const errBody = await response.json().catch(() => ({}));
     throw new Error(errBody.detail || `AI request failed (${response.status})`);
   }
 
-  return response.json();
+  const result = await response.json();
+  lastSync = result.boardVersion ? { boardId, version: result.boardVersion, sent } : null;
+  return result;
+}
+
+/**
+ * Expand compact bulk actions from the backend into plain create/delete actions.
+ * - deleteMany: { objectIds: [...] }
+ * - createMany: { objectType?, properties: shared, columns: { prop: [...] } }
+ *   where a null column entry means the property is unset for that object.
+ */
+export function expandActions(actions) {
+  const out = [];
+  for (const action of actions) {
+    if (action.type === 'deleteMany') {
+      for (const objectId of action.objectIds || []) {
+        out.push({ type: 'delete', objectId });
+      }
+    } else if (action.type === 'createMany') {
+      const columns = action.columns || {};
+      const keys = Object.keys(columns).filter(k => k !== 'type');
+      const count = (Object.values(columns)[0] || []).length;
+      for (let i = 0; i < count; i++) {
+        const properties = { ...action.properties };
+        for (const key of keys) {
+          const value = columns[key][i];
+          if (value !== null && value !== undefined) properties[key] = value;
+        }
+        const objectType = columns.type ? columns.type[i] : action.objectType;
+        out.push({ type: 'create', objectType, properties });
+      }
+    } else {
+      out.push(action);
+    }
+  }
+  return out;
 }
 
 /**
@@ -63,6 +137,8 @@ export async function sendAiCommand(command, boardState, viewportCenter) {
  * Batches operations for performance: non-connector creates, updates, and deletes
  * are each executed as a single Firestore batch write.
  * Connector creates run sequentially (they reference IDs from earlier creates).
+ * Creates may carry a `tempId` ("new-1", ...) that later actions use in place
+ * of the Firestore ID, which only exists once the create has run.
  */
 export async function executeActions(actions, userId, currentObjects) {
   let successCount = 0;
@@ -71,6 +147,8 @@ export async function executeActions(actions, userId, currentObjects) {
 
   // Build lookup map, augmented as we create new objects
   const objectMap = new Map(currentObjects.map(o => [o.id, o]));
+  const tempIds = new Map();
+  const resolveId = id => tempIds.get(id) ?? id;
 
   // Partition actions by type
   const creates = [];       // non-connector creates
@@ -78,7 +156,7 @@ export async function executeActions(actions, userId, currentObjects) {
   const updates = [];
   const deletes = [];
 
-  for (const action of actions) {
+  for (const action of expandActions(actions)) {
     if (action.type === 'create') {
       if (action.objectType === 'connector') {
         connectorCreates.push(action);
@@ -107,6 +185,7 @@ export async function executeActions(actions, userId, currentObjects) {
       });
       const newIds = await createMultipleObjects(objectsData, userId);
       for (let i = 0; i < newIds.length; i++) {
+        if (creates[i].tempId) tempIds.set(creates[i].tempId, newIds[i]);
         createdIds.push(newIds[i]);
         objectMap.set(newIds[i], { id: newIds[i], ...objectsData[i] });
       }
@@ -121,6 +200,8 @@ export async function executeActions(actions, userId, currentObjects) {
   for (const action of connectorCreates) {
     try {
       const props = { ...action.properties };
+      props.fromId = resolveId(props.fromId);
+      props.toId = resolveId(props.toId);
       const fromObj = objectMap.get(props.fromId);
       const toObj = objectMap.get(props.toId);
       if (fromObj && toObj) {
@@ -148,7 +229,7 @@ export async function executeActions(actions, userId, currentObjects) {
   if (updates.length > 0) {
     try {
       await updateMultipleObjects(
-        updates.map(a => ({ id: a.objectId, changes: a.properties })),
+        updates.map(a => ({ id: resolveId(a.objectId), changes: a.properties })),
         userId
       );
       successCount += updates.length;
@@ -161,7 +242,7 @@ export async function executeActions(actions, userId, currentObjects) {
   // 4. Batch deletes
   if (deletes.length > 0) {
     try {
-      await deleteMultipleObjects(deletes.map(a => a.objectId));
+      await deleteMultipleObjects(deletes.map(a => resolveId(a.objectId)));
       successCount += deletes.length;
     } catch (err) {
       console.error('Failed to batch delete objects:', err);
@@ -0,0 +1,105 @@
+import { describe, it, expect, vi } from 'vitest';
+
+// Mock firebase modules to avoid requiring env config for pure-function tests
+vi.mock('./firebase', () => ({ auth: {}, db: {} }));
+vi.mock('./board', () => ({
+  createObject: vi.fn(),
+  createMultipleObjects: vi.fn(),
+  updateMultipleObjects: vi.fn(),
+  deleteMultipleObjects: vi.fn(),
+  getBoardId: vi.fn(),
+}));
+
+import { expandActions, buildBoardPayload, executeActions } from './ai';
+import { createObject, createMultipleObjects, updateMultipleObjects } from './board';
+
+describe('expandActions', () => {
+  it('passes plain actions through unchanged', () => {
+    const actions = [{ type: 'update', objectId: 'a', properties: { x: 1 } }];
+    expect(expandActions(actions)).toEqual(actions);
+  });
+
+  it('expands deleteMany into one delete per id', () => {
+    expect(expandActions([{ type: 'deleteMany', objectIds: ['a', 'b'] }])).toEqual([
+      { type: 'delete', objectId: 'a' },
+      { type: 'delete', objectId: 'b' },
+    ]);
+  });
+
+  it('expands columnar createMany with shared properties and sparse columns', () => {
+    const action = {
+      type: 'createMany',
+      properties: { rotation: 0 },
+      columns: {
+        type: ['circle', 'rectangle'],
+        x: [10, 20],
+        radius: [40, null],
+        width: [null, 90],
+      },
+    };
+    expect(expandActions([action])).toEqual([
+      { type: 'create', objectType: 'circle', properties: { rotation: 0, x: 10, radius: 40 } },
+      { type: 'create', objectType: 'rectangle', properties: { rotation: 0, x: 20, width: 90 } },
+    ]);
+  });
+
+  it('uses objectType when there is no type column', () => {
+    const action = { type: 'createMany', objectType: 'stickyNote', properties: {}, columns: { x: [1], y: [2] } };
+    expect(expandActions([action])).toEqual([
+      { type: 'create', objectType: 'stickyNote', properties: { x: 1, y: 2 } },
+    ]);
+  });
+});
+
+describe('buildBoardPayload', () => {
+  const a = { id: 'a', type: 'circle', x: 1, y: 2, radius: 40, selected: true };
+  const b = { id: 'b', type: 'text', x: 5, y: 5, text: 'Hi', fontSize: null };
+
+  it('sends the full board without a previous snapshot', () => {
+    const { payload } = buildBoardPayload([a, b], 'board-1', null);
+    expect(payload.boardState).toEqual([
+      { id: 'a', type: 'circle', x: 1, y: 2, radius: 40 },
+      { id: 'b', type: 'text', x: 5, y: 5, text: 'Hi' },
+    ]);
+  });
+
+  it('sends only added, changed and removed objects as a delta', () => {
+    const { sent } = buildBoardPayload([a, b], 'board-1', null);
+    const sync = { boardId: 'board-1', version: 'v1', sent };
+    const c = { id: 'c', type: 'rectangle', x: 0, y: 0 };
+    const { payload } = buildBoardPayload([{ ...a, x: 9 }, c], 'board-1', sync);
+    expect(payload.boardDelta).toEqual({
+      baseVersion: 'v1',
+      upserted: [
+        { id: 'a', type: 'circle', x: 9, y: 2, radius: 40 },
+        { id: 'c', type: 'rectangle', x: 0, y: 0 },
+      ],
+      removed: ['b'],
+    });
+  });
+
+  it('sends the full board when switching boards', () => {
+    const { sent } = buildBoardPayload([a], 'board-1', null);
+    const { payload } = buildBoardPayload([a], 'board-2', { boardId: 'board-1', version: 'v1', sent });
+    expect(payload.boardState).toHaveLength(1);
+  });
+});
+
+describe('executeActions', () => {
+  it('resolves new-N temporary ids to the created Firestore ids', async () => {
+    createMultipleObjects.mockResolvedValue(['fs-a', 'fs-b']);
+    createObject.mockResolvedValue('fs-conn');
+    updateMultipleObjects.mockResolvedValue();
+
+    const result = await executeActions([
+      { type: 'create', objectType: 'stickyNote', tempId: 'new-1', properties: { x: 0, y: 0 } },
+      { type: 'create', objectType: 'rectangle', tempId: 'new-2', properties: { x: 300, y: 0 } },
+      { type: 'create', objectType: 'connector', properties: { fromId: 'new-1', toId: 'new-2' } },
+      { type: 'update', objectId: 'new-2', properties: { color: '#BFDBFE' } },
+    ], 'user-1', []);
+
+    expect(createObject.mock.calls[0][0]).toMatchObject({ fromId: 'fs-a', toId: 'fs-b' });
+    expect(updateMultipleObjects.mock.calls[0][0]).toEqual([{ id: 'fs-b', changes: { color: '#BFDBFE' } }]);
+    expect(result.errorCount).toBe(0);
+  });
+});